@@ -88,6 +88,14 @@ describe('Dashboard Component', () => {
                     refetch: vi.fn(),
                 };
             }
+            if (url.includes('/api/activity')) {
+                return {
+                    data: { bucket: 'day', series: [] },
+                    loading: false,
+                    error: null,
+                    refetch: vi.fn(),
+                };
+            }
             return { data: null, loading: false, error: null };
         });
 
@@ -98,6 +98,7 @@ export const Dashboard: React.FC = () => {
         isLoading: isLoadingData, 
         error: dataError, 
         chartData, 
+        weeklyReps,
         refreshData 
     } = useDashboardData();
 
@@ -291,7 +292,7 @@ export const Dashboard: React.FC = () => {
                     
                     {/* Weekly Goal */}
                     <WeeklyGoal 
-                        currentReps={stats.totalReps} 
+                        currentReps={weeklyReps} 
                         goal={goal} 
                         onUpdateGoal={handleUpdateGoal} 
                     />
@@ -3,17 +3,19 @@
 // Core real-time component bridging webcam and pose detection backend.
 //
 // Data Pipeline:
-//   Camera -> Canvas (hidden) -> JPEG encode -> Base64 -> WebSocket -> Backend
-//   Backend -> JSON landmarks -> this component -> SkeletonOverlay
+//   Camera -> Canvas (hidden) -> JPEG encode -> binary frame -> WebSocket -> Backend
+//   Backend -> compact binary landmarks -> this component -> SkeletonOverlay
 //
 // Why a Hidden Canvas:
 //   The video element displays to user, but canvas is needed to extract
 //   pixel data (getContext('2d').drawImage). We compress to JPEG (quality 0.6)
-//   before base64 encoding to reduce WS bandwidth by ~60%.
+//   and send the raw bytes as a binary frame (see lib/frameProtocol.ts).
 //
 // Frame Rate:
 //   Controlled by FRAME_RATE constant (15 FPS default). Uses requestAnimationFrame
-//   with timestamp throttling to ensure consistent capture rate.
+//   with timestamp throttling to ensure consistent capture rate. Under load the
+//   server's governor sends CONTROL messages lowering the rate and JPEG quality
+//   (and restoring them later); those override the constants until reconnect.
 //
 // WebSocket Strategy:
 //   - Shared connection (react-use-websocket's `share: true`)
@@ -24,16 +26,28 @@
 //
 // Client → Server:
 //   1. INIT Message (sent on connection and session start)
-//      { type: "INIT", exercise: "Pushups" }
+//      { type: "INIT", exercise: "Pushups", format: "compact", delta: true, session: "<token>" }
+//      `session` (set while a workout is active) lets the server resume the
+//      workout's rep count if the socket drops and reconnects
 //
 //   2. FRAME Message (sent at 15 FPS during active session)
+//      Binary: [type u8][timestamp f64][seq u32][JPEG bytes]  (lib/frameProtocol.ts)
+//      Legacy JSON (still accepted by the server):
 //      { type: "FRAME", payload: "base64_jpeg_string", timestamp: 1234567890 }
 //
+//   3. END Message (workout finished; the server saves it once)
+//      { type: "END" }
+//
 // Server → Client:
 //   1. RESULT Message (pose detected successfully)
+//      Binary: [type u8][flags u8][count u8][landmark block][JSON tail]
+//      (lib/frameProtocol.ts): skeleton landmarks 11-32 in fixed point, as
+//      int8 deltas from the previous RESULT when they fit. The JSON tail holds
+//      the other fields. Without format: "compact" in INIT the server sends:
 //      {
 //        type: "RESULT",
 //        landmarks: [{ x, y, z, visibility }, ...],  // 33 MediaPipe landmarks
+//        seq: 17,  // echoed from binary frames
 //        reps: 5,
 //        state: "CONCENTRIC",
 //        feedback: { message: "GOOD DEPTH", color: "green", angle: 85 }
@@ -42,18 +56,25 @@
 //   2. NO_DETECTION Message (no pose found in frame)
 //      { type: "NO_DETECTION" }
 //
+//   3. CONTROL Message (server load changed; capture at these settings)
+//      { type: "CONTROL", level: "reduced", model_complexity: 0, fps: 12, jpeg_quality: 0.5 }
+//
 // Edge Cases:
-//   - Multiple INIT messages: Server resets exercise state (allows mid-session exercise switch)
+//   - Multiple INIT messages: Server resets exercise state (allows mid-session exercise switch),
+//     except for a repeated INIT with the running session's token
+//   - Reconnect mid-workout: INIT with the same token resumes the parked session
 //   - Disconnection during FRAME send: Handled by exponential backoff reconnection
-//   - Backpressure: Client throttles at 15 FPS, server processes immediately (no queuing)
+//   - Backpressure: Client throttles at 15 FPS; server keeps only the newest frame
+//     (latest-frame-wins), dropping stale ones when inference falls behind
 
 import { useRef, useEffect, useState } from 'react';
 import useWebSocket, { ReadyState } from 'react-use-websocket';
 import SkeletonOverlay from './SkeletonOverlay';
 import { Loader2, AlertTriangle, RefreshCw } from 'lucide-react';
 import type { PoseData } from '../types';
+import { decodeResult, encodeFrame } from '../lib/frameProtocol';
 
-import { VIDEO_WIDTH, VIDEO_HEIGHT, FRAME_RATE, WS_URL } from '../lib/constants';
+import { VIDEO_WIDTH, VIDEO_HEIGHT, FRAME_RATE, JPEG_QUALITY, WS_URL } from '../lib/constants';
 
 /**
  * Props for the WebcamCapture component.
@@ -69,6 +90,8 @@ interface WebcamCaptureProps {
     poseData: PoseData | null;
     /** Flag indicating if a workout session is currently active */
     sessionActive?: boolean;
+    /** Token identifying the active workout, so a reconnect resumes it */
+    sessionToken?: string | null;
 }
 
 /**
@@ -82,11 +105,17 @@ interface WebcamCaptureProps {
  *
  * @param props - Component props
  */
-const WebcamCapture = ({ activeExercise = 'Pushups', onConnectionStatus, onPoseDataUpdate, poseData, sessionActive = false }: WebcamCaptureProps) => {
+const WebcamCapture = ({ activeExercise = 'Pushups', onConnectionStatus, onPoseDataUpdate, poseData, sessionActive = false, sessionToken = null }: WebcamCaptureProps) => {
     const videoRef = useRef<HTMLVideoElement>(null);
     const canvasRef = useRef<HTMLCanvasElement>(null);
     const [isCameraReady, setIsCameraReady] = useState(false);
     const [fps, setFps] = useState(0);
+    const frameSeqRef = useRef(0);
+    // Capture settings; the server may lower/restore them via CONTROL messages
+    const [capture, setCapture] = useState({ frameRate: FRAME_RATE, jpegQuality: JPEG_QUALITY });
+    // Delta base for compact RESULTs; every binary message must be decoded in order
+    const resultBaseRef = useRef<Int32Array | null>(null);
+    const [compactResult, setCompactResult] = useState<PoseData | null>(null);
 
     // WebSocket Connection
     // Using port 8000/ws as per existing server config, shared connection
@@ -95,13 +124,49 @@ const WebcamCapture = ({ activeExercise = 'Pushups', onConnectionStatus, onPoseD
         shouldReconnect: () => true,
         reconnectAttempts: 10,
         reconnectInterval: (attemptNumber: number) => Math.min(Math.pow(2, attemptNumber) * 1000, 10000), // Exponential backoff
-        onOpen: () => {
+        onOpen: (event: WebSocketEventMap['open']) => {
+            // Compact RESULTs arrive as binary; read them synchronously
+            (event.target as WebSocket).binaryType = 'arraybuffer';
+            resultBaseRef.current = null;
              // Send Init Message on Connect
             const initMsg = {
                 type: 'INIT',
                 exercise: activeExercise
             };
             console.log("Sending INIT:", initMsg);
+        },
+        // CONTROL and binary RESULTs are handled per message: lastMessage may
+        // skip one when another arrives right behind it, and a skipped delta
+        // would corrupt every later skeleton
+        onMessage: (event: MessageEvent) => {
+            if (event.data instanceof ArrayBuffer) {
+                try {
+                    const decoded = decodeResult(event.data, resultBaseRef.current);
+                    resultBaseRef.current = decoded?.quantized ?? null;
+                    if (decoded) {
+                        setCompactResult({ ...decoded.fields, landmarks: decoded.landmarks } as PoseData);
+                    }
+                } catch (e) {
+                    resultBaseRef.current = null;
+                    console.error("Error decoding WS message", e);
+                }
+                return;
+            }
+            if (typeof event.data === 'string' && event.data.includes('"NO_DETECTION"')) {
+                setCompactResult(null);
+            }
+            if (typeof event.data !== 'string' || !event.data.includes('"CONTROL"')) return;
+            try {
+                const data = JSON.parse(event.data);
+                if (data.type === 'CONTROL') {
+                    setCapture({
+                        frameRate: data.fps ?? FRAME_RATE,
+                        jpegQuality: data.jpeg_quality ?? JPEG_QUALITY,
+                    });
+                }
+            } catch (e) {
+                console.error("Error parsing WS message", e);
+            }
         }
     });
 
@@ -119,10 +184,29 @@ const WebcamCapture = ({ activeExercise = 'Pushups', onConnectionStatus, onPoseD
             console.log("Session Started: Sending INIT reset");
             sendMessage(JSON.stringify({
                 type: 'INIT',
-                exercise: activeExercise
+                exercise: activeExercise,
+                format: 'compact',
+                delta: true,
+                session: sessionToken ?? undefined,
             }));
         }
-    }, [sessionActive, readyState, activeExercise, sendMessage]);
+    }, [sessionActive, readyState, activeExercise, sendMessage, sessionToken]);
+
+    // Tell the server the workout is over so it saves it now (once)
+    const wasActiveRef = useRef(false);
+    useEffect(() => {
+        if (wasActiveRef.current && !sessionActive && readyState === ReadyState.OPEN) {
+            sendMessage(JSON.stringify({ type: 'END' }));
+        }
+        wasActiveRef.current = sessionActive;
+    }, [sessionActive, readyState, sendMessage]);
+
+    // A new connection starts at the server's default load level
+    useEffect(() => {
+        if (readyState === ReadyState.OPEN) {
+            setCapture({ frameRate: FRAME_RATE, jpegQuality: JPEG_QUALITY });
+        }
+    }, [readyState]);
 
     // Listen for ReadyState changes to send INIT
     useEffect(() => {
@@ -130,10 +214,13 @@ const WebcamCapture = ({ activeExercise = 'Pushups', onConnectionStatus, onPoseD
              console.log("WS Open, sending INIT for", activeExercise);
              sendMessage(JSON.stringify({
                 type: 'INIT',
-                exercise: activeExercise
+                exercise: activeExercise,
+                format: 'compact',
+                delta: true,
+                session: sessionToken ?? undefined,
             }));
         }
-    }, [readyState, activeExercise, sendMessage]);
+    }, [readyState, activeExercise, sendMessage, sessionToken]);
 
     // Notify parent of connection status
     useEffect(() => {
@@ -142,9 +229,16 @@ const WebcamCapture = ({ activeExercise = 'Pushups', onConnectionStatus, onPoseD
         }
     }, [connectionStatus, onConnectionStatus]);
 
-    // Handle incoming messages
+    // Compact RESULTs (decoded in onMessage)
+    useEffect(() => {
+        if (compactResult && sessionActive && onPoseDataUpdate) {
+            onPoseDataUpdate(compactResult);
+        }
+    }, [compactResult, onPoseDataUpdate, sessionActive]);
+
+    // Handle incoming JSON messages
     useEffect(() => {
-        if (lastMessage && sessionActive) {
+        if (lastMessage && typeof lastMessage.data === 'string' && sessionActive) {
             try {
                 // eslint-disable-next-line @typescript-eslint/no-explicit-any
                 const data: any = JSON.parse(lastMessage.data);
@@ -219,7 +313,7 @@ const WebcamCapture = ({ activeExercise = 'Pushups', onConnectionStatus, onPoseD
     useEffect(() => {
         if (!isCameraReady || readyState !== ReadyState.OPEN) return;
 
-        const INTERVAL = 1000 / FRAME_RATE;
+        const INTERVAL = 1000 / capture.frameRate;
         let lastTime = 0;
         let animationFrameId: number;
 
@@ -239,16 +333,14 @@ const WebcamCapture = ({ activeExercise = 'Pushups', onConnectionStatus, onPoseD
 
                         // Only send to backend if session is active
                         if (sessionActive) {
-                            // Compress quality to reduce WS load (JPEG 0.6)
-                            const dataUrl = canvas.toDataURL('image/jpeg', 0.6);
-                            const base64 = dataUrl.split(',')[1];
-
-                            // Send to backend in existing format
-                            sendMessage(JSON.stringify({
-                                type: 'FRAME',
-                                payload: base64,
-                                timestamp: Date.now()
-                            }));
+                            // Compress quality to reduce WS load (JPEG 0.6) and send
+                            // raw bytes: no base64 inflation or JSON parse on the server
+                            const capturedAt = Date.now();
+                            const seq = frameSeqRef.current++;
+                            canvas.toBlob(async (blob) => {
+                                if (!blob) return;
+                                sendMessage(encodeFrame(await blob.arrayBuffer(), capturedAt, seq));
+                            }, 'image/jpeg', capture.jpegQuality);
                         }
                     }
                 }
@@ -259,7 +351,7 @@ const WebcamCapture = ({ activeExercise = 'Pushups', onConnectionStatus, onPoseD
         animationFrameId = requestAnimationFrame(processFrame);
 
         return () => cancelAnimationFrame(animationFrameId);
-    }, [isCameraReady, readyState, sendMessage, sessionActive]);
+    }, [isCameraReady, readyState, sendMessage, sessionActive, capture]);
 
     return (
         <div className="relative w-full h-full flex items-center justify-center bg-black rounded-xl overflow-hidden">
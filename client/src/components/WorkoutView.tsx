@@ -14,6 +14,14 @@
 //   3. User clicks "Start Session" to begin sending frames
 //   4. User clicks "End Session" to save data and navigate to dashboard
 //
+// Saving:
+//   "Start" mints a session token that WebcamCapture sends in INIT, so a
+//   dropped socket resumes the same server-side count on reconnect. On
+//   "End" WebcamCapture sends END and the server saves the session once;
+//   only if the socket is down does this view POST /api/save-session (with
+//   the token, so the server drops its parked copy instead of saving it too).
+//   The token is cleared once the workout ends.
+//
 // Data Flow:
 //   WebcamCapture -> (pose data) -> this component -> StatsPanel
 //                 -> (feedback) -> VoiceFeedback hook -> audio
@@ -95,6 +103,7 @@ const WorkoutView = () => {
     const [isSessionActive, setIsSessionActive] = useState(false);
     const [isEnding, setIsEnding] = useState(false);
     const [isSaving, setIsSaving] = useState(false);
+    const [sessionToken, setSessionToken] = useState<string | null>(null);
 
     const { speak } = useVoiceFeedback();
     const prevRepsRef = useRef(0);
@@ -127,6 +136,7 @@ const WorkoutView = () => {
     }, [isSessionActive, timerActive]);
 
     const startWorkout = () => {
+        setSessionToken(crypto.randomUUID());
         setIsSessionActive(true);
         setTimerActive(true);
         setSessionTime(0);
@@ -141,8 +151,8 @@ const WorkoutView = () => {
         setTimerActive(false);
         speak("Session ended", true);
 
-        // Save session data
-        if (poseData?.reps && poseData.reps > 0) {
+        // Save session data: over the socket (END) when it's up, else here
+        if (connectionStatus !== 'Open' && poseData?.reps && poseData.reps > 0) {
             setIsSaving(true);
             try {
                 const response = await fetch(`${API_URL}/api/save-session`, {
@@ -154,6 +164,7 @@ const WorkoutView = () => {
                         exercise: activeExercise,
                         reps: poseData.reps,
                         duration: sessionTime,
+                        session: sessionToken,
                     }),
                 });
                 await handleApiResponse(response);
@@ -165,6 +176,8 @@ const WorkoutView = () => {
                 setIsSaving(false);
             }
         }
+        // The workout is over: a later INIT must not resume it
+        setSessionToken(null);
 
         // Use setTimeout to ensure state updates flush and navigation occurs
         // This prevents race conditions where the component might be stuck in a re-render loop
@@ -224,6 +237,7 @@ const WorkoutView = () => {
                                 onPoseDataUpdate={setPoseData}
                                 poseData={poseData}
                                 sessionActive={isSessionActive}
+                                sessionToken={sessionToken}
                             />
                         </div>
                     </div>
@@ -4,7 +4,7 @@
 //
 // Data Format:
 //   Array of { day: "Mon", reps: 50 } objects for the last 7 days.
-//   Data is computed by useDashboardData hook from session timestamps.
+//   Bucketed server-side (/api/activity?bucket=day) via useDashboardData.
 //
 // Styling:
 //   Uses a gradient fill (colorReps) from primary color to transparent.
@@ -5,6 +5,7 @@
 // Fetches from:
 //   - /api/sessions: Recent workout sessions
 //   - /api/stats: Summary statistics (total reps, streak, etc.)
+//   - /api/activity: Reps bucketed per day (chart) and per week (weekly goal)
 //   - /api/analytics: Personal records and exercise distribution
 //   - /api/settings/goal: User's weekly goal setting
 //
@@ -14,8 +15,9 @@
 //   data (chartData) ready for visualization components.
 //
 // Chart Data:
-//   Computes daily rep counts for the last 7 days for the activity chart.
-//   Uses session timestamps to bucket reps by day.
+//   The server aggregates reps per day/week in SQL (/api/activity), so the
+//   chart and weekly goal need a handful of rows instead of the full session
+//   history. Periods are local dates (YYYY-MM-DD), oldest first, zero-filled.
 
 import { useMemo, useCallback, useState, useEffect } from 'react';
 import { useFetch } from './useFetch';
@@ -37,6 +39,11 @@ interface GoalResponse {
     goal: number;
 }
 
+interface ActivityResponse {
+    bucket: 'day' | 'week' | 'month';
+    series: { period: string; reps: number; sessions: number; duration: number }[];
+}
+
 export function useDashboardData() {
     // Data Fetching
     const { 
@@ -67,6 +74,20 @@ export function useDashboardData() {
         refetch: refetchGoal
     } = useFetch<GoalResponse>(`${API_URL}/api/settings/goal`);
 
+    const {
+        data: dailyActivityData,
+        loading: loadingDailyActivity,
+        error: errorDailyActivity,
+        refetch: refetchDailyActivity
+    } = useFetch<ActivityResponse>(`${API_URL}/api/activity?bucket=day`);
+
+    const {
+        data: weeklyActivityData,
+        loading: loadingWeeklyActivity,
+        error: errorWeeklyActivity,
+        refetch: refetchWeeklyActivity
+    } = useFetch<ActivityResponse>(`${API_URL}/api/activity?bucket=week`);
+
     // Derived State
     const sessions = useMemo(() => sessionsData || [], [sessionsData]);
     
@@ -86,43 +107,39 @@ export function useDashboardData() {
         if (goalData) setGoal(goalData.goal);
     }, [goalData]);
 
-    const isLoading = loadingSessions || loadingStats || loadingAnalytics || loadingGoal;
+    const isLoading = loadingSessions || loadingStats || loadingAnalytics || loadingGoal ||
+        loadingDailyActivity || loadingWeeklyActivity;
     
     const error = 
         (errorSessions?.message ? `Sessions: ${errorSessions.message}` : null) ||
         (errorStats?.message ? `Stats: ${errorStats.message}` : null) ||
         (errorAnalytics?.message ? `Analytics: ${errorAnalytics.message}` : null) ||
-        (errorGoal?.message ? `Goal: ${errorGoal.message}` : null);
-
-    const chartData = useMemo(() => {
-        const last7Days = new Array(7).fill(0).map((_, i) => {
-            const d = new Date();
-            d.setDate(d.getDate() - (6 - i));
-            return d.toISOString().split('T')[0]; // YYYY-MM-DD
-        });
-
-        const dailyReps: Record<string, number> = {};
-        last7Days.forEach(day => dailyReps[day] = 0);
-
-        sessions.forEach(session => {
-            const date = new Date(session.timestamp * 1000).toISOString().split('T')[0];
-            if (dailyReps[date] !== undefined) {
-                dailyReps[date] += session.reps;
-            }
-        });
-
-        return last7Days.map(date => ({
-            day: new Date(date).toLocaleDateString('en-US', { weekday: 'short' }),
-            reps: dailyReps[date]
-        }));
-    }, [sessions]);
+        (errorGoal?.message ? `Goal: ${errorGoal.message}` : null) ||
+        (errorDailyActivity?.message ? `Activity: ${errorDailyActivity.message}` : null) ||
+        (errorWeeklyActivity?.message ? `Activity: ${errorWeeklyActivity.message}` : null);
+
+    const chartData = useMemo(() =>
+        (dailyActivityData?.series || []).map(({ period, reps }) => ({
+            // Parse as a local date; new Date('YYYY-MM-DD') would be UTC midnight
+            day: new Date(`${period}T00:00:00`).toLocaleDateString('en-US', { weekday: 'short' }),
+            reps
+        })),
+    [dailyActivityData]);
+
+    // Current week is the last (newest) bucket
+    const weeklyReps = useMemo(() => {
+        const series = weeklyActivityData?.series || [];
+        return series.length ? series[series.length - 1].reps : 0;
+    }, [weeklyActivityData]);
 
     const refreshData = useCallback(() => {
         refetchSessions();
         refetchStats();
         refetchAnalytics();
         refetchGoal();
-    }, [refetchSessions, refetchStats, refetchAnalytics, refetchGoal]);
+        refetchDailyActivity();
+        refetchWeeklyActivity();
+    }, [refetchSessions, refetchStats, refetchAnalytics, refetchGoal, refetchDailyActivity, refetchWeeklyActivity]);
 
     return {
         sessions,
@@ -133,6 +150,7 @@ export function useDashboardData() {
         isLoading,
         error,
         chartData,
+        weeklyReps,
         refreshData
     };
 }
@@ -2,28 +2,39 @@
 //
 // CSV export functionality for workout session history.
 //
-// Fetches all sessions (limit=-1) from the API and generates a downloadable
-// CSV file with date, time, exercise type, reps, and duration.
+// The server streams the export (GET /api/export?format=csv) straight from
+// SQLite in fixed-size batches, so it never holds the full history in
+// memory. The response status is checked before anything is downloaded, so
+// a failed export shows an error instead of saving an error page as CSV.
 //
 // CSV Format:
-//   Date,Time,Exercise,Reps,Duration(s)
-//   1/15/2024,10:30:00 AM,Pushups,25,120
+//   id,timestamp,datetime,exercise,reps,duration
+//   42,1705314600.0,2024-01-15T10:30:00+00:00,Pushups,25,120
+//
+//   `timestamp` is Unix epoch seconds; `datetime` is the same instant as
+//   ISO 8601 UTC. This replaces the older browser-built layout
+//   (Date,Time,Exercise,Reps,Duration(s) in the viewer's locale).
 //
 // File Naming:
-//   formcheck_export_YYYY-MM-DD.csv (using current date)
+//   formcheck_export_YYYY-MM-DD.csv (server date, from Content-Disposition)
 
 import { useState } from 'react';
 import { API_URL } from '../lib/constants';
-import { handleApiResponse, ApiError } from '../lib/errorHandler';
+import { ApiError } from '../lib/errorHandler';
 import { useToast } from '../components/ui/Toast';
-import type { Session } from '../types';
+
+/** Filename from a Content-Disposition header, if it names one. */
+function attachmentName(header: string | null): string | null {
+    const match = header?.match(/filename="?([^";]+)"?/);
+    return match ? match[1] : null;
+}
 
 /**
  * Hook for exporting workout history to CSV.
  *
  * @returns
  * - isExporting: Loading state during export
- * - exportToCSV: Trigger function that fetches all sessions and downloads CSV
+ * - exportToCSV: Trigger function that downloads the server's CSV export
  */
 export function useExport() {
     const [isExporting, setIsExporting] = useState(false);
@@ -33,27 +44,23 @@ export function useExport() {
         if (isExporting) return;
         setIsExporting(true);
         try {
-            const res = await fetch(`${API_URL}/api/sessions?limit=-1`);
-            const data = await handleApiResponse<Session[]>(res);
-            
-            const csvContent = 
-                "Date,Time,Exercise,Reps,Duration(s)\n" + 
-                data.map(s => {
-                    const d = new Date(s.timestamp * 1000);
-                    return `${d.toLocaleDateString()},${d.toLocaleTimeString()},${s.exercise},${s.reps},${s.duration || 0}`;
-                }).join("\n");
+            const res = await fetch(`${API_URL}/api/export?format=csv`);
+            if (!res.ok) {
+                throw new ApiError(res.status, res.statusText, `HTTP ${res.status}: ${res.statusText}`);
+            }
+            const blob = await res.blob();
 
-            const blob = new Blob([csvContent], { type: 'text/csv' });
             const url = window.URL.createObjectURL(blob);
             const a = document.createElement('a');
             a.href = url;
-            a.download = `formcheck_export_${new Date().toISOString().split('T')[0]}.csv`;
+            a.download = attachmentName(res.headers.get('Content-Disposition'))
+                ?? `formcheck_export_${new Date().toISOString().split('T')[0]}.csv`;
             a.click();
             window.URL.revokeObjectURL(url);
             toast.success("Export successful!");
         } catch (err) {
             console.error("Export failed", err);
-            const message = err instanceof ApiError 
+            const message = err instanceof ApiError
                 ? `Export failed: ${err.message}`
                 : 'Failed to export data. Please try again.';
             toast.error(message);
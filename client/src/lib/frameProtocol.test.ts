@@ -0,0 +1,67 @@
+import { describe, it, expect } from 'vitest';
+import { decodeResult, encodeFrame, FLAG_DELTA, FRAME_HEADER_SIZE, MSG_FRAME, MSG_RESULT } from './frameProtocol';
+
+describe('encodeFrame', () => {
+    it('writes the header little-endian followed by the JPEG bytes', () => {
+        const jpeg = new Uint8Array([0xff, 0xd8, 0x01, 0xff, 0xd9]).buffer;
+        const message = encodeFrame(jpeg, 1700000000123, 42);
+        const view = new DataView(message);
+
+        expect(message.byteLength).toBe(FRAME_HEADER_SIZE + 5);
+        expect(view.getUint8(0)).toBe(MSG_FRAME);
+        expect(view.getFloat64(1, true)).toBe(1700000000123);
+        expect(view.getUint32(9, true)).toBe(42);
+        expect(Array.from(new Uint8Array(message, FRAME_HEADER_SIZE))).toEqual([0xff, 0xd8, 0x01, 0xff, 0xd9]);
+    });
+
+    it('wraps the sequence number at 32 bits', () => {
+        const message = encodeFrame(new ArrayBuffer(1), 0, 2 ** 32 + 3);
+        expect(new DataView(message).getUint32(9, true)).toBe(3);
+    });
+});
+
+// Builds a RESULT the way server/app/core/protocol.py's LandmarkEncoder does
+function result(flags: number, block: number[][], fields: object): ArrayBuffer {
+    const stride = flags & FLAG_DELTA ? 4 : 7;
+    const tail = new TextEncoder().encode(JSON.stringify(fields));
+    const buffer = new ArrayBuffer(3 + block.length * stride + tail.length);
+    const view = new DataView(buffer);
+    view.setUint8(0, MSG_RESULT);
+    view.setUint8(1, flags);
+    view.setUint8(2, block.length);
+    block.forEach(([x, y, z, v], i) => {
+        const offset = 3 + i * stride;
+        if (flags & FLAG_DELTA) {
+            [x, y, z, v].forEach((d, j) => view.setInt8(offset + j, d));
+        } else {
+            view.setInt16(offset, x, true);
+            view.setInt16(offset + 2, y, true);
+            view.setInt16(offset + 4, z, true);
+            view.setUint8(offset + 6, v);
+        }
+    });
+    new Uint8Array(buffer, 3 + block.length * stride).set(tail);
+    return buffer;
+}
+
+describe('decodeResult', () => {
+    const keyframe = Array.from({ length: 22 }, () => [2048, 1024, -512, 255]);
+
+    it('maps a keyframe onto landmarks 11-32', () => {
+        const decoded = decodeResult(result(0, keyframe, { type: 'RESULT', reps: 3 }), null);
+
+        expect(decoded?.fields).toEqual({ type: 'RESULT', reps: 3 });
+        expect(decoded?.landmarks).toHaveLength(33);
+        expect(decoded?.landmarks[11]).toEqual({ x: 0.5, y: 0.25, z: -0.125, visibility: 1 });
+        expect(decoded?.landmarks[0].visibility).toBe(0);
+    });
+
+    it('applies deltas to the previous quantized block', () => {
+        const first = decodeResult(result(0, keyframe, {}), null);
+        const deltas = Array.from({ length: 22 }, () => [41, -1, 0, -255]);
+        const second = decodeResult(result(FLAG_DELTA, deltas, { type: 'RESULT' }), first!.quantized);
+
+        expect(second?.landmarks[32]).toEqual({ x: 2089 / 4096, y: 1023 / 4096, z: -0.125, visibility: 0 });
+        expect(decodeResult(result(FLAG_DELTA, deltas, {}), null)).toBeNull();
+    });
+});
@@ -0,0 +1,111 @@
+// frameProtocol.ts
+//
+// Binary WebSocket frame encoder and RESULT decoder (mirrors
+// server/app/core/protocol.py).
+//
+// Why Binary Frames:
+//   Base64 inside JSON inflates every JPEG by ~33% and forces the server to
+//   json.loads + base64-decode a 30-60KB string per frame. Binary frames
+//   carry the raw JPEG bytes behind a 13-byte header instead.
+//
+// Layout (little-endian):
+//   byte 0      uint8    message type (0x01 = FRAME)
+//   bytes 1-8   float64  client timestamp in ms (Date.now())
+//   bytes 9-12  uint32   per-connection sequence number
+//   bytes 13..  raw JPEG bytes
+//
+// Control messages (INIT) are still sent as JSON text.
+//
+// Compact RESULT (server → client, negotiated with format: "compact" in INIT):
+//   byte 0      uint8    message type (0x02 = RESULT)
+//   byte 1      uint8    flags (bit 0 = delta block)
+//   byte 2      uint8    landmark count (skeleton landmarks 11-32 in order)
+//   keyframe    count x  int16 x, y, z (value x 4096) + uint8 visibility (x 255)
+//   delta       count x  int8 differences of those four values from the last RESULT
+//   rest        UTF-8 JSON with the other RESULT fields (reps, feedback, ...)
+
+import type { Landmark } from '../types';
+
+export const FRAME_HEADER_SIZE = 13;
+export const MSG_FRAME = 0x01;
+export const MSG_RESULT = 0x02;
+export const RESULT_HEADER_SIZE = 3;
+export const FLAG_DELTA = 0x01;
+export const FIRST_OVERLAY_LANDMARK = 11;
+export const LANDMARK_COUNT = 33;
+const COORD_SCALE = 4096;
+const VISIBILITY_SCALE = 255;
+const KEYFRAME_STRIDE = 7;
+const DELTA_STRIDE = 4;
+
+/** A decoded compact RESULT. */
+export interface DecodedResult {
+    /** All 33 landmarks; the ones the server doesn't send have visibility 0 */
+    landmarks: Landmark[];
+    /** Quantized block to pass as `previous` for the next RESULT */
+    quantized: Int32Array;
+    /** The remaining RESULT fields (type, reps, feedback, ...) */
+    fields: Record<string, unknown>;
+}
+
+/**
+ * Packs a JPEG into a binary FRAME message.
+ *
+ * @param jpeg - Encoded JPEG bytes (e.g. from canvas.toBlob)
+ * @param timestamp - Capture time in ms, echoed back in RESULT
+ * @param seq - Frame sequence number, echoed back as `seq`
+ * @returns ArrayBuffer ready for WebSocket.send
+ */
+export function encodeFrame(jpeg: ArrayBuffer, timestamp: number, seq: number): ArrayBuffer {
+    const buffer = new ArrayBuffer(FRAME_HEADER_SIZE + jpeg.byteLength);
+    const view = new DataView(buffer);
+    view.setUint8(0, MSG_FRAME);
+    view.setFloat64(1, timestamp, true);
+    view.setUint32(9, seq >>> 0, true);
+    new Uint8Array(buffer, FRAME_HEADER_SIZE).set(new Uint8Array(jpeg));
+    return buffer;
+}
+
+/**
+ * Unpacks a binary RESULT message.
+ *
+ * @param buffer - Message data (WebSocket binaryType 'arraybuffer')
+ * @param previous - `quantized` from the last decoded RESULT, needed for deltas
+ * @returns Decoded landmarks and fields, or null for anything that isn't a
+ *          RESULT or a delta with no keyframe to apply it to
+ */
+export function decodeResult(buffer: ArrayBuffer, previous: Int32Array | null): DecodedResult | null {
+    const view = new DataView(buffer);
+    if (buffer.byteLength < RESULT_HEADER_SIZE || view.getUint8(0) !== MSG_RESULT) return null;
+    const delta = (view.getUint8(1) & FLAG_DELTA) !== 0;
+    const count = view.getUint8(2);
+    const quantized = new Int32Array(count * 4);
+    let offset = RESULT_HEADER_SIZE;
+
+    if (delta) {
+        if (!previous || previous.length !== quantized.length) return null;
+        for (let i = 0; i < quantized.length; i++) {
+            quantized[i] = previous[i] + view.getInt8(offset + i);
+        }
+        offset += count * DELTA_STRIDE;
+    } else {
+        for (let i = 0; i < count; i++, offset += KEYFRAME_STRIDE) {
+            quantized[i * 4] = view.getInt16(offset, true);
+            quantized[i * 4 + 1] = view.getInt16(offset + 2, true);
+            quantized[i * 4 + 2] = view.getInt16(offset + 4, true);
+            quantized[i * 4 + 3] = view.getUint8(offset + 6);
+        }
+    }
+
+    const landmarks: Landmark[] = Array.from({ length: LANDMARK_COUNT }, () => ({ x: 0, y: 0, z: 0, visibility: 0 }));
+    for (let i = 0; i < count; i++) {
+        landmarks[FIRST_OVERLAY_LANDMARK + i] = {
+            x: quantized[i * 4] / COORD_SCALE,
+            y: quantized[i * 4 + 1] / COORD_SCALE,
+            z: quantized[i * 4 + 2] / COORD_SCALE,
+            visibility: quantized[i * 4 + 3] / VISIBILITY_SCALE,
+        };
+    }
+    const fields = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, offset)));
+    return { landmarks, quantized, fields };
+}
@@ -44,6 +44,8 @@ export interface SessionCreate {
     exercise: string;
     reps: number;
     duration: number;
+    /** Workout token sent in INIT; the server drops its parked copy */
+    session?: string | null;
 }
 
 /** Full session record including server-generated fields */
@@ -0,0 +1,104 @@
+"""
+codec.py - JSON codec used on the WebSocket and REST hot paths.
+
+Every text message costs a JSON decode (INIT, legacy frames), every JSON
+RESULT / NO_DETECTION / CONTROL an encode, and the dashboard's list endpoints
+(/api/sessions?limit=-1, NDJSON export) encode thousands of rows per
+request. orjson does both several times faster than the stdlib json
+module and encodes straight to UTF-8 bytes, which is what the wire and
+Starlette's Response want anyway.
+
+Backends:
+    orjson  - orjson.dumps / orjson.loads. Serializes numpy arrays and
+              scalars natively and accepts non-str dict keys, like json.
+    stdlib  - json.dumps with compact separators / json.loads. Always
+              available; used when orjson isn't installed.
+
+Both produce the same JSON values (orjson writes NaN as null where json
+writes the invalid literal NaN). Decode errors are json.JSONDecodeError for
+both backends (orjson.JSONDecodeError subclasses it), so callers catch one
+exception type.
+
+Environment:
+    - JSON_CODEC: "orjson", "stdlib" or "auto" (orjson if installed; default)
+
+Usage:
+    from app import codec
+    data = codec.loads(message["text"])
+    await websocket.send_text(codec.dumps_text(response))
+    app = FastAPI(default_response_class=codec.CodecJSONResponse)
+"""
+
+import json
+import os
+from typing import Any, Callable, NamedTuple, Union
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib backend covers everything
+    orjson = None
+
+JSON_CODEC = os.getenv("JSON_CODEC", "auto").lower()
+
+DecodeError = json.JSONDecodeError
+
+
+class JSONCodec(NamedTuple):
+    name: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[Union[str, bytes]], Any]
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+STDLIB = JSONCodec("stdlib", _stdlib_dumps, json.loads)
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def _orjson_dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+
+    ORJSON = JSONCodec("orjson", _orjson_dumps, orjson.loads)
+else:
+    ORJSON = None
+
+
+def get_codec(name: str = JSON_CODEC) -> JSONCodec:
+    """
+    Resolve a backend by name.
+
+    Raises:
+        ValueError: Unknown name, or "orjson" when it isn't installed.
+    """
+    if name == "auto":
+        return ORJSON or STDLIB
+    if name == "stdlib":
+        return STDLIB
+    if name == "orjson":
+        if ORJSON is None:
+            raise ValueError("JSON_CODEC=orjson but orjson is not installed")
+        return ORJSON
+    raise ValueError(f"Unknown JSON_CODEC: {name}")
+
+
+codec = get_codec()
+# Bound once: these run per frame
+dumps = codec.dumps
+loads = codec.loads
+
+
+def dumps_text(obj: Any) -> str:
+    """JSON as str, for WebSocket text messages and text streams."""
+    return dumps(obj).decode()
+
+
+class CodecJSONResponse(JSONResponse):
+    """JSONResponse rendered with the configured codec."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,82 @@
+"""
+backpressure.py - Latest-frame-wins mailbox for the WebSocket pipeline.
+
+When inference is slower than the client's 15 FPS capture rate, reading and
+processing frames strictly in order lets them pile up in the socket buffer:
+feedback then lags further and further behind the user's movement.
+
+Instead, a per-connection receive task drains the socket as fast as frames
+arrive and put()s each one into a single-slot mailbox. A frame still waiting
+when the next one lands is dropped, so the processing loop always picks up
+the newest frame and end-to-end latency stays bounded at roughly one
+inference time, however overloaded the server is.
+
+Accounting:
+    received  - frames read off the socket
+    dropped   - frames overwritten before processing started
+    processed - frames handed to the pipeline
+    (received == dropped + processed, plus the pending frame if any)
+
+Thread Safety:
+    Event-loop only, like ConnectionManager; no locks needed.
+"""
+
+import asyncio
+from typing import Any, Dict, Optional
+
+
+class LatestFrameSlot:
+    def __init__(self):
+        self._frame: Optional[Any] = None
+        self._ready = asyncio.Event()
+        self._closed = False
+        self.received = 0
+        self.dropped = 0
+        self.processed = 0
+
+    def put(self, frame: Any) -> bool:
+        """
+        Store a frame, replacing any pending one.
+
+        Returns:
+            True if a pending frame was dropped to make room.
+        """
+        dropped = self._frame is not None
+        if dropped:
+            self.dropped += 1
+        self._frame = frame
+        self.received += 1
+        self._ready.set()
+        return dropped
+
+    async def get(self) -> Optional[Any]:
+        """
+        Wait for the newest frame.
+
+        Returns:
+            The pending frame, or None once the slot is closed.
+        """
+        while self._frame is None:
+            if self._closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+
+        frame, self._frame = self._frame, None
+        self.processed += 1
+        return frame
+
+    def close(self):
+        """Signal end of stream. A pending frame is dropped; get() returns None."""
+        if self._frame is not None:
+            self.dropped += 1
+            self._frame = None
+        self._closed = True
+        self._ready.set()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "received": self.received,
+            "processed": self.processed,
+            "dropped": self.dropped,
+        }
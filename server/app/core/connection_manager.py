@@ -6,9 +6,9 @@ Provides connect/disconnect handlers and utilities for unicast and broadcast
 messaging (though this app primarily uses unicast per-client responses).
 
 Connection Limit:
-    The main app enforces a 20-connection cap using this manager's
-    active_connections count. This prevents resource exhaustion from
-    too many concurrent pose detection pipelines.
+    The MAX_WS_CONNECTIONS cap (which prevents resource exhaustion from too
+    many concurrent pose detection pipelines) is enforced across workers by
+    app/session_store.py; active_connections only lists this process's.
 
 Thread Safety:
     FastAPI's WebSocket handlers are async, so we don't need explicit
@@ -0,0 +1,152 @@
+"""
+detector_pool.py - Bounded pool of reusable PoseDetector instances.
+
+A MediaPipe PoseDetector costs ~200MB and a noticeable startup delay, so
+building one per WebSocket connection makes connect latency and resident
+memory grow with every session. This pool keeps detectors alive between
+sessions instead:
+
+    - Checkout/return: acquire() hands out an idle detector (or builds one
+      while under the cap); release() resets it and puts it back.
+    - Warm preloading: preload() builds detectors ahead of the first client.
+    - Hard cap: never more than max_size instances exist at once.
+
+Tracking State:
+    MediaPipe smooths landmarks across frames. A detector returned by one
+    session still remembers that person's last pose, so release() calls
+    reset() before the detector can be reassigned.
+
+Thread Safety:
+    Guarded by a Condition so inline inference (thread pool) can share one
+    pool. Inside worker processes only one thread touches it.
+
+Usage:
+    pool = DetectorPool(PoseDetector, max_size=10, preload=2)
+    detector = pool.acquire()
+    try:
+        detector.process_frame(frame)
+    finally:
+        pool.release(detector)
+"""
+
+import threading
+from typing import Callable, List, Optional
+
+from app.core.pose_detector import PoseDetector
+
+
+class PoolExhaustedError(Exception):
+    """Raised when every detector is checked out and the cap is reached."""
+
+
+class DetectorPool:
+    def __init__(
+        self,
+        factory: Callable[[], PoseDetector] = PoseDetector,
+        max_size: int = 4,
+        preload: int = 0,
+    ):
+        self.factory = factory
+        self.max_size = max(1, max_size)
+        self._idle: List[PoseDetector] = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        if preload:
+            self.preload(preload)
+
+    @property
+    def size(self) -> int:
+        """Total detectors alive (idle + checked out)."""
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    @property
+    def in_use(self) -> int:
+        return self._size - len(self._idle)
+
+    def preload(self, count: int):
+        """Build up to `count` idle detectors ahead of demand (capped)."""
+        with self._cond:
+            while self._size < min(count, self.max_size):
+                self._idle.append(self.factory())
+                self._size += 1
+
+    def acquire(self, timeout: Optional[float] = 0) -> PoseDetector:
+        """
+        Check out a detector.
+
+        Args:
+            timeout: Seconds to wait for a release when the pool is at its
+                cap. 0 fails immediately, None waits forever.
+
+        Raises:
+            PoolExhaustedError: No detector became available in time.
+        """
+        with self._cond:
+            if self._closed:
+                raise PoolExhaustedError("Detector pool is closed")
+
+            if (
+                not self._idle
+                and self._size >= self.max_size
+                and (
+                    timeout == 0
+                    or not self._cond.wait_for(
+                        lambda: self._idle or self._size < self.max_size, timeout
+                    )
+                )
+            ):
+                raise PoolExhaustedError(f"All {self.max_size} detectors are in use")
+
+            if self._idle:
+                return self._idle.pop()
+
+            # Reserve the slot before building so concurrent callers respect the cap
+            self._size += 1
+
+        try:
+            return self.factory()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, detector: PoseDetector):
+        """Reset a detector's tracking state and return it to the pool."""
+        try:
+            detector.reset()
+        except Exception:
+            # A detector that can't reset is not safe to hand to someone else
+            self._discard(detector)
+            return
+
+        with self._cond:
+            if not self._closed:
+                self._idle.append(detector)
+                self._cond.notify()
+                return
+
+        self._discard(detector)
+
+    def _discard(self, detector: PoseDetector):
+        try:
+            detector.close()
+        finally:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+
+    def close(self):
+        """Close all idle detectors. Checked-out ones are closed on release."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._closed = True
+        for detector in idle:
+            detector.close()
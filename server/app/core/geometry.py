@@ -14,16 +14,31 @@ Coordinate System:
     dimensions. These work directly for angle calculations since we only
     care about relative positions.
 
+Batched Angles:
+    calculate_angle() is for one-off angles. The frame pipeline uses
+    calculate_angles(), which takes a whole landmark array plus a table of
+    (a, b, c) index triples and returns every requested angle in one
+    vectorized pass. It also accepts a (frames, 33, 4) stack for offline
+    analysis, returning a (frames, n_angles) matrix.
+
 Usage:
-    from app.core.geometry import calculate_angle
+    from app.core.geometry import calculate_angle, calculate_angles
     elbow_angle = calculate_angle(shoulder, elbow, wrist)  # Returns 0-180°
+    angles = calculate_angles(landmarks, [(11, 13, 15), (23, 25, 27)])
 """
 
+import math
+from typing import Sequence, Tuple
+
 import numpy as np
-from app.schemas import Landmark
+from app.schemas import Landmark, LandmarkArray, LandmarkPoint
 
 
-def calculate_angle(a: Landmark, b: Landmark, c: Landmark) -> float:
+def calculate_angle(
+    a: Landmark | LandmarkPoint,
+    b: Landmark | LandmarkPoint,
+    c: Landmark | LandmarkPoint,
+) -> float:
     """
     Calculate the angle at vertex 'b' formed by points a-b-c.
 
@@ -51,22 +66,60 @@ def calculate_angle(a: Landmark, b: Landmark, c: Landmark) -> float:
         Angles > 180° are automatically normalized by subtracting from 360°
         to ensure consistent representation.
     """
-    # Use numpy for vectorization benefits later if needed,
-    # but for single point it's just basic trig.
+    # Plain math: for a single angle, building tiny numpy arrays costs more
+    # than the trig itself. Vectorized work goes through calculate_angles().
 
     # We use x and y for 2D angle
     # Check if visibility is good enough? The caller should probably handle that.
 
-    a_arr = np.array([a.x, a.y])
-    b_arr = np.array([b.x, b.y])
-    c_arr = np.array([c.x, c.y])
-
-    radians = np.arctan2(c_arr[1] - b_arr[1], c_arr[0] - b_arr[0]) - np.arctan2(
-        a_arr[1] - b_arr[1], a_arr[0] - b_arr[0]
-    )
-    angle = np.abs(radians * 180.0 / np.pi)
+    radians = math.atan2(c.y - b.y, c.x - b.x) - math.atan2(a.y - b.y, a.x - b.x)
+    angle = abs(radians * 180.0 / math.pi)
 
     if angle > 180.0:
         angle = 360 - angle
 
     return angle
+
+
+def calculate_angles(
+    landmarks: LandmarkArray | np.ndarray,
+    triples: Sequence[Tuple[int, int, int]] | np.ndarray,
+) -> np.ndarray:
+    """
+    Calculate many joint angles at once (vertex at the middle index).
+
+    Same math as calculate_angle(), vectorized over every (a, b, c) triple
+    and, optionally, over a stack of frames.
+
+    Args:
+        landmarks: LandmarkArray, a (33, 4) array, or a (frames, 33, 4)
+            stack. Only columns 0-1 (x, y) are used.
+        triples: (n, 3) landmark indices, e.g. [(11, 13, 15)] for the
+            left elbow.
+
+    Returns:
+        np.ndarray: (n,) angles in degrees for a single frame, or
+        (frames, n) for a stack. Range [0, 180].
+
+    Raises:
+        IndexError: A triple references a landmark the frame doesn't have.
+
+    Example:
+        >>> angles = calculate_angles(landmarks, [(11, 13, 15), (23, 25, 27)])
+        >>> elbow, knee = angles
+    """
+    data = landmarks.data if isinstance(landmarks, LandmarkArray) else landmarks
+    idx = np.asarray(triples, dtype=np.intp).reshape(-1, 3)
+
+    # float64 so results match calculate_angle() exactly at thresholds
+    xy = np.asarray(data[..., :2], dtype=np.float64)
+    a = xy[..., idx[:, 0], :]
+    b = xy[..., idx[:, 1], :]
+    c = xy[..., idx[:, 2], :]
+
+    ba = a - b
+    bc = c - b
+    radians = np.arctan2(bc[..., 1], bc[..., 0]) - np.arctan2(ba[..., 1], ba[..., 0])
+    angles = np.abs(radians * 180.0 / np.pi)
+
+    return np.where(angles > 180.0, 360.0 - angles, angles)
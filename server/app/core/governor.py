@@ -0,0 +1,194 @@
+"""
+governor.py - Load governor for the real-time frame pipeline.
+
+Latest-frame-wins backpressure (app/core/backpressure.py) keeps latency
+bounded when inference falls behind, but only by dropping frames: once the
+box is saturated every session loses frames and feedback gets choppy at the
+same time, with nothing actually making the work cheaper.
+
+LoadGovernor watches two signals and moves every session along a ladder of
+load levels, each pairing a MediaPipe model complexity with the capture
+rate and JPEG quality the client is asked to use:
+
+    level     complexity  fps  jpeg_quality
+    high      2           15   0.7   (only if GOVERNOR_MAX_COMPLEXITY >= 2)
+    normal    1           15   0.6   (client and detector defaults)
+    reduced   0           12   0.5
+    minimal   0           8    0.4
+
+Signals:
+    - Queue depth: Frames handed to the InferenceExecutor and not yet
+      returned, per worker process. Above 1 frames wait behind each other.
+    - Latency: Exponentially weighted average of the inference round trip
+      (submit → result), compared against GOVERNOR_TARGET_MS.
+
+Decisions:
+    Evaluated at most once per GOVERNOR_INTERVAL seconds. Over target (or
+    queue depth above GOVERNOR_MAX_DEPTH) steps one level down; a step back
+    up needs GOVERNOR_RECOVER_INTERVALS consecutive evaluations with latency
+    under half the target and no queueing, so the level doesn't flap.
+
+Applying a Level:
+    The governor only decides. The /ws handler compares each connection's
+    applied level with governor.level after every frame and, on a change,
+    switches the session's detector (InferenceExecutor.set_model_complexity)
+    and sends the client a CONTROL message:
+
+        {"type": "CONTROL", "level": "reduced", "model_complexity": 0,
+         "fps": 12, "jpeg_quality": 0.5}
+
+Complexity 2 (Heavy) is opt-in: its model isn't bundled with the mediapipe
+wheel and is downloaded on first use.
+
+Thread Safety:
+    Event-loop only, like LatestFrameSlot; no locks needed.
+
+Environment:
+    - GOVERNOR_ENABLED: Adapt levels to load (default: true)
+    - GOVERNOR_TARGET_MS: Inference round-trip budget (default: 66, one frame at 15 FPS)
+    - GOVERNOR_MAX_DEPTH: Tolerated in-flight frames per worker (default: 1.5)
+    - GOVERNOR_INTERVAL: Seconds between decisions (default: 2)
+    - GOVERNOR_RECOVER_INTERVALS: Calm evaluations before stepping up (default: 3)
+    - GOVERNOR_MAX_COMPLEXITY: Highest model complexity used (default: 1)
+
+Usage:
+    governor = LoadGovernor(workers=inference.workers)
+    with governor.track():
+        result, timings = await inference.process(session_id, frame)
+    level = governor.level
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, NamedTuple, Tuple
+
+GOVERNOR_ENABLED = os.getenv("GOVERNOR_ENABLED", "true").lower() == "true"
+GOVERNOR_TARGET_MS = float(os.getenv("GOVERNOR_TARGET_MS", "66"))
+GOVERNOR_MAX_DEPTH = float(os.getenv("GOVERNOR_MAX_DEPTH", "1.5"))
+GOVERNOR_INTERVAL = float(os.getenv("GOVERNOR_INTERVAL", "2"))
+GOVERNOR_RECOVER_INTERVALS = int(os.getenv("GOVERNOR_RECOVER_INTERVALS", "3"))
+GOVERNOR_MAX_COMPLEXITY = int(os.getenv("GOVERNOR_MAX_COMPLEXITY", "1"))
+
+# Weight of the newest latency sample in the moving average
+LATENCY_SMOOTHING = 0.2
+
+
+class LoadLevel(NamedTuple):
+    name: str
+    model_complexity: int
+    fps: int
+    jpeg_quality: float
+
+    def control_message(self) -> Dict:
+        """CONTROL message asking the client to capture at this level."""
+        return {
+            "type": "CONTROL",
+            "level": self.name,
+            "model_complexity": self.model_complexity,
+            "fps": self.fps,
+            "jpeg_quality": self.jpeg_quality,
+        }
+
+
+# Best first; "normal" matches the client defaults (client/src/lib/constants.ts)
+LOAD_LEVELS: Tuple[LoadLevel, ...] = (
+    LoadLevel("high", 2, 15, 0.7),
+    LoadLevel("normal", 1, 15, 0.6),
+    LoadLevel("reduced", 0, 12, 0.5),
+    LoadLevel("minimal", 0, 8, 0.4),
+)
+DEFAULT_LEVEL = LOAD_LEVELS[1]
+
+
+class LoadGovernor:
+    def __init__(
+        self,
+        workers: int = 1,
+        target_ms: float = GOVERNOR_TARGET_MS,
+        max_depth: float = GOVERNOR_MAX_DEPTH,
+        interval: float = GOVERNOR_INTERVAL,
+        recover_intervals: int = GOVERNOR_RECOVER_INTERVALS,
+        max_complexity: int = GOVERNOR_MAX_COMPLEXITY,
+        enabled: bool = GOVERNOR_ENABLED,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.workers = max(1, workers)
+        self.target = target_ms / 1000
+        self.max_depth = max_depth
+        self.interval = interval
+        self.recover_intervals = max(1, recover_intervals)
+        self.enabled = enabled
+        self.clock = clock
+        self.levels = tuple(
+            level for level in LOAD_LEVELS if level.model_complexity <= max_complexity
+        )
+        # Start at the default level, or the best one allowed below it
+        self._index = next(
+            i
+            for i, level in enumerate(self.levels)
+            if level.model_complexity <= DEFAULT_LEVEL.model_complexity
+        )
+        self.inflight = 0
+        self.latency = 0.0
+        self._peak_depth = 0.0
+        self._calm = 0
+        self._next_check = clock() + interval
+
+    @property
+    def level(self) -> LoadLevel:
+        return self.levels[self._index]
+
+    @property
+    def depth(self) -> float:
+        """In-flight frames per worker right now."""
+        return self.inflight / self.workers
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """Count the enclosed inference call towards queue depth and latency."""
+        self.inflight += 1
+        self._peak_depth = max(self._peak_depth, self.depth)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.inflight -= 1
+            self.observe(time.perf_counter() - start)
+
+    def observe(self, seconds: float):
+        """Fold one inference round trip into the average and maybe re-level."""
+        if self.latency:
+            self.latency += LATENCY_SMOOTHING * (seconds - self.latency)
+        else:
+            self.latency = seconds
+
+        now = self.clock()
+        if now >= self._next_check:
+            self._next_check = now + self.interval
+            self._evaluate()
+
+    def _evaluate(self):
+        depth, self._peak_depth = self._peak_depth, self.depth
+        if not self.enabled:
+            return
+
+        if self.latency > self.target or depth > self.max_depth:
+            self._calm = 0
+            self._index = min(self._index + 1, len(self.levels) - 1)
+        elif self.latency < self.target / 2 and depth <= 1:
+            self._calm += 1
+            if self._calm >= self.recover_intervals and self._index > 0:
+                self._calm = 0
+                self._index -= 1
+                # Judge the new level on its own samples
+                self.latency = 0.0
+        else:
+            self._calm = 0
+
+    def stats(self) -> Dict:
+        return {
+            "level": self.level.name,
+            "inflight": self.inflight,
+            "latency_ms": round(self.latency * 1000, 2),
+        }
@@ -0,0 +1,296 @@
+"""
+inference.py - Off-event-loop pose inference executor.
+
+Runs PoseDetector.process_frame in a pool of worker processes so that a
+30-50ms MediaPipe inference never blocks the asyncio event loop that serves
+every WebSocket and REST request.
+
+Why Processes (not threads):
+    MediaPipe inference and JPEG decoding are CPU-bound and hold the GIL for
+    a large part of each frame. Worker processes let 20 clients at 15 FPS use
+    all available CPU cores in parallel.
+
+Session Affinity:
+    MediaPipe tracking (smooth_landmarks) is stateful, so every frame of a
+    session must reach the same PoseDetector instance. Each worker slot is a
+    single-process executor with its own DetectorPool; a session checks out
+    one detector on open, is pinned to that slot for its whole lifetime
+    (the least-loaded slot at open time), and returns the detector on close.
+
+Capacity:
+    MAX_DETECTORS is split evenly across workers. The executor tracks how
+    many sessions each slot holds, so open_session() fails fast with
+    PoolExhaustedError instead of blocking a worker on a full pool.
+
+Crash Recovery:
+    A worker that dies mid-frame (a segfault or the OOM killer inside
+    MediaPipe) breaks its executor for good. The first call to see
+    BrokenProcessPool replaces that slot's executor and re-opens a fresh
+    detector for every session pinned to it; the failed call still raises,
+    so the frame is dropped, and the sessions carry on from the next frame
+    with reset tracking state.
+
+Inline Mode:
+    INFERENCE_WORKERS=0 runs detectors in this process on the default thread
+    pool. Useful for tests and `uvicorn --reload` development.
+
+Environment:
+    - INFERENCE_WORKERS: Number of worker processes (default: CPU count)
+    - MAX_DETECTORS: Cap on PoseDetector instances across all workers (default: 20)
+    - DETECTOR_PRELOAD: Detectors warmed per worker at startup (default: 1)
+
+Usage:
+    executor = InferenceExecutor()
+    executor.start()
+    session_id = await executor.open_session()
+    result, timings = await executor.process(session_id, jpeg)  # base64 str or bytes
+    await executor.close_session(session_id)
+"""
+
+import asyncio
+import math
+import os
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Tuple
+
+import structlog
+
+from app.core.detector_pool import DetectorPool, PoolExhaustedError
+from app.core.pose_detector import PoseDetector
+from app.schemas import PoseResult
+
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(os.cpu_count() or 1)))
+MAX_DETECTORS = int(os.getenv("MAX_DETECTORS", "20"))
+DETECTOR_PRELOAD = int(os.getenv("DETECTOR_PRELOAD", "1"))
+
+logger = structlog.get_logger()
+
+
+# ---------------------------------------------------------------------------
+# Worker-side state
+#
+# These globals live inside each worker process (or inside the server
+# process in inline mode). They are only touched by the functions below,
+# which run on the worker.
+# ---------------------------------------------------------------------------
+
+_pool: Optional[DetectorPool] = None
+_detectors: Dict[str, PoseDetector] = {}
+
+
+def _worker_init(
+    detector_factory: Callable[[], PoseDetector], max_size: int, preload: int
+):
+    """Process initializer: build this worker's pool and warm it up."""
+    global _pool
+    _pool = DetectorPool(detector_factory, max_size=max_size)
+    _detectors.clear()
+    try:
+        _pool.preload(preload)
+    except Exception as e:
+        # Not fatal: detectors are built on demand in open_session instead
+        logger.error("detector_preload_failed", error=str(e))
+
+
+def _worker_ping() -> int:
+    return os.getpid()
+
+
+def _worker_open_session(session_id: str):
+    _detectors[session_id] = _pool.acquire()
+
+
+def _worker_process_frame(
+    session_id: str, payload
+) -> Tuple[Optional[PoseResult], Dict[str, float]]:
+    detector = _detectors[session_id]
+    result = detector.process_frame(payload)
+    return result, getattr(detector, "last_timings", {})
+
+
+def _worker_set_model_complexity(session_id: str, model_complexity: int):
+    detector = _detectors[session_id]
+    # Test doubles may not implement it; the frame pipeline works regardless
+    setter = getattr(detector, "set_model_complexity", None)
+    if setter is not None:
+        setter(model_complexity)
+
+
+def _worker_close_session(session_id: str):
+    detector = _detectors.pop(session_id, None)
+    if detector is not None:
+        _pool.release(detector)
+
+
+def _worker_shutdown():
+    for session_id in list(_detectors):
+        _worker_close_session(session_id)
+    if _pool is not None:
+        _pool.close()
+
+
+# ---------------------------------------------------------------------------
+# Server-side executor
+# ---------------------------------------------------------------------------
+
+
+class InferenceExecutor:
+    """
+    Dispatches frames to worker processes and awaits the PoseResult.
+
+    Args:
+        workers: Number of worker processes. 0 runs inline on threads.
+        detector_factory: Picklable callable returning a PoseDetector-like
+            object (process_frame/reset/close). Overridable for tests.
+        max_detectors: Cap on detector instances across all workers.
+        preload: Detectors built per worker before the first session.
+    """
+
+    def __init__(
+        self,
+        workers: int = INFERENCE_WORKERS,
+        detector_factory: Callable[[], PoseDetector] = PoseDetector,
+        max_detectors: int = MAX_DETECTORS,
+        preload: int = DETECTOR_PRELOAD,
+    ):
+        self.workers = max(0, workers)
+        self.detector_factory = detector_factory
+        self.slot_capacity = math.ceil(max(1, max_detectors) / max(1, self.workers))
+        self.preload = min(preload, self.slot_capacity)
+        self._slots: List[Executor] = []
+        self._slot_load: List[int] = []
+        self._assignments: Dict[str, int] = {}
+
+    @property
+    def started(self) -> bool:
+        return bool(self._slots)
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of concurrent inference sessions."""
+        return self.slot_capacity * max(1, self.workers)
+
+    @property
+    def active_sessions(self) -> int:
+        return len(self._assignments)
+
+    def start(self):
+        """Spin up worker slots and warm their pools. Safe to call twice."""
+        if self.started:
+            return
+
+        if self.workers == 0:
+            # Inline: share the worker-side globals of this process
+            _worker_init(self.detector_factory, self.slot_capacity, self.preload)
+            self._slots = [None]  # type: ignore[list-item]
+        else:
+            self._slots = [self._spawn_worker() for _ in range(self.workers)]
+        self._slot_load = [0] * len(self._slots)
+
+    def _spawn_worker(self) -> ProcessPoolExecutor:
+        pool = ProcessPoolExecutor(
+            max_workers=1,
+            initializer=_worker_init,
+            initargs=(self.detector_factory, self.slot_capacity, self.preload),
+        )
+        # Executors fork lazily; a ping forces the worker (and its preload)
+        # to start now instead of on the first client's frame.
+        pool.submit(_worker_ping)
+        return pool
+
+    async def open_session(self) -> str:
+        """
+        Check out a detector on the least-loaded worker slot.
+
+        Raises:
+            PoolExhaustedError: Every slot is at capacity.
+        """
+        self.start()
+        slot = min(range(len(self._slots)), key=self._slot_load.__getitem__)
+        if self._slot_load[slot] >= self.slot_capacity:
+            raise PoolExhaustedError(f"All {self.capacity} detectors are in use")
+
+        session_id = uuid.uuid4().hex
+        self._assignments[session_id] = slot
+        self._slot_load[slot] += 1
+        try:
+            await self._run(session_id, _worker_open_session, session_id)
+        except BaseException:
+            self._release_slot(session_id)
+            raise
+        return session_id
+
+    async def _run(self, session_id: str, fn, *args):
+        slot = self._assignments[session_id]
+        pool = self._slots[slot]
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(pool, fn, *args)
+        except BrokenProcessPool:
+            self._restart_slot(slot, pool)
+            raise
+
+    def _restart_slot(self, slot: int, broken: Executor):
+        """Replace a dead worker and rebuild the detectors of its sessions."""
+        if self._slots[slot] is not broken:
+            return  # Another session on this slot already restarted it
+        broken.shutdown(wait=False, cancel_futures=True)
+        pool = self._slots[slot] = self._spawn_worker()
+        sessions = [sid for sid, s in self._assignments.items() if s == slot]
+        # One process per slot runs calls in order, so these opens land
+        # before any frame submitted after them
+        for session_id in sessions:
+            pool.submit(_worker_open_session, session_id)
+        logger.error("inference_worker_restarted", slot=slot, sessions=len(sessions))
+
+    def _release_slot(self, session_id: str):
+        slot = self._assignments.pop(session_id)
+        self._slot_load[slot] -= 1
+
+    async def process(
+        self, session_id: str, payload
+    ) -> Tuple[Optional[PoseResult], Dict[str, float]]:
+        """
+        Run pose detection for one frame of a session off the event loop.
+
+        Returns:
+            (PoseResult or None, per-stage seconds measured on the worker)
+        """
+        if self.workers and isinstance(payload, memoryview):
+            # Views can't be pickled; the IPC hop copies the bytes regardless
+            payload = payload.tobytes()
+        return await self._run(session_id, _worker_process_frame, session_id, payload)
+
+    async def set_model_complexity(self, session_id: str, model_complexity: int):
+        """Switch the session's detector model (see app/core/governor.py)."""
+        await self._run(
+            session_id, _worker_set_model_complexity, session_id, model_complexity
+        )
+
+    async def close_session(self, session_id: str):
+        """Return the session's detector to its worker's pool."""
+        if session_id not in self._assignments:
+            return
+        try:
+            await self._run(session_id, _worker_close_session, session_id)
+        finally:
+            self._release_slot(session_id)
+
+    def shutdown(self):
+        """Stop all workers, closing any detectors they still hold."""
+        if self.workers == 0:
+            if self.started:
+                _worker_shutdown()
+        else:
+            closing = [pool.submit(_worker_shutdown) for pool in self._slots]
+            for pool, done in zip(self._slots, closing):
+                try:
+                    done.result()
+                except BrokenProcessPool:
+                    pass  # A dead worker has no detectors left to close
+                pool.shutdown(wait=True, cancel_futures=True)
+        self._slots = []
+        self._slot_load = []
+        self._assignments.clear()
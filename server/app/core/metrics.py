@@ -0,0 +1,121 @@
+"""
+metrics.py - Prometheus metrics for the real-time frame pipeline.
+
+Replaces the hand-measured numbers in pose_detector.py with histograms
+recorded on our own hardware, so p50/p95/p99 per stage can be watched in
+production (histogram_quantile over the /metrics scrape).
+
+Frame Stages (label `stage` on formcheck_frame_stage_seconds):
+    json_parse     - JSON decode of a text message (legacy frames + control)
+    base64_decode  - base64 → bytes (legacy JSON frames only)
+    jpeg_decode    - cv2.imdecode (reduced-size when INFERENCE_SIZE allows)
+    motion_gate    - Thumbnail diff against the last inferred frame
+    resize         - Downscale to INFERENCE_SIZE (0 when already small enough)
+    color_convert  - BGR → RGB
+    inference      - MediaPipe pose.process
+    strategy       - ExerciseStrategy.process
+    serialize      - response encode (app/codec.py JSON or compact binary)
+    total          - inference round-trip + strategy + send, per frame
+
+Motion Gate:
+    formcheck_motion_gate_frames_total{outcome="inferred|skipped"} counts
+    frames the gate let through to inference vs. served from the previous
+    result. Skip ratio:
+        rate(..{outcome="skipped"}[5m]) / rate(formcheck_motion_gate_frames_total[5m])
+
+Worker Processes:
+    Decode/convert/inference run inside InferenceExecutor workers, so the
+    detector records them in `last_timings` and the executor ships them
+    back with the result. All observations happen in the server process,
+    which keeps the default (single-process) registry correct. Under
+    `uvicorn --workers N` each worker has its own registry, so a /metrics
+    scrape only covers the worker that served it.
+
+Usage:
+    with timed("strategy"):
+        result = strategy.process(landmarks)
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Per-frame work sits in the 1-100ms range; stretch up to 1s for overload
+STAGE_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.02,
+    0.03,
+    0.04,
+    0.05,
+    0.075,
+    0.1,
+    0.15,
+    0.25,
+    0.5,
+    1.0,
+)
+
+FRAME_STAGE_SECONDS = Histogram(
+    "formcheck_frame_stage_seconds",
+    "Time spent per frame in each pipeline stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+
+FRAMES_TOTAL = Counter(
+    "formcheck_frames_total",
+    "Frames received over WebSocket, by outcome",
+    ["outcome"],  # processed | dropped
+)
+
+MOTION_GATE_FRAMES = Counter(
+    "formcheck_motion_gate_frames_total",
+    "Frames checked by the motion gate, by outcome",
+    ["outcome"],  # inferred | skipped
+)
+
+ACTIVE_SESSIONS = Gauge(
+    "formcheck_active_sessions", "WebSocket sessions currently streaming frames"
+)
+
+INFERENCE_SESSIONS = Gauge(
+    "formcheck_inference_sessions", "Pooled PoseDetectors currently checked out"
+)
+
+INFERENCE_CAPACITY = Gauge(
+    "formcheck_inference_capacity", "Maximum concurrent inference sessions"
+)
+
+LOAD_LEVEL = Gauge(
+    "formcheck_load_level",
+    "Load governor level (index into LOAD_LEVELS, 0 = best quality)",
+)
+
+
+@contextmanager
+def timed(stage: str):
+    """Observe the duration of the enclosed block for `stage`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        FRAME_STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+
+def observe_stages(timings: Dict[str, float]):
+    """Record stage durations (seconds) measured elsewhere, e.g. in a worker."""
+    for stage, seconds in timings.items():
+        FRAME_STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def observe_motion_gate(timings: Dict[str, float]):
+    """Count a frame's motion gate outcome from the detector's stage timings."""
+    if "motion_gate" in timings:
+        outcome = "inferred" if "inference" in timings else "skipped"
+        MOTION_GATE_FRAMES.labels(outcome).inc()
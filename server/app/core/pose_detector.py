@@ -2,7 +2,8 @@
 pose_detector.py - MediaPipe Pose detection wrapper.
 
 Wraps Google's MediaPipe Pose solution to extract 33 body landmarks from
-video frames received as base64-encoded JPEG strings via WebSocket.
+video frames received via WebSocket, either as base64-encoded JPEG strings
+(JSON mode) or as raw JPEG bytes (binary mode, see app/core/protocol.py).
 
 Why Server-Side Processing:
     Running pose detection on the server rather than in-browser allows us
@@ -14,6 +15,73 @@ Model Complexity Trade-off:
     - 1 (Full): Balanced. Used here as default.
     - 2 (Heavy): Most accurate, slowest. For precision-critical apps.
 
+    The load governor (app/core/governor.py) switches sessions between
+    complexities at runtime via set_model_complexity(). Each model is built
+    once per detector and kept, so switching back and forth is cheap;
+    reset() returns to the default before the detector is reused.
+
+Region of Interest (ROI_CROP):
+    The person usually fills only part of the frame, and the previous
+    frame's landmarks say which part. After a detection the detector keeps
+    a box around the visible landmarks (plus ROI_MARGIN of the body size on
+    every side) and runs the next frame's color conversion and inference on
+    that crop only; landmarks are mapped back to full-frame normalized
+    coordinates, so callers never see the crop.
+
+    - Hysteresis: The box is only recomputed when the body nears its edge
+      (or shrinks well inside it), so MediaPipe's tracking and smoothing
+      see a stable input window instead of one that shifts every frame.
+    - Fallback: If no pose is found in the crop, the same frame is re-run
+      at full size and cropping stays off until the next detection.
+    - Crops covering most of the frame (ROI_MAX_AREA) aren't worth it and
+      are skipped. JPEG decode still covers the whole frame.
+
+Input Resolution (INFERENCE_SIZE):
+    MediaPipe resizes its input down to a 256px model tensor internally, so
+    decoding and color-converting a large frame at full size mostly makes
+    pixels that are thrown away. Inference input is capped at
+    INFERENCE_SIZE pixels on its longest side:
+
+    - Reduced decode: libjpeg can decode at 1/2, 1/4 or 1/8 scale almost
+      for free (IMREAD_REDUCED_COLOR_*). The detector remembers the source
+      size of the last frame and picks the largest reduction that still
+      leaves the region it will look at (the ROI, or the whole frame) at
+      least INFERENCE_SIZE pixels long.
+    - Downscale: Whatever is still larger after cropping is resized
+      (INTER_LINEAR; INTER_AREA costs ~3ms at non-integer ratios), so
+      decoded video frames (process_image) are capped too.
+    - Buffers: Resize and BGR→RGB conversion write into arrays reused
+      across frames of the same shape instead of allocating per frame.
+
+    Landmarks are normalized, so none of this changes their coordinate
+    space; only the detail the model sees. `python -m benchmarks --only
+    resolution` reports latency and landmark error per size.
+
+Motion Gate (MOTION_GATE):
+    During planks and rests between sets consecutive frames are nearly
+    identical, yet each paid for a full inference. Before inference the
+    detector shrinks the region it is about to look at (the ROI, or the
+    whole frame) to a ~32px grayscale thumbnail and compares it with the
+    thumbnail of the last frame that was actually inferred. If the mean
+    absolute difference is under MOTION_THRESHOLD (0-255 gray levels), the
+    previous PoseResult is returned as is.
+
+    - Drift: Comparing against the last inferred frame, not the previous
+      frame, means slow movement accumulates until it crosses the threshold.
+    - Freshness: At most MOTION_MAX_SKIP frames in a row are reused; then
+      inference runs regardless, so tracking never goes stale.
+    - A skipped frame has a motion_gate stage but no inference stage in
+      last_timings (formcheck_motion_gate_frames_total counts both).
+
+Environment:
+    - ROI_CROP: Crop to the previous pose before inference (default: true)
+    - ROI_MARGIN: Margin around the pose, as a fraction of its size (default: 0.25)
+    - INFERENCE_SIZE: Max inference input side in pixels, 0 = native (default: 320)
+    - MODEL_COMPLEXITY: Default MediaPipe model complexity (default: 1)
+    - MOTION_GATE: Reuse the last result for unchanged frames (default: true)
+    - MOTION_THRESHOLD: Mean thumbnail difference that counts as motion (default: 2.0)
+    - MOTION_MAX_SKIP: Max consecutive frames served without inference (default: 4)
+
 Performance:
     - Expects JPEG frames at ~15 FPS
     - Each frame decode + inference takes ~30-50ms on modern CPU
@@ -24,15 +92,17 @@ See Also:
     - app/engine/exercises.py: Rep counting using landmark positions
 
 # Performance Benchmarks (tested on Intel i7-9700K, 8GB RAM):
+#   (Production numbers per stage: formcheck_frame_stage_seconds on /metrics)
 #   - Frame decode (base64 → numpy):  ~5ms
 #   - Pose inference (MediaPipe):     ~25-40ms (model_complexity=1)
-#   - Landmark serialization:         ~1ms
+#   - Landmark serialization:         ~1ms (LandmarkArray, no per-landmark models)
 #   - Total per-frame latency:        ~30-50ms avg, ~70ms p95
 #
 # Bottlenecks:
 #   - Inference time: Dominated by MediaPipe processing
 #   - Memory: ~200MB per PoseDetector instance (MediaPipe model)
-#   - Scaling: Linear with concurrent connections (each gets own detector)
+#   - Scaling: Detectors are pooled and reused (app/core/detector_pool.py)
+#   - Concurrency: Runs in InferenceExecutor worker processes (app/core/inference.py)
 #
 # Optimization Opportunities:
 #   - GPU acceleration: Use model_complexity=2 with CUDA for 2x speedup
@@ -44,50 +114,356 @@ import mediapipe as mp
 import cv2
 import numpy as np
 import base64
-from app.schemas import Landmark, PoseResult
+import os
+import time
+from typing import Dict, Optional, Tuple
+from app.schemas import LandmarkArray, PoseResult
+
+ROI_CROP = os.getenv("ROI_CROP", "true").lower() == "true"
+ROI_MARGIN = float(os.getenv("ROI_MARGIN", "0.25"))
+# Above this fraction of the frame, inference on the full frame is as cheap
+ROI_MAX_AREA = 0.8
+# Landmarks below this visibility are often guessed off-screen positions
+ROI_MIN_VISIBILITY = 0.5
+
+INFERENCE_SIZE = int(os.getenv("INFERENCE_SIZE", "320"))
+MODEL_COMPLEXITY = int(os.getenv("MODEL_COMPLEXITY", "1"))
+# JPEG scale denominators libjpeg decodes natively, largest first
+REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+# Reusable buffers kept per detector (full frame, crop, fallback, ...)
+MAX_BUFFERS = 4
+
+MOTION_GATE = os.getenv("MOTION_GATE", "true").lower() == "true"
+MOTION_THRESHOLD = float(os.getenv("MOTION_THRESHOLD", "2.0"))
+MOTION_MAX_SKIP = int(os.getenv("MOTION_MAX_SKIP", "4"))
+# Longest side of the motion gate thumbnail, roughly
+THUMBNAIL_SIDE = 32
+
+# Normalized (x0, y0, x1, y1) box in full-frame coordinates
+Box = Tuple[float, float, float, float]
+
+
+def landmark_bounds(landmarks: np.ndarray) -> Optional[Box]:
+    """Tight normalized box around the visible landmarks of a (33, 4) array."""
+    visible = landmarks[landmarks[:, LandmarkArray.VISIBILITY] >= ROI_MIN_VISIBILITY]
+    if len(visible) < 2:
+        return None
+    x0, y0 = visible[:, :2].min(axis=0).tolist()
+    x1, y1 = visible[:, :2].max(axis=0).tolist()
+    return x0, y0, x1, y1
+
+
+def expand_box(box: Box, margin: float) -> Box:
+    """Pad `box` by `margin` x its longer side on every side, clipped to the frame."""
+    x0, y0, x1, y1 = box
+    pad = max(x1 - x0, y1 - y0) * margin
+    return (
+        max(0.0, x0 - pad),
+        max(0.0, y0 - pad),
+        min(1.0, x1 + pad),
+        min(1.0, y1 + pad),
+    )
+
+
+def box_area(box: Box) -> float:
+    return max(0.0, box[2] - box[0]) * max(0.0, box[3] - box[1])
+
+
+def box_contains(outer: Box, inner: Box) -> bool:
+    return (
+        outer[0] <= inner[0]
+        and outer[1] <= inner[1]
+        and inner[2] <= outer[2]
+        and inner[3] <= outer[3]
+    )
 
 
 class PoseDetector:
-    def __init__(self):
+    def __init__(
+        self,
+        roi_crop: bool = ROI_CROP,
+        roi_margin: float = ROI_MARGIN,
+        inference_size: int = INFERENCE_SIZE,
+        model_complexity: int = MODEL_COMPLEXITY,
+        motion_gate: bool = MOTION_GATE,
+        motion_threshold: float = MOTION_THRESHOLD,
+        motion_max_skip: int = MOTION_MAX_SKIP,
+    ):
         self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
+        # One MediaPipe graph per complexity used so far (see set_model_complexity)
+        self.default_complexity = self.model_complexity = model_complexity
+        self._poses = {model_complexity: self._build_pose(model_complexity)}
+        self.pose = self._poses[model_complexity]
+        # Seconds spent per stage on the last frame (see app/core/metrics.py)
+        self.last_timings: Dict[str, float] = {}
+        self.roi_crop = roi_crop
+        self.roi_margin = roi_margin
+        # Crop box for the next frame; None means full frame
+        self.roi: Optional[Box] = None
+        self.inference_size = inference_size
+        # (height, width) of the last frame before reduced decoding
+        self.source_shape: Optional[Tuple[int, int]] = None
+        self._buffers: Dict[Tuple, np.ndarray] = {}
+        self.motion_gate = motion_gate
+        self.motion_threshold = motion_threshold
+        self.motion_max_skip = motion_max_skip
+        # (roi, thumbnail) of the last inferred frame, and what it returned
+        self._gate_reference: Optional[Tuple[Optional[Box], np.ndarray]] = None
+        self._last_result: Optional[PoseResult] = None
+        self._skipped = 0
+
+    def process_frame(self, frame: str | bytes | memoryview) -> PoseResult | None:
+        """
+        Detect a pose in one JPEG frame.
+
+        Args:
+            frame: Base64 JPEG string (JSON mode) or raw JPEG bytes / view
+                (binary mode). Raw bytes are wrapped without copying.
+        """
+        timings = self.last_timings = {}
+        try:
+            t0 = time.perf_counter()
+            if isinstance(frame, str):
+                # Decode base64 to image
+                frame = base64.b64decode(frame)
+                t1 = time.perf_counter()
+                timings["base64_decode"] = t1 - t0
+                t0 = t1
+            np_arr = np.frombuffer(frame, np.uint8)
+            scale, flag = self._decode_scale()
+            image = cv2.imdecode(np_arr, flag)
+            t1 = time.perf_counter()
+            timings["jpeg_decode"] = t1 - t0
+
+            if image is None:
+                return None
+            height, width = image.shape[:2]
+            self.source_shape = (height * scale, width * scale)
+
+            return self._process(image)
+
+        except Exception as e:
+            print(f"Error processing frame: {e}")
+            return None
+
+    def _build_pose(self, model_complexity: int):
+        return self.mp_pose.Pose(
             static_image_mode=False,
-            model_complexity=1,  # 0=Lite, 1=Full, 2=Heavy. 1 is good balance.
+            model_complexity=model_complexity,  # 0=Lite, 1=Full, 2=Heavy
             smooth_landmarks=True,
             enable_segmentation=False,
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5,
         )
 
-    def process_frame(self, base64_string: str) -> PoseResult | None:
-        try:
-            # Decode base64 to image
-            image_bytes = base64.b64decode(base64_string)
-            np_arr = np.frombuffer(image_bytes, np.uint8)
-            image = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+    def set_model_complexity(self, model_complexity: int):
+        """Switch to the Lite (0), Full (1) or Heavy (2) model for later frames."""
+        if model_complexity == self.model_complexity:
+            return
+        pose = self._poses.get(model_complexity)
+        if pose is None:
+            pose = self._poses[model_complexity] = self._build_pose(model_complexity)
+        else:
+            # Don't resume a track this model last saw frames ago
+            pose.reset()
+        self.pose = pose
+        self.model_complexity = model_complexity
+        self.roi = None
+        self._gate_reference = None
 
-            if image is None:
-                return None
+    def _decode_scale(self) -> Tuple[int, int]:
+        """(denominator, imdecode flag) for the next frame's JPEG decode."""
+        if not self.inference_size or self.source_shape is None:
+            return 1, cv2.IMREAD_COLOR
+        height, width = self.source_shape
+        x0, y0, x1, y1 = self.roi or (0.0, 0.0, 1.0, 1.0)
+        needed = max((x1 - x0) * width, (y1 - y0) * height)
+        for scale, flag in REDUCED_DECODE_FLAGS:
+            if needed / scale >= self.inference_size:
+                return scale, flag
+        return 1, cv2.IMREAD_COLOR
 
-            # Convert BGR to RGB (MediaPipe expects RGB)
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    def _buffer(self, kind: str, shape: Tuple[int, ...]) -> Optional[np.ndarray]:
+        """Array from a previous frame to write into, if one has this shape."""
+        return self._buffers.get((kind, shape))
 
-            # Process
-            results = self.pose.process(image_rgb)
+    def _keep(self, kind: str, array: np.ndarray) -> np.ndarray:
+        key = (kind, array.shape)
+        if key not in self._buffers and len(self._buffers) >= MAX_BUFFERS:
+            self._buffers.clear()
+        self._buffers[key] = array
+        return array
 
-            if results.pose_landmarks:
-                landmarks = []
-                for lm in results.pose_landmarks.landmark:
-                    landmarks.append(
-                        Landmark(x=lm.x, y=lm.y, z=lm.z, visibility=lm.visibility)
-                    )
-                return PoseResult(landmarks=landmarks)
+    def process_image(self, image: np.ndarray) -> PoseResult | None:
+        """
+        Detect a pose in an already-decoded BGR image (e.g. a video frame).
 
-            return None
+        Reuses the last result for unchanged frames, crops to the ROI when
+        tracking and caps the input size (see module docstring). Records
+        motion_gate/resize/color_convert/inference into last_timings.
+        """
+        self.last_timings = {}
+        return self._process(image)
 
-        except Exception as e:
-            print(f"Error processing frame: {e}")
+    def _process(self, image: np.ndarray) -> PoseResult | None:
+        if self.motion_gate:
+            t0 = time.perf_counter()
+            gate_roi = self.roi
+            thumbnail = self._thumbnail(image, gate_roi)
+            unchanged = self._unchanged(gate_roi, thumbnail)
+            self.last_timings["motion_gate"] = time.perf_counter() - t0
+            if unchanged:
+                self._skipped += 1
+                return self._last_result
+            self._gate_reference = (gate_roi, thumbnail)
+            self._skipped = 0
+
+        # A fallback runs twice; both passes count towards the frame
+        self.last_timings.update(resize=0.0, color_convert=0.0, inference=0.0)
+        roi = self.roi
+        if roi is not None:
+            landmarks = self._detect(image, roi)
+            if landmarks is None:
+                # Tracking lost (or the person left the crop): full frame
+                self.roi = None
+                landmarks = self._detect(image, None)
+        else:
+            landmarks = self._detect(image, None)
+
+        result = None
+        if landmarks is not None:
+            if self.roi_crop:
+                self._update_roi(landmarks.data)
+            result = PoseResult(landmarks=landmarks)
+        self._last_result = result
+        return result
+
+    def _thumbnail(self, image: np.ndarray, roi: Optional[Box]) -> np.ndarray:
+        """Tiny grayscale version of the region inference would look at."""
+        image, _, _ = self._crop(image, roi)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        # Integer factor keeps INTER_AREA on its fast path
+        factor = max(1, max(gray.shape) // THUMBNAIL_SIDE)
+        return cv2.resize(
+            gray, None, fx=1 / factor, fy=1 / factor, interpolation=cv2.INTER_AREA
+        )
+
+    def _unchanged(self, roi: Optional[Box], thumbnail: np.ndarray) -> bool:
+        """True if this frame can reuse the last inferred frame's result."""
+        reference = self._gate_reference
+        if (
+            reference is None
+            or self._skipped >= self.motion_max_skip
+            or reference[0] != roi
+            or reference[1].shape != thumbnail.shape
+        ):
+            return False
+        difference = cv2.absdiff(reference[1], thumbnail).mean()
+        return difference < self.motion_threshold
+
+    @staticmethod
+    def _crop(image: np.ndarray, roi: Optional[Box]) -> Tuple[np.ndarray, int, int]:
+        """(view of `roi` in `image`, left, top); the whole image if no roi."""
+        if roi is None:
+            return image, 0, 0
+        height, width = image.shape[:2]
+        left, top = int(roi[0] * width), int(roi[1] * height)
+        right = max(left + 1, int(np.ceil(roi[2] * width)))
+        bottom = max(top + 1, int(np.ceil(roi[3] * height)))
+        return image[top:bottom, left:right], left, top
+
+    def _detect(self, image: np.ndarray, roi: Optional[Box]) -> LandmarkArray | None:
+        """Run MediaPipe on `image` (or its `roi` crop); full-frame landmarks."""
+        timings = self.last_timings
+        height, width = image.shape[:2]
+        image, left, top = self._crop(image, roi)
+        crop_height, crop_width = image.shape[:2]
+
+        t0 = time.perf_counter()
+        longest = max(crop_height, crop_width)
+        if self.inference_size and longest > self.inference_size:
+            ratio = self.inference_size / longest
+            size = (
+                max(1, round(crop_width * ratio)),
+                max(1, round(crop_height * ratio)),
+            )
+            shape = (size[1], size[0], 3)
+            image = self._keep(
+                "resize",
+                cv2.resize(
+                    image,
+                    size,
+                    dst=self._buffer("resize", shape),
+                    interpolation=cv2.INTER_LINEAR,
+                ),
+            )
+        t1 = time.perf_counter()
+        timings["resize"] += t1 - t0
+        t0 = t1
+
+        # Convert BGR to RGB (MediaPipe expects RGB)
+        image_rgb = self._keep(
+            "rgb",
+            cv2.cvtColor(
+                image, cv2.COLOR_BGR2RGB, dst=self._buffer("rgb", image.shape)
+            ),
+        )
+        t1 = time.perf_counter()
+        timings["color_convert"] += t1 - t0
+
+        # Process
+        results = self.pose.process(image_rgb)
+        timings["inference"] += time.perf_counter() - t1
+
+        if not results.pose_landmarks:
             return None
 
+        # One (33, 4) float32 array instead of 33 Pydantic models
+        landmarks = LandmarkArray.from_landmarks(results.pose_landmarks.landmark)
+        if roi is not None:
+            # Crop-normalized → full-frame normalized (z scales with x)
+            data = landmarks.data
+            data[:, LandmarkArray.X] = (
+                data[:, LandmarkArray.X] * crop_width + left
+            ) / width
+            data[:, LandmarkArray.Y] = (
+                data[:, LandmarkArray.Y] * crop_height + top
+            ) / height
+            data[:, LandmarkArray.Z] *= crop_width / width
+        return landmarks
+
+    def _update_roi(self, landmarks: np.ndarray):
+        """Choose the crop for the next frame from this frame's landmarks."""
+        bounds = landmark_bounds(landmarks)
+        if bounds is None:
+            self.roi = None
+            return
+
+        target = expand_box(bounds, self.roi_margin)
+        roi = self.roi
+        if roi is not None:
+            # Keep the current box while the body stays well inside it
+            near_edge = not box_contains(roi, expand_box(bounds, self.roi_margin / 2))
+            too_loose = box_area(roi) > 2 * box_area(target)
+            if not (near_edge or too_loose):
+                return
+
+        self.roi = target if box_area(target) < ROI_MAX_AREA else None
+
+    def reset(self):
+        """Forget temporal tracking state before serving a new session."""
+        self.set_model_complexity(self.default_complexity)
+        self.pose.reset()
+        self.roi = None
+        self.source_shape = None
+        self._gate_reference = None
+        self._last_result = None
+        self._skipped = 0
+
     def close(self):
-        self.pose.close()
+        for pose in self._poses.values():
+            pose.close()
@@ -0,0 +1,223 @@
+"""
+protocol.py - Binary WebSocket frame protocol.
+
+Legacy clients send frames as JSON text:
+
+    { "type": "FRAME", "payload": "<base64 JPEG>", "timestamp": 1234567890 }
+
+which costs the server a json.loads over a ~30-60KB string plus a base64
+decode (two full copies) before OpenCV ever sees the JPEG, and inflates
+upload bandwidth by ~33%. Binary mode sends the raw JPEG bytes in a
+WebSocket binary message behind a small fixed header instead.
+
+Binary Message Layout (little-endian, 13-byte header):
+
+    ┌────────┬──────────────┬──────────┬──────────────────────┐
+    │ type   │ timestamp    │ sequence │ body                 │
+    │ uint8  │ float64 (ms) │ uint32   │ raw JPEG bytes       │
+    └────────┴──────────────┴──────────┴──────────────────────┘
+     byte 0   bytes 1-8      bytes 9-12  bytes 13..
+
+    type: 0x01 = FRAME (other values are reserved)
+    timestamp: Client clock in ms (Date.now()), echoed back in RESULT
+    sequence: Monotonic per-connection frame counter, echoed back as "seq"
+
+Control messages (INIT, ...) stay JSON text in both modes, and the server
+auto-detects the mode per message, so old and new clients can share /ws.
+
+Zero-Copy Decode:
+    decode_binary_frame() returns a memoryview over the message body, which
+    np.frombuffer() wraps without copying before cv2.imdecode.
+
+Compact Results (server → client):
+    A JSON RESULT carries all 33 landmarks as {x, y, z, visibility} dicts
+    at full float precision: ~2.5KB and 33 dict builds per frame, mostly
+    for face landmarks the overlay never draws. A client that sends
+    {"format": "compact"} in INIT gets RESULT as a binary message instead:
+
+    ┌────────┬────────┬────────┬──────────────────┬──────────────────────┐
+    │ type   │ flags  │ count  │ landmark block   │ JSON tail            │
+    │ uint8  │ uint8  │ uint8  │ count x 7 or 4 B │ everything else      │
+    └────────┴────────┴────────┴──────────────────┴──────────────────────┘
+
+    type: 0x02 = RESULT
+    flags: bit 0 = delta block
+    count: len(OVERLAY_LANDMARKS), the skeleton landmarks 11-32 in order
+    keyframe block: per landmark int16 x, y, z (value x 4096, ~0.25px at
+        1000px) and uint8 visibility (x 255); coordinates are clipped to ±8
+    delta block: per landmark int8 differences of those four quantized
+        values from the previous RESULT
+    JSON tail: The RESULT dict minus "landmarks" (reps, feedback, state,
+        timestamp, seq), UTF-8
+
+    Deltas are opt-in ({"delta": true} in INIT). The encoder falls back to
+    a keyframe when any difference overflows int8, after NO_DETECTION
+    (reset()) and every KEYFRAME_INTERVAL results. Deltas apply to the
+    quantized values the client already holds, so rounding never drifts.
+    Clients that don't negotiate keep the JSON RESULT.
+
+See Also:
+    - client/src/lib/frameProtocol.ts: Matching encoder / decoder
+"""
+
+import struct
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app import codec
+
+FRAME_HEADER = struct.Struct("<BdI")
+
+MSG_FRAME = 0x01
+MSG_RESULT = 0x02
+
+RESULT_HEADER = struct.Struct("<BBB")
+FLAG_DELTA = 0x01
+
+# Landmarks the client skeleton draws (client/src/components/SkeletonOverlay.tsx)
+OVERLAY_LANDMARKS = tuple(range(11, 33))
+COORD_SCALE = 4096
+VISIBILITY_SCALE = 255
+KEYFRAME_INTERVAL = 30
+
+KEYFRAME_DTYPE = np.dtype([("xyz", "<i2", 3), ("visibility", "u1")])
+
+
+class ProtocolError(ValueError):
+    """Raised for binary messages that don't match the frame layout."""
+
+
+class BinaryFrame(NamedTuple):
+    msg_type: int
+    timestamp: float
+    seq: int
+    jpeg: memoryview
+
+
+def decode_binary_frame(data: bytes) -> BinaryFrame:
+    """
+    Split a binary WebSocket message into header fields and JPEG body.
+
+    Args:
+        data: Raw message bytes as received from the socket.
+
+    Returns:
+        BinaryFrame whose `jpeg` is a view into `data` (no copy).
+
+    Raises:
+        ProtocolError: Message is shorter than the header or has an
+            unknown type.
+    """
+    if len(data) <= FRAME_HEADER.size:
+        raise ProtocolError(f"Binary message too short ({len(data)} bytes)")
+
+    msg_type, timestamp, seq = FRAME_HEADER.unpack_from(data)
+    if msg_type != MSG_FRAME:
+        raise ProtocolError(f"Unknown binary message type {msg_type:#x}")
+
+    return BinaryFrame(msg_type, timestamp, seq, memoryview(data)[FRAME_HEADER.size :])
+
+
+def encode_binary_frame(jpeg: bytes, timestamp: float, seq: int) -> bytes:
+    """Build a binary FRAME message (used by tests and Python clients)."""
+    return FRAME_HEADER.pack(MSG_FRAME, timestamp, seq) + jpeg
+
+
+def quantize_landmarks(data: np.ndarray) -> np.ndarray:
+    """(N, 4) float landmarks → (len(OVERLAY_LANDMARKS), 4) int32 fixed point."""
+    selected = data[list(OVERLAY_LANDMARKS)]
+    quantized = np.empty(selected.shape, dtype=np.int32)
+    quantized[:, :3] = np.rint(np.clip(selected[:, :3] * COORD_SCALE, -32767, 32767))
+    quantized[:, 3] = np.rint(np.clip(selected[:, 3], 0, 1) * VISIBILITY_SCALE)
+    return quantized
+
+
+class LandmarkEncoder:
+    """
+    Per-connection compact RESULT encoder (keeps the delta base).
+
+    Args:
+        delta: Send int8 deltas against the previous RESULT when they fit.
+        keyframe_interval: Force a keyframe at least this often.
+    """
+
+    def __init__(self, delta: bool = False, keyframe_interval: int = KEYFRAME_INTERVAL):
+        self.delta = delta
+        self.keyframe_interval = max(1, keyframe_interval)
+        self._previous: Optional[np.ndarray] = None
+        self._since_keyframe = 0
+
+    def reset(self):
+        """Next RESULT is a keyframe (e.g. after NO_DETECTION)."""
+        self._previous = None
+
+    def encode(self, landmarks: np.ndarray, fields: Dict[str, Any]) -> bytes:
+        """Binary RESULT for (N, 4) landmarks plus the remaining RESULT fields."""
+        quantized = quantize_landmarks(landmarks)
+        tail = codec.dumps(fields)
+
+        previous = self._previous
+        self._previous = quantized
+        if (
+            self.delta
+            and previous is not None
+            and self._since_keyframe < self.keyframe_interval
+        ):
+            difference = quantized - previous
+            if np.abs(difference).max() <= 127:
+                self._since_keyframe += 1
+                header = RESULT_HEADER.pack(MSG_RESULT, FLAG_DELTA, len(quantized))
+                return header + difference.astype(np.int8).tobytes() + tail
+
+        self._since_keyframe = 0
+        block = np.empty(len(quantized), dtype=KEYFRAME_DTYPE)
+        block["xyz"] = quantized[:, :3]
+        block["visibility"] = quantized[:, 3]
+        header = RESULT_HEADER.pack(MSG_RESULT, 0, len(quantized))
+        return header + block.tobytes() + tail
+
+
+def decode_result(
+    data: bytes, previous: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    """
+    Decode a binary RESULT (used by tests and Python clients).
+
+    Returns:
+        (33 x 4 float32 landmarks with visibility 0 where not sent,
+         quantized block to pass as `previous` next time, JSON tail)
+
+    Raises:
+        ProtocolError: Wrong type, truncated block, or a delta without
+            a previous keyframe.
+    """
+    if len(data) < RESULT_HEADER.size:
+        raise ProtocolError(f"Binary message too short ({len(data)} bytes)")
+    msg_type, flags, count = RESULT_HEADER.unpack_from(data)
+    if msg_type != MSG_RESULT:
+        raise ProtocolError(f"Unknown binary message type {msg_type:#x}")
+
+    offset = RESULT_HEADER.size
+    if flags & FLAG_DELTA:
+        if previous is None:
+            raise ProtocolError("Delta RESULT without a keyframe")
+        end = offset + count * 4
+        block = np.frombuffer(data[offset:end], dtype=np.int8)
+        if block.size != count * 4:
+            raise ProtocolError("Truncated landmark block")
+        quantized = previous + block.reshape(count, 4).astype(np.int32)
+    else:
+        end = offset + count * KEYFRAME_DTYPE.itemsize
+        block = np.frombuffer(data[offset:end], dtype=KEYFRAME_DTYPE)
+        if block.size != count:
+            raise ProtocolError("Truncated landmark block")
+        quantized = np.empty((count, 4), dtype=np.int32)
+        quantized[:, :3] = block["xyz"]
+        quantized[:, 3] = block["visibility"]
+
+    landmarks = np.zeros((33, 4), dtype=np.float32)
+    indices = list(OVERLAY_LANDMARKS[:count])
+    landmarks[indices, :3] = quantized[:, :3] / COORD_SCALE
+    landmarks[indices, 3] = quantized[:, 3] / VISIBILITY_SCALE
+    return landmarks, quantized, codec.loads(data[end:])
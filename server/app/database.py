@@ -5,36 +5,90 @@ Handles storage and retrieval of workout sessions, user settings, and
 computed analytics (streaks, personal records, exercise distribution).
 
 Thread Safety:
-    Uses thread-local connections because SQLite connections cannot be
-    shared across threads. Each thread gets its own connection via
-    threading.local(). FastAPI runs request handlers in a thread pool,
-    so this approach prevents "SQLite objects used in a thread" errors.
+    Connections come from a bounded ConnectionPool. get_connection() checks
+    one out for the duration of a `with` block and returns it afterwards,
+    so a connection is only ever used by one thread at a time but is not
+    tied to any thread. FastAPI's worker threads come and go; with the old
+    threading.local() design each one leaked an open connection.
+
+Journal Mode:
+    WAL lets dashboard reads proceed while a session is being written (the
+    default rollback journal locks readers out during every commit), and
+    synchronous=NORMAL is durable across app crashes under WAL, only
+    risking the last commits on power loss. Each pooled connection also
+    gets a page cache, a memory-mapped read window and a busy timeout, so
+    a brief write lock is waited out instead of raising "database is locked".
 
 Tables:
     sessions: Workout session records (exercise, reps, duration, timestamp)
     settings: Key-value store for user preferences (e.g., weekly_goal)
+        and the data version (see below)
 
 Streak Calculation:
     Counts consecutive days with at least one session. A streak continues
     if the last session was today or yesterday—this forgives single-day
     gaps to reduce user anxiety about "breaking" streaks.
 
+Rollups:
+    daily_stats and exercise_stats hold running totals per local day and
+    per exercise. save_session/delete_session update them in the same
+    transaction as the sessions row, so /api/stats and /api/analytics read
+    a handful of rollup rows instead of scanning every session, and the
+    streak walks the daily index newest-first, stopping at the first gap
+    (O(streak length)). Days are bucketed in server local time at insert.
+
+Data Version:
+    A 'data_version' row in settings is bumped inside every mutating
+    transaction, and 'data_epoch' is a random id written once per database
+    file. Together they form data_version, the key response caches and
+    ETags are built on; both live in the file, so every worker sharing it
+    sees the same version, and a recreated database never reuses one.
+    Reading it is cheap: one held connection polls PRAGMA data_version,
+    which moves whenever any other connection (in any process) commits,
+    and the settings row is only re-read after it moves. No pool checkout.
+
+Migrations:
+    PRAGMA user_version records the applied schema version; _init_db runs
+    any newer entries of MIGRATIONS in order (e.g. backfilling rollups for
+    a database created before they existed).
+
+Environment:
+    - DB_POOL_SIZE: Max open connections (default: 8)
+    - DB_POOL_TIMEOUT: Seconds to wait for a free connection (default: 30)
+    - DB_JOURNAL_MODE: SQLite journal_mode (default: WAL)
+    - DB_SYNCHRONOUS: SQLite synchronous level (default: NORMAL)
+    - DB_CACHE_SIZE_KB: Page cache per connection (default: 8192)
+    - DB_MMAP_SIZE_MB: Memory-mapped I/O window per connection (default: 64)
+    - DB_BUSY_TIMEOUT_MS: Wait on a locked database (default: 5000)
+
 Usage:
     from app.database import db  # Global singleton
     db.save_session("Pushups", 25, 120)
     stats = db.get_stats()
 """
 
+import os
+import queue
 import sqlite3
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Sequence, Tuple
 import time
 from pathlib import Path
 import threading
+import uuid
 from contextlib import contextmanager
+from datetime import date, datetime, timedelta
 
 # Database file location - relative to server working directory
 DB_PATH = Path("formcheck.db")
 
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE", "WAL")
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "8192"))
+DB_MMAP_SIZE_MB = int(os.getenv("DB_MMAP_SIZE_MB", "64"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+
 
 # Database Schema:
 #
@@ -57,36 +111,308 @@ DB_PATH = Path("formcheck.db")
 # │ value   │ TEXT │ Setting value (JSON serialized)│
 # └─────────┴──────┴───────────────────────────────┘
 #
+# TABLE: daily_stats (rollup)        TABLE: exercise_stats (rollup)
+# ┌──────────┬─────────┐               ┌──────────┬─────────┐
+# │ day (PK) │ TEXT    │ YYYY-MM-DD    │ exercise │ TEXT PK │
+# │ sessions │ INTEGER │               │ sessions │ INTEGER │
+# │ reps     │ INTEGER │               │ reps     │ INTEGER │
+# │ duration │ INTEGER │               │ duration │ INTEGER │
+# └──────────┴─────────┘               │ max_reps │ INTEGER │
+#                                      └──────────┴─────────┘
+#
 # Example Queries:
 #   - Get last 10 sessions: SELECT * FROM sessions ORDER BY timestamp DESC LIMIT 10
-#   - Calculate streak: SELECT DISTINCT date(timestamp, 'unixepoch', 'localtime') ...
-#   - Get PRs: SELECT exercise, MAX(reps) FROM sessions GROUP BY exercise
+#   - Calculate streak: SELECT day FROM daily_stats ORDER BY day DESC (until a gap)
+#   - Get PRs: SELECT exercise, max_reps FROM exercise_stats
+
+# Local calendar day of a session timestamp (same bucketing everywhere)
+DAY_EXPR = "date({}, 'unixepoch', 'localtime')"
+
+
+def _create_rollups(cursor: sqlite3.Cursor):
+    """Create the rollup tables and backfill them from existing sessions."""
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            day TEXT PRIMARY KEY,
+            sessions INTEGER NOT NULL,
+            reps INTEGER NOT NULL,
+            duration INTEGER NOT NULL
+        )
+    """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS exercise_stats (
+            exercise TEXT PRIMARY KEY,
+            sessions INTEGER NOT NULL,
+            reps INTEGER NOT NULL,
+            duration INTEGER NOT NULL,
+            max_reps INTEGER NOT NULL
+        )
+    """
+    )
+    cursor.execute("DELETE FROM daily_stats")
+    cursor.execute("DELETE FROM exercise_stats")
+    cursor.execute(
+        f"""
+        INSERT INTO daily_stats (day, sessions, reps, duration)
+        SELECT {DAY_EXPR.format("timestamp")}, COUNT(*), SUM(reps), SUM(duration)
+        FROM sessions GROUP BY 1
+    """
+    )
+    cursor.execute(
+        """
+        INSERT INTO exercise_stats (exercise, sessions, reps, duration, max_reps)
+        SELECT exercise, COUNT(*), SUM(reps), SUM(duration), MAX(reps)
+        FROM sessions GROUP BY exercise
+    """
+    )
+
+
+def _create_session_indexes(cursor: sqlite3.Cursor):
+    """History is always read newest-first, optionally per exercise."""
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_sessions_timestamp ON sessions (timestamp)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_sessions_exercise_timestamp "
+        "ON sessions (exercise, timestamp)"
+    )
+
+
+# Schema migrations, applied in order above PRAGMA user_version
+MIGRATIONS = [
+    _create_rollups,  # 1
+    _create_session_indexes,  # 2
+]
+
+
+# Activity buckets: period start (YYYY-MM-DD) for a local day string `d`.
+# Weeks start on Monday (ISO); strftime('%w') is 0 for Sunday.
+PERIOD_EXPR = {
+    "day": "{d}",
+    "week": "date({d}, '-' || ((CAST(strftime('%w', {d}) AS INTEGER) + 6) % 7) || ' days')",
+    "month": "strftime('%Y-%m-01', {d})",
+}
+
+
+def period_start(bucket: str, day: date) -> date:
+    """First day of the `bucket` period containing `day`."""
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def next_period(bucket: str, start: date) -> date:
+    if bucket == "week":
+        return start + timedelta(weeks=1)
+    if bucket == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+# Rows per query when streaming the whole history (see iter_sessions)
+EXPORT_BATCH_SIZE = 500
+
+
+# Keyset Pagination:
+#   Pages are ordered by (timestamp DESC, id DESC). A cursor is the
+#   "<timestamp>:<id>" of the last row served; the next page starts strictly
+#   below it, so the query is an index range scan whatever the page depth
+#   (OFFSET would re-read every skipped row). Both indexes end in the
+#   implicit rowid (= id), so ties on timestamp need no extra sort.
+
+
+def encode_cursor(timestamp: float, session_id: int) -> str:
+    return f"{timestamp!r}:{session_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """Parse a page cursor (raises ValueError if malformed)."""
+    timestamp, _, session_id = cursor.partition(":")
+    return float(timestamp), int(session_id)
+
+
+def _session_filters(
+    exercise: Optional[str] = None,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    before: Optional[Tuple[float, int]] = None,
+) -> Tuple[str, List]:
+    """WHERE clause (or "") and parameters for filtered history queries."""
+    clauses, params = [], []
+    if exercise is not None:
+        clauses.append("exercise = ?")
+        params.append(exercise)
+    if start is not None:
+        clauses.append("timestamp >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("timestamp < ?")
+        params.append(end)
+    if before is not None:
+        clauses.append("(timestamp, id) < (?, ?)")
+        params.extend(before)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    """Open a connection with the per-connection pragmas applied."""
+    conn = sqlite3.connect(
+        path, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS}")
+    # Negative cache_size is in KiB rather than pages
+    conn.execute(f"PRAGMA cache_size = {-DB_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE_MB * 1024 * 1024}")
+    conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+    return conn
+
+
+class ConnectionPool:
+    """
+    Bounded set of reusable SQLite connections.
+
+    Connections are opened lazily up to `size`; when all are checked out,
+    acquire() waits up to `timeout` seconds for one to be released.
+    """
+
+    def __init__(
+        self, path: Path, size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT
+    ):
+        self.path = path
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> sqlite3.Connection:
+        """
+        Check out a connection.
+
+        Raises:
+            sqlite3.OperationalError: If none is free within `timeout`.
+        """
+        try:
+            # LIFO keeps the warmest connection (page cache) in use
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                open_new = True
+            else:
+                open_new = False
+        if open_new:
+            try:
+                return connect(self.path)
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"No database connection free within {self.timeout}s"
+            ) from None
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection, rolling back anything left uncommitted."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Broken connection: drop it and let a new one be opened
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+            return
+        self._idle.put(conn)
+
+    def close(self):
+        """Close idle connections (checked-out ones are kept on release)."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+    @property
+    def opened(self) -> int:
+        return self._opened
+
+    @property
+    def idle(self) -> int:
+        return self._idle.qsize()
 
 
 class Database:
     def __init__(self):
-        self._local = threading.local()
         # Ensure tables exist on startup (main thread)
         self._init_db()
+        self._pool = ConnectionPool(DB_PATH)
+        # Read-only connection polled by data_version, with the last
+        # (PRAGMA data_version, version) pair it saw
+        self._watch: Optional[sqlite3.Connection] = None
+        self._watch_lock = threading.Lock()
+        self._seen: Optional[Tuple[int, str]] = None
+
+    @property
+    def data_version(self) -> str:
+        """
+        Token that changes whenever stored data changes, in any process.
+
+        Computed responses (stats, analytics, history) can be cached and
+        served with an ETag for as long as the version stays the same.
+        """
+        with self._watch_lock:
+            if self._watch is None:
+                self._watch = connect(DB_PATH)
+            # Never writes itself, so any commit anywhere moves this
+            changes = self._watch.execute("PRAGMA data_version").fetchone()[0]
+            if self._seen is None or self._seen[0] != changes:
+                row = self._watch.execute(
+                    "SELECT value FROM settings WHERE key = 'data_version'"
+                ).fetchone()
+                self._seen = (changes, f"{self._epoch}.{row[0] if row else 0}")
+            return self._seen[1]
+
+    @staticmethod
+    def _bump_version(cursor: sqlite3.Cursor):
+        """Advance data_version as part of the caller's transaction."""
+        cursor.execute(
+            """
+            INSERT INTO settings (key, value) VALUES ('data_version', 1)
+            ON CONFLICT(key) DO UPDATE SET value = value + 1
+            """
+        )
 
     @contextmanager
     def get_connection(self):
-        # Create a thread-local connection if it doesn't exist
-        if not hasattr(self._local, "conn"):
-            self._local.conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-            self._local.conn.row_factory = sqlite3.Row
-
+        conn = self._pool.acquire()
         try:
-            yield self._local.conn
-        except Exception:
-            # On error, we might want to rollback, but sqlite does this automatically on close usually?
-            # Actually with a persistent connection, we should ensure manual rollback or just let context handle it if we wrapped transaction
-            # But here we just yield connection.
-            raise
+            yield conn
+        finally:
+            self._pool.release(conn)
 
     def _init_db(self):
-        # Direct connection for initialization to avoid thread-local in init
+        # Direct connection for initialization, before the pool exists
         conn = sqlite3.connect(DB_PATH)
+        # Persistent: stored in the database file, applies to every connection
+        conn.execute(f"PRAGMA journal_mode = {DB_JOURNAL_MODE}")
         cursor = conn.cursor()
         cursor.execute(
             """
@@ -109,9 +435,72 @@ class Database:
             )
         """
         )
+
+        # First worker to create the file picks the epoch; the rest read it
+        cursor.execute(
+            "INSERT OR IGNORE INTO settings (key, value) VALUES ('data_epoch', ?)",
+            (uuid.uuid4().hex[:8],),
+        )
+        self._epoch = cursor.execute(
+            "SELECT value FROM settings WHERE key = 'data_epoch'"
+        ).fetchone()[0]
+
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
         conn.commit()
         conn.close()
 
+    @staticmethod
+    def _update_rollups(
+        cursor: sqlite3.Cursor,
+        exercise: str,
+        reps: int,
+        duration: int,
+        timestamp: float,
+        sign: int,
+    ):
+        """Add (sign=1) or remove (sign=-1) one session from the rollups."""
+        query = f"SELECT {DAY_EXPR.format('?')}"
+        day = cursor.execute(query, (timestamp,)).fetchone()[0]
+        cursor.execute(
+            """
+            INSERT INTO daily_stats (day, sessions, reps, duration) VALUES (?, ?, ?, ?)
+            ON CONFLICT(day) DO UPDATE SET
+                sessions = sessions + excluded.sessions,
+                reps = reps + excluded.reps,
+                duration = duration + excluded.duration
+            """,
+            (day, sign, sign * reps, sign * duration),
+        )
+        cursor.execute(
+            """
+            INSERT INTO exercise_stats (exercise, sessions, reps, duration, max_reps)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(exercise) DO UPDATE SET
+                sessions = sessions + excluded.sessions,
+                reps = reps + excluded.reps,
+                duration = duration + excluded.duration,
+                max_reps = MAX(max_reps, excluded.max_reps)
+            """,
+            (exercise, sign, sign * reps, sign * duration, reps if sign > 0 else 0),
+        )
+
+        if sign < 0:
+            # Drop emptied buckets so the streak and distribution skip them,
+            # and recompute the PR only if the removed session held it
+            cursor.execute("DELETE FROM daily_stats WHERE sessions <= 0")
+            cursor.execute("DELETE FROM exercise_stats WHERE sessions <= 0")
+            cursor.execute(
+                """
+                UPDATE exercise_stats SET max_reps = (
+                    SELECT COALESCE(MAX(reps), 0) FROM sessions WHERE exercise = ?
+                ) WHERE exercise = ? AND max_reps <= ?
+                """,
+                (exercise, exercise, reps),
+            )
+
     def get_goal(self) -> int:
         with self.get_connection() as conn:
             cursor = conn.cursor()
@@ -126,19 +515,71 @@ class Database:
                 "INSERT OR REPLACE INTO settings (key, value) VALUES ('weekly_goal', ?)",
                 (str(goal),),
             )
+            self._bump_version(cursor)
             conn.commit()
 
-    def save_session(self, exercise: str, reps: int, duration: int = 0):
+    def save_session(
+        self,
+        exercise: str,
+        reps: int,
+        duration: int = 0,
+        timestamp: Optional[float] = None,
+    ):
         # Only save meaningful sessions
         if reps == 0 and duration == 0:
             return
 
+        if timestamp is None:
+            timestamp = time.time()
+        self.apply_writes([("save", exercise, reps, duration, timestamp)])
+
+    def _insert_session(
+        self,
+        cursor: sqlite3.Cursor,
+        exercise: str,
+        reps: int,
+        duration: int,
+        timestamp: float,
+    ):
+        cursor.execute(
+            "INSERT INTO sessions (exercise, reps, duration, timestamp) VALUES (?, ?, ?, ?)",
+            (exercise, reps, duration, timestamp),
+        )
+        self._update_rollups(cursor, exercise, reps, duration, timestamp, 1)
+
+    def _delete_session(self, cursor: sqlite3.Cursor, session_id: int):
+        cursor.execute(
+            "SELECT exercise, reps, duration, timestamp FROM sessions WHERE id = ?",
+            (session_id,),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return
+        cursor.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        self._update_rollups(cursor, *row, -1)
+
+    def _delete_all_sessions(self, cursor: sqlite3.Cursor):
+        cursor.execute("DELETE FROM sessions")
+        cursor.execute("DELETE FROM daily_stats")
+        cursor.execute("DELETE FROM exercise_stats")
+
+    def apply_writes(self, ops: Sequence[Tuple]):
+        """
+        Apply session mutations in one transaction (all or nothing).
+
+        Each op is ("save", exercise, reps, duration, timestamp),
+        ("delete", session_id) or ("delete_all",), applied in order.
+        """
+        handlers = {
+            "save": self._insert_session,
+            "delete": self._delete_session,
+            "delete_all": self._delete_all_sessions,
+        }
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO sessions (exercise, reps, duration, timestamp) VALUES (?, ?, ?, ?)",
-                (exercise, reps, duration, time.time()),
-            )
+            for op, *args in ops:
+                handlers[op](cursor, *args)
+            self._bump_version(cursor)
             conn.commit()
 
     def get_recent_sessions(self, limit: int = 10) -> List[Dict]:
@@ -156,22 +597,153 @@ class Database:
             rows = cursor.fetchall()
             return [dict(row) for row in rows]
 
+    def get_sessions_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        exercise: Optional[str] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+    ) -> Dict:
+        """
+        One page of history, newest first.
+
+        Args:
+            limit: Page size.
+            cursor: next_cursor from the previous page (None for the first).
+            exercise: Only this exercise.
+            start, end: Unix timestamp range, start inclusive, end exclusive.
+
+        Returns:
+            {"sessions": [...], "next_cursor": str | None}
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        before = decode_cursor(cursor) if cursor else None
+        where, params = _session_filters(exercise, start, end, before)
+
+        with self.get_connection() as conn:
+            # One extra row tells us whether another page exists
+            rows = conn.execute(
+                f"SELECT * FROM sessions {where} "
+                "ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (*params, limit + 1),
+            ).fetchall()
+            rows = [dict(row) for row in rows]
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["timestamp"], rows[-1]["id"])
+        return {"sessions": rows, "next_cursor": next_cursor}
+
+    def iter_sessions(
+        self,
+        exercise: Optional[str] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        batch_size: int = EXPORT_BATCH_SIZE,
+    ) -> Iterator[List[Dict]]:
+        """
+        Yield the filtered history newest-first in batches of `batch_size`.
+
+        Each batch is its own keyset query (see Keyset Pagination), so memory
+        stays at one batch however large the table, and no read lock is held
+        while the consumer (e.g. a slow download) works through a batch.
+
+        Uses a private connection rather than a pooled one, so a slow download
+        doesn't hold a pool slot for its whole duration.
+        """
+        conn = connect(self._pool.path)
+        try:
+            before = None
+            while True:
+                where, params = _session_filters(exercise, start, end, before)
+                rows = conn.execute(
+                    f"SELECT * FROM sessions {where} "
+                    "ORDER BY timestamp DESC, id DESC LIMIT ?",
+                    (*params, batch_size),
+                ).fetchall()
+                if not rows:
+                    return
+                yield [dict(row) for row in rows]
+                if len(rows) < batch_size:
+                    return
+                before = (rows[-1]["timestamp"], rows[-1]["id"])
+        finally:
+            conn.close()
+
+    def get_activity(
+        self,
+        bucket: str,
+        start: date,
+        end: date,
+        exercise: Optional[str] = None,
+    ) -> List[Dict]:
+        """
+        Reps, sessions and duration per day/week/month, oldest first.
+
+        Every period overlapping [start, end] (local dates, inclusive) is
+        returned in full and zero-filled, so charts get a fixed-size series. Without
+        an exercise filter the daily_stats rollup is grouped (one row per
+        day); with one, sessions are grouped over the (exercise, timestamp)
+        index.
+        """
+        if bucket not in PERIOD_EXPR:
+            raise ValueError(f"Unknown bucket: {bucket}")
+        # Widen to whole periods
+        start = period_start(bucket, start)
+        end = next_period(bucket, period_start(bucket, end)) - timedelta(days=1)
+
+        with self.get_connection() as conn:
+            if exercise is None:
+                period = PERIOD_EXPR[bucket].format(d="day")
+                rows = conn.execute(
+                    f"SELECT {period} AS period, SUM(reps), SUM(sessions), SUM(duration) "
+                    "FROM daily_stats WHERE day BETWEEN ? AND ? GROUP BY period",
+                    (start.isoformat(), end.isoformat()),
+                ).fetchall()
+            else:
+                period = PERIOD_EXPR[bucket].format(d=DAY_EXPR.format("timestamp"))
+                # Local-midnight bounds, matching the localtime day buckets
+                since = datetime.combine(start, datetime.min.time()).timestamp()
+                until = datetime.combine(
+                    end + timedelta(days=1), datetime.min.time()
+                ).timestamp()
+                rows = conn.execute(
+                    f"SELECT {period} AS period, SUM(reps), COUNT(*), SUM(duration) "
+                    "FROM sessions WHERE exercise = ? AND timestamp >= ? AND timestamp < ? "
+                    "GROUP BY period",
+                    (exercise, since, until),
+                ).fetchall()
+
+        totals = {row[0]: row[1:] for row in rows}
+        series = []
+        current = start
+        while current <= end:
+            reps, sessions, duration = totals.get(current.isoformat(), (0, 0, 0))
+            series.append(
+                {
+                    "period": current.isoformat(),
+                    "reps": reps,
+                    "sessions": sessions,
+                    "duration": duration,
+                }
+            )
+            current = next_period(bucket, current)
+        return series
+
     def get_stats(self) -> Dict:
         with self.get_connection() as conn:
             cursor = conn.cursor()
 
-            # Total Reps and Sessions
-            cursor.execute("SELECT SUM(reps), COUNT(*) FROM sessions")
+            # Total Reps and Sessions (one rollup row per exercise)
+            cursor.execute("SELECT SUM(reps), SUM(sessions) FROM exercise_stats")
             row = cursor.fetchone()
             total_reps = row[0] if row and row[0] else 0
             total_sessions = row[1] if row and row[1] else 0
 
-            # Streak Calculation
-            cursor.execute(
-                "SELECT DISTINCT date(timestamp, 'unixepoch', 'localtime') as day FROM sessions ORDER BY day DESC"
-            )
-            dates = [row[0] for row in cursor.fetchall()]
-
             # Streak Calculation Edge Cases:
             #
             # Case 1: User works out today at 11 PM, then tomorrow at 1 AM
@@ -184,34 +756,28 @@ class Database:
             #   ✅ Streak continues (forgives single-day gap to reduce anxiety)
             #
             # Case 4: Timezone changes (user travels)
-            #   ⚠️  Uses localtime from timestamp—may cause streak breaks on travel
+            #   ⚠️  Days are bucketed in localtime at insert—may cause streak breaks on travel
             #
             # Case 5: Multiple workouts in same day
-            #   ✅ Counted as 1 day (DISTINCT date() in query)
+            #   ✅ Counted as 1 day (one daily_stats row per day)
 
+            # Walk the day index newest-first; rows are fetched lazily, so
+            # only the streak plus the first gap is ever read
+            today = date.today()
+            cursor.execute("SELECT day FROM daily_stats ORDER BY day DESC")
             streak = 0
-            if dates:
-                from datetime import datetime, timedelta
-
-                today = datetime.now().date()
-                yesterday = today - timedelta(days=1)
-
+            first = cursor.fetchone()
+            if first:
+                last_session_date = date.fromisoformat(first[0])
                 # Check if last session was today or yesterday to keep streak alive
-                last_session_date = datetime.strptime(dates[0], "%Y-%m-%d").date()
-
-                if last_session_date == today or last_session_date == yesterday:
+                if today - last_session_date <= timedelta(days=1):
                     streak = 1
-                    current_check = last_session_date
-
-                    for i in range(1, len(dates)):
-                        prev_date = datetime.strptime(dates[i], "%Y-%m-%d").date()
-                        if prev_date == current_check - timedelta(days=1):
-                            streak += 1
-                            current_check = prev_date
-                        else:
+                    expected = last_session_date - timedelta(days=1)
+                    for (day,) in cursor:
+                        if day != expected.isoformat():
                             break
-                else:
-                    streak = 0
+                        streak += 1
+                        expected -= timedelta(days=1)
 
             return {
                 "total_reps": total_reps,
@@ -223,35 +789,33 @@ class Database:
         with self.get_connection() as conn:
             cursor = conn.cursor()
 
+            # Both charts read the per-exercise rollup (one row per exercise)
+            cursor.execute(
+                "SELECT exercise, sessions, max_reps FROM exercise_stats ORDER BY exercise"
+            )
+            rows = cursor.fetchall()
+
             # 1. Exercise Distribution (Pie Chart)
-            cursor.execute("SELECT exercise, COUNT(*) FROM sessions GROUP BY exercise")
-            distribution = [
-                {"name": row[0], "value": row[1]} for row in cursor.fetchall()
-            ]
+            distribution = [{"name": row[0], "value": row[1]} for row in rows]
 
             # 2. Personal Records (Max Reps per Exercise)
-            cursor.execute("SELECT exercise, MAX(reps) FROM sessions GROUP BY exercise")
-            prs = [{"exercise": row[0], "reps": row[1]} for row in cursor.fetchall()]
+            prs = [{"exercise": row[0], "reps": row[2]} for row in rows]
 
             return {"distribution": distribution, "prs": prs}
 
     def delete_session(self, session_id: int):
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
-            conn.commit()
+        self.apply_writes([("delete", session_id)])
 
     def delete_all_sessions(self):
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM sessions")
-            conn.commit()
+        self.apply_writes([("delete_all",)])
 
     def close(self):
-        """Close the thread-local connection if it exists."""
-        if hasattr(self._local, "conn"):
-            self._local.conn.close()
-            del self._local.conn
+        """Close pooled connections (they reopen lazily if used again)."""
+        self._pool.close()
+        with self._watch_lock:
+            if self._watch is not None:
+                self._watch.close()
+            self._watch = self._seen = None
 
 
 # Global instance
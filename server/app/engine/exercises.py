@@ -19,10 +19,24 @@ Form Thresholds:
     - Squat depth: <90° knee angle (parallel or below)
     - Plank form: 160-200° alignment (straight body)
 
+Joint Angles:
+    Every angle any strategy needs is listed once in JOINT_ANGLES. The
+    pipeline computes them all per frame in one vectorized pass
+    (compute_joint_angles) and hands the shared vector to process(); a
+    strategy called without it computes the vector itself.
+
+Snapshots:
+    snapshot() captures a strategy's counting state (reps, state machine,
+    plus subclass fields like the pushup direction/form or plank frames) as
+    plain JSON types, and restore() continues from it, so a session can be
+    parked while its client reconnects (possibly to another worker).
+    Subclasses only need to keep their state in instance attributes.
+
 Adding New Exercises:
     1. Create a new class extending ExerciseStrategy
-    2. Implement process() with landmark indices and angle thresholds
-    3. Add to EXERCISE_MAP dictionary
+    2. Add any new (a, b, c) triple to JOINT_ANGLES
+    3. Implement process() reading the angle vector and applying thresholds
+    4. Add to EXERCISE_MAP dictionary
 
 Landmark Indices (MediaPipe pose):
     11: Left shoulder, 13: Left elbow, 15: Left wrist
@@ -32,10 +46,12 @@ Landmark Indices (MediaPipe pose):
 
 from abc import ABC, abstractmethod
 from enum import Enum, auto
-from typing import List, Dict, Optional
-from app.schemas import Landmark
-from app.core.geometry import calculate_angle
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
 
+from app.core.geometry import calculate_angles
+from app.schemas import LandmarkArray, Landmarks
 
 # State Machine Diagram:
 #
@@ -61,6 +77,31 @@ from app.core.geometry import calculate_angle
 # Plank:   monitors body alignment (shoulder-hip-ankle)
 
 
+# Joint angles shared by all strategies, in angle-vector order.
+# Each entry is (name, (a, b, c)) with the vertex at b.
+JOINT_ANGLES = (
+    ("left_elbow", (11, 13, 15)),
+    ("left_shoulder", (13, 11, 23)),
+    ("left_hip", (11, 23, 25)),
+    ("left_knee", (23, 25, 27)),
+    ("body_line", (11, 23, 27)),  # shoulder-hip-ankle
+)
+ANGLE_TRIPLES = np.array([triple for _, triple in JOINT_ANGLES], dtype=np.intp)
+ELBOW, SHOULDER, HIP, KNEE, BODY_LINE = range(len(JOINT_ANGLES))
+
+
+def compute_joint_angles(landmarks: Landmarks | np.ndarray) -> np.ndarray:
+    """
+    Every JOINT_ANGLES entry for a frame, in one vectorized pass.
+
+    Accepts a LandmarkArray, list of Landmark, (33, 4) array, or a
+    (frames, 33, 4) stack (returns (frames, len(JOINT_ANGLES))).
+    """
+    if not isinstance(landmarks, np.ndarray):
+        landmarks = LandmarkArray.coerce(landmarks)
+    return calculate_angles(landmarks, ANGLE_TRIPLES)
+
+
 class ExerciseState(Enum):
     START = auto()
     ECCENTRIC = auto()  # Going down
@@ -75,14 +116,45 @@ class ExerciseStrategy(ABC):
         self.feedback = {"message": "READY", "color": "green"}  # Structured feedback
 
     @abstractmethod
-    def process(self, landmarks: List[Landmark]) -> Dict:
-        pass
+    def process(
+        self, landmarks: Landmarks, angles: Optional[Sequence[float]] = None
+    ) -> Dict:
+        """
+        Update rep state from one frame.
+
+        Args:
+            landmarks: The frame's 33 pose landmarks.
+            angles: Precomputed compute_joint_angles() vector for this
+                frame, shared across consumers. Computed here if omitted.
+        """
+
+    @staticmethod
+    def joint_angles(
+        landmarks: Landmarks, angles: Optional[Sequence[float]] = None
+    ) -> List[float]:
+        """Return the frame's angle vector as plain floats (cheap to compare)."""
+        if angles is None:
+            angles = compute_joint_angles(landmarks)
+        return angles.tolist() if isinstance(angles, np.ndarray) else list(angles)
 
     def reset(self):
         self.reps = 0
         self.state = ExerciseState.START
         self.feedback = {"message": "READY", "color": "green"}
 
+    def snapshot(self) -> Dict:
+        """Counting state as plain JSON types (see restore())."""
+        state = dict(vars(self))
+        state["state"] = self.state.name
+        return state
+
+    def restore(self, snapshot: Dict):
+        """Continue from a snapshot() of the same strategy class."""
+        for name, value in snapshot.items():
+            if name in vars(self):
+                setattr(self, name, value)
+        self.state = ExerciseState[snapshot.get("state", ExerciseState.START.name)]
+
 
 class PushupStrategy(ExerciseStrategy):
     def __init__(self):
@@ -90,7 +162,9 @@ class PushupStrategy(ExerciseStrategy):
         self.direction = 0
         self.form = 0
 
-    def process(self, landmarks: List[Landmark]) -> Dict:
+    def process(
+        self, landmarks: Landmarks, angles: Optional[Sequence[float]] = None
+    ) -> Dict:
         """
         Pushup Logic (Exact Replica of docs/pushup/PushUpCounter.py):
         - Counts in 0.5 increments (Down=0.5, Up=0.5)
@@ -106,15 +180,10 @@ class PushupStrategy(ExerciseStrategy):
             # shoulder: 13-11-23
             # hip: 11-23-25
 
-            p11 = landmarks[11]
-            p13 = landmarks[13]
-            p15 = landmarks[15]
-            p23 = landmarks[23]
-            p25 = landmarks[25]
-
-            elbow = calculate_angle(p11, p13, p15)
-            shoulder = calculate_angle(p13, p11, p23)
-            hip = calculate_angle(p11, p23, p25)
+            angles = self.joint_angles(landmarks, angles)
+            elbow = angles[ELBOW]
+            shoulder = angles[SHOULDER]
+            hip = angles[HIP]
 
             feedback_msg = "Fix Form"
             feedback_color = "yellow"
@@ -179,7 +248,9 @@ class PushupStrategy(ExerciseStrategy):
 
 
 class SquatStrategy(ExerciseStrategy):
-    def process(self, landmarks: List[Landmark]) -> Dict:
+    def process(
+        self, landmarks: Landmarks, angles: Optional[Sequence[float]] = None
+    ) -> Dict:
         """
         Squat Logic:
         - Monitors Hip/Knee Angle
@@ -189,11 +260,8 @@ class SquatStrategy(ExerciseStrategy):
         - Deep Squat: < 90 (or 100 depending on flexibility)
         """
         try:
-            hip = landmarks[23]
-            knee = landmarks[25]
-            ankle = landmarks[27]
-
-            angle = calculate_angle(hip, knee, ankle)
+            # Knee angle: hip-knee-ankle
+            angle = self.joint_angles(landmarks, angles)[KNEE]
 
             if self.state == ExerciseState.START:
                 if angle > 160:
@@ -232,17 +300,16 @@ class PlankStrategy(ExerciseStrategy):
         self.duration_frames = 0  # Naive counter (frame based)
         # Ideally we'd use timestamp, but this is a simple start
 
-    def process(self, landmarks: List[Landmark]) -> Dict:
+    def process(
+        self, landmarks: Landmarks, angles: Optional[Sequence[float]] = None
+    ) -> Dict:
         """
         Plank Logic:
         - Shoulder-Hip-Ankle should be ~180
         """
         try:
-            shoulder = landmarks[11]
-            hip = landmarks[23]
-            ankle = landmarks[27]
-
-            angle = calculate_angle(shoulder, hip, ankle)
+            # Body alignment: shoulder-hip-ankle
+            angle = self.joint_angles(landmarks, angles)[BODY_LINE]
 
             # Tolerance 160-200 (straight line)
             is_good_form = 160 < angle < 200  # Approx straight
@@ -0,0 +1,422 @@
+"""
+video_analysis.py - Offline analysis of recorded workout videos.
+
+The live pipeline (/ws) is limited to real time: one frame at a time at
+15 FPS. A recorded video has every frame available up front, so it can be
+split into temporally contiguous chunks and run through pose detection on
+several cores at once, finishing far faster than real time.
+
+Pipeline:
+    1. Probe: OpenCV reads frame count and FPS.
+    2. Sample: Frames are sampled down to ANALYSIS_FPS (15), the rate the
+       exercise strategies' thresholds and Plank timing are tuned for.
+    3. Detect (parallel): Each chunk runs in a worker process with its own
+       tracking detector (reset per chunk), returning a (frames, 33, 4)
+       landmark stack with NaN rows where no pose was found.
+    4. Score (sequential): Chunks are stitched back in order, joint angles
+       are computed for the whole stack in one pass, and the landmark
+       stream is replayed through the same get_strategy() strategy the
+       live pipeline uses.
+
+Chunk Boundaries:
+    MediaPipe tracking restarts at each chunk, so the first frame of a
+    chunk pays full detection instead of tracking. MIN_CHUNK_FRAMES keeps
+    chunks long enough for that to be noise.
+
+Jobs:
+    Uploads return a job id immediately; the job runs as a background task
+    and is polled for status (queued → running → done | failed) and
+    progress. Finished jobs are kept in memory (latest MAX_JOBS_KEPT).
+    shutdown() cancels running jobs (they end as failed) and waits for
+    them to delete their uploads.
+
+Workers:
+    A job runs in the worker that accepted the upload. With a store (see
+    app/session_store.py), every status change is also published under
+    "video:<job id>" for VIDEO_JOB_TTL seconds, so a poll that lands on
+    another worker still finds it; get() checks this worker first.
+
+Resources:
+    Each video worker holds its own PoseDetector (~200MB), outside the live
+    pipeline's MAX_DETECTORS cap, and competes with /ws inference for CPU.
+    The default is therefore small; raise VIDEO_WORKERS on a box with spare
+    cores and memory.
+
+Environment:
+    - VIDEO_WORKERS: Worker processes for chunk detection (default: 2, or 1
+      on a single core; 0 = one thread in this process, shared by all jobs)
+    - MAX_VIDEO_MB: Upload size limit in megabytes (default: 200)
+    - VIDEO_JOB_TTL: Seconds a published job stays pollable (default: 3600)
+
+Usage:
+    analyzer = VideoAnalyzer(save_session=db.save_session, store=store)
+    job = analyzer.submit("/tmp/upload.mp4", "Squats")
+    await analyzer.publish(job)
+    analyzer.get(job["id"])  # {"status": "running", "progress": 0.5, ...}
+"""
+
+import asyncio
+import math
+import os
+import tempfile
+import time
+import uuid
+from collections import Counter, OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import structlog
+
+from app.core.pose_detector import PoseDetector
+from app.engine.exercises import compute_joint_angles, get_strategy
+from app.schemas import LandmarkArray
+from app.session_store import SessionStore
+
+VIDEO_WORKERS = int(os.getenv("VIDEO_WORKERS", str(min(2, os.cpu_count() or 1))))
+MAX_VIDEO_BYTES = int(os.getenv("MAX_VIDEO_MB", "200")) * 1024 * 1024
+VIDEO_JOB_TTL = float(os.getenv("VIDEO_JOB_TTL", "3600"))
+
+ANALYSIS_FPS = 15  # Strategies are tuned for the live 15 FPS stream
+MIN_CHUNK_FRAMES = 60  # Sampled frames; shorter chunks lose more to re-detection
+MAX_JOBS_KEPT = 100
+NUM_LANDMARKS = 33
+
+logger = structlog.get_logger()
+
+
+class VideoTooLargeError(ValueError):
+    """Raised when an upload exceeds MAX_VIDEO_BYTES."""
+
+
+def store_upload(src: BinaryIO, filename: str, max_bytes: int = MAX_VIDEO_BYTES) -> str:
+    """
+    Copy an uploaded file to a temp path OpenCV can open.
+
+    Keeps the original extension so FFmpeg picks the right demuxer.
+
+    Raises:
+        VideoTooLargeError: The upload is larger than `max_bytes`.
+    """
+    suffix = os.path.splitext(filename or "")[1] or ".mp4"
+    fd, path = tempfile.mkstemp(prefix="formcheck-video-", suffix=suffix)
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as dst:
+            while chunk := src.read(1024 * 1024):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise VideoTooLargeError(
+                        f"Video exceeds {max_bytes // (1024 * 1024)} MB limit"
+                    )
+                dst.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def probe_video(path: str) -> Tuple[int, float]:
+    """Return (frame_count, fps) or raise ValueError if OpenCV can't read it."""
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            raise ValueError("Could not open video")
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or ANALYSIS_FPS
+        if frame_count <= 0:
+            raise ValueError("Video has no frames")
+        return frame_count, fps
+    finally:
+        cap.release()
+
+
+def plan_chunks(
+    frame_count: int, stride: int, workers: int, min_chunk: int = MIN_CHUNK_FRAMES
+) -> List[Tuple[int, int]]:
+    """
+    Split the sampled frames into contiguous [start, stop) source-frame ranges.
+
+    Chunk starts are aligned to `stride` so every chunk samples the same
+    frames a single sequential pass would.
+    """
+    sampled = math.ceil(frame_count / stride)
+    n_chunks = max(1, min(max(1, workers), sampled // max(1, min_chunk)))
+    per_chunk = math.ceil(sampled / n_chunks)
+
+    chunks = []
+    for start in range(0, sampled, per_chunk):
+        stop = min(start + per_chunk, sampled)
+        chunks.append((start * stride, min(stop * stride, frame_count)))
+    return chunks
+
+
+# ---------------------------------------------------------------------------
+# Worker-side state (one tracking detector per worker, reset per chunk)
+# ---------------------------------------------------------------------------
+
+_detector_factory: Callable[[], PoseDetector] = PoseDetector
+_detector: Optional[PoseDetector] = None
+
+
+def _worker_init(detector_factory: Callable[[], PoseDetector]):
+    global _detector_factory, _detector
+    _detector_factory = detector_factory
+    _detector = None
+
+
+def _detect_chunk(path: str, start: int, stop: int, stride: int) -> np.ndarray:
+    """
+    Run pose detection over sampled frames of [start, stop).
+
+    Returns:
+        (n, 33, 4) float32 landmark stack; rows are NaN where no pose was
+        detected (or the frame couldn't be decoded).
+    """
+    global _detector
+    if _detector is None:
+        _detector = _detector_factory()
+    else:
+        _detector.reset()  # Each chunk is its own track
+
+    empty = np.full((NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+    rows: List[np.ndarray] = []
+    cap = cv2.VideoCapture(path)
+    try:
+        if start:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        for index in range(start, stop):
+            # grab() demuxes without decoding; only sampled frames are decoded
+            if not cap.grab():
+                break
+            if index % stride:
+                continue
+            ok, image = cap.retrieve()
+            result = _detector.process_image(image) if ok else None
+            rows.append(result.landmarks.data if result else empty)
+    finally:
+        cap.release()
+
+    if not rows:
+        return np.empty((0, NUM_LANDMARKS, 4), dtype=np.float32)
+    return np.stack(rows)
+
+
+def score_landmarks(exercise: str, stack: np.ndarray) -> Dict[str, Any]:
+    """
+    Replay a landmark stream through the exercise strategy.
+
+    Args:
+        exercise: Strategy name (see EXERCISE_MAP).
+        stack: (frames, 33, 4) landmarks at ANALYSIS_FPS, NaN rows = no pose.
+    """
+    strategy = get_strategy(exercise)
+    detected = ~np.isnan(stack[:, 0, 0]) if len(stack) else np.zeros(0, bool)
+    angles = compute_joint_angles(stack) if len(stack) else stack
+
+    feedback_counts: Counter = Counter()
+    result: Optional[Dict] = None
+    for i in np.flatnonzero(detected):
+        result = strategy.process(LandmarkArray(stack[i]), angles[i])
+        feedback_counts[result["feedback"]["message"]] += 1
+
+    return {
+        # Plank reports held seconds via the result, not strategy.reps
+        "reps": result["reps"] if result else strategy.reps,
+        "frames_analyzed": len(stack),
+        "frames_detected": int(detected.sum()),
+        "feedback": result["feedback"] if result else None,
+        "feedback_counts": dict(feedback_counts),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Server-side job manager
+# ---------------------------------------------------------------------------
+
+
+class VideoAnalyzer:
+    """
+    Runs video analysis jobs in the background across a process pool.
+
+    Args:
+        workers: Worker processes for chunk detection. 0 runs chunks on
+            one thread in this process (tests, development); it owns the
+            single detector, so concurrent jobs queue behind each other.
+        detector_factory: Picklable PoseDetector factory (overridable for tests).
+        save_session: Called as save_session(exercise, reps, duration) when
+            a job with save=True finishes with reps > 0.
+        min_chunk_frames: Minimum sampled frames per chunk.
+        store: Shared store that job status is published to, for polls
+            served by other workers. None keeps jobs in this process only.
+    """
+
+    def __init__(
+        self,
+        workers: int = VIDEO_WORKERS,
+        detector_factory: Callable[[], PoseDetector] = PoseDetector,
+        save_session: Optional[Callable[[str, float, int], None]] = None,
+        min_chunk_frames: int = MIN_CHUNK_FRAMES,
+        store: Optional[SessionStore] = None,
+    ):
+        self.workers = max(0, workers)
+        self.detector_factory = detector_factory
+        self.save_session = save_session
+        self.min_chunk_frames = min_chunk_frames
+        self.store = store
+        self._pool: Optional[Executor] = None
+        self._jobs: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # One thread, so snapshots reach the store in the order they're taken
+        self._publisher: Optional[ThreadPoolExecutor] = None
+
+    def _executor(self) -> Executor:
+        if self._pool is None:
+            # Inline: the module-level detector is shared, so only one
+            # thread may ever use it
+            pool = ThreadPoolExecutor if self.workers == 0 else ProcessPoolExecutor
+            self._pool = pool(
+                max_workers=max(1, self.workers),
+                initializer=_worker_init,
+                initargs=(self.detector_factory,),
+            )
+        return self._pool
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """A job's status, from this worker or the store (blocking)."""
+        job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            job = self.store.get(f"video:{job_id}")
+        return job
+
+    async def publish(self, job: Dict[str, Any]):
+        """Make the job's current status visible to other workers."""
+        if self.store is None:
+            return
+        if self._publisher is None:
+            self._publisher = ThreadPoolExecutor(max_workers=1)
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                self._publisher,
+                self.store.put,
+                f"video:{job['id']}",
+                dict(job),
+                VIDEO_JOB_TTL,
+            )
+        except Exception as e:
+            logger.error("video_job_publish_failed", job_id=job["id"], error=str(e))
+
+    def submit(self, path: str, exercise: str, save: bool = True) -> Dict[str, Any]:
+        """
+        Queue analysis of a video file. Takes ownership of `path` (deleted
+        when the job ends). Must be called from the event loop.
+        """
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "exercise": exercise,
+            "progress": 0.0,
+            "created_at": time.time(),
+            "result": None,
+            "error": None,
+        }
+        self._jobs[job["id"]] = job
+        self._evict_finished()
+        task = asyncio.create_task(self._run(job, path, save))
+        self._tasks[job["id"]] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job["id"], None))
+        return job
+
+    def _evict_finished(self):
+        finished = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job["status"] in ("done", "failed")
+        ]
+        for job_id in finished[: max(0, len(self._jobs) - MAX_JOBS_KEPT)]:
+            del self._jobs[job_id]
+
+    async def _run(self, job: Dict[str, Any], path: str, save: bool):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            frame_count, fps = await asyncio.to_thread(probe_video, path)
+            stride = max(1, round(fps / ANALYSIS_FPS))
+            chunks = plan_chunks(
+                frame_count, stride, self.workers, self.min_chunk_frames
+            )
+            job.update(status="running", chunks=len(chunks))
+            await self.publish(job)
+
+            executor = self._executor()
+            done = 0
+
+            async def detect(start: int, stop: int) -> np.ndarray:
+                nonlocal done
+                stack = await loop.run_in_executor(
+                    executor, _detect_chunk, path, start, stop, stride
+                )
+                done += 1
+                job["progress"] = done / len(chunks)
+                await self.publish(job)
+                return stack
+
+            stacks = await asyncio.gather(*(detect(*c) for c in chunks))
+
+            stack = np.concatenate(stacks) if stacks else np.empty((0, 33, 4))
+            result = await asyncio.to_thread(score_landmarks, job["exercise"], stack)
+
+            duration = int(frame_count / fps) if fps else 0
+            elapsed = time.perf_counter() - started
+            result.update(
+                duration=duration,
+                processing_seconds=round(elapsed, 3),
+                realtime_factor=(
+                    round(frame_count / fps / elapsed, 2) if elapsed else None
+                ),
+                saved=False,
+            )
+            if save and self.save_session and result["reps"] > 0:
+                await asyncio.to_thread(
+                    self.save_session, job["exercise"], result["reps"], duration
+                )
+                result["saved"] = True
+
+            job.update(status="done", progress=1.0, result=result)
+        except asyncio.CancelledError:
+            job.update(status="failed", error="Server shut down")
+            raise
+        except Exception as e:
+            job.update(status="failed", error=str(e))
+        finally:
+            await asyncio.to_thread(_remove_quietly, path)
+            await self.publish(job)
+
+    async def wait(self, job_id: str):
+        """Wait for a job to finish (tests and graceful shutdown)."""
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await task
+
+    async def shutdown(self):
+        """Cancel running jobs, wait for their cleanup, and stop the workers."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        # Each job deletes its upload on the way out
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self._publisher is not None:
+            await asyncio.to_thread(self._publisher.shutdown)
+            self._publisher = None
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
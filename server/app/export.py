@@ -0,0 +1,80 @@
+"""
+export.py - Streaming session history export (CSV / NDJSON).
+
+The dashboard used to download the entire history as one JSON list and
+build the CSV in the browser, so both the server and the client held every
+session in memory at once. Export now streams: Database.iter_sessions()
+reads fixed-size batches, each batch is encoded and sent as one chunk of a
+StreamingResponse, and memory stays flat however many sessions exist.
+
+Formats:
+    csv     - Header row, then one line per session (RFC 4180 quoting)
+    ndjson  - One JSON object per line (application/x-ndjson)
+
+Both carry the same fields (EXPORT_FIELDS). `timestamp` is Unix epoch
+seconds, as stored; `datetime` is the same instant as ISO 8601 UTC, since
+the server can't know the viewer's locale.
+
+Compatibility:
+    The dashboard's CSV used to be built in the browser with the columns
+    Date,Time,Exercise,Reps,Duration(s) in the viewer's locale. Consumers of
+    that layout need to switch to the columns above.
+
+Usage:
+    chunks = export_sessions("csv", db.iter_sessions(start=..., end=...))
+    StreamingResponse(chunks, media_type=EXPORT_MEDIA_TYPES["csv"])
+"""
+
+import csv
+import io
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List
+
+from app import codec
+
+EXPORT_FIELDS = ("id", "timestamp", "datetime", "exercise", "reps", "duration")
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _with_datetime(row: Dict) -> Dict:
+    row["datetime"] = datetime.fromtimestamp(row["timestamp"], timezone.utc).isoformat()
+    return row
+
+
+def _csv_chunks(batches: Iterable[List[Dict]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, EXPORT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(_with_datetime(row) for row in batch)
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(batches: Iterable[List[Dict]]) -> Iterator[str]:
+    for batch in batches:
+        yield "".join(
+            codec.dumps_text({k: row[k] for k in EXPORT_FIELDS}) + "\n"
+            for row in map(_with_datetime, batch)
+        )
+
+
+def export_sessions(fmt: str, batches: Iterable[List[Dict]]) -> Iterator[str]:
+    """
+    Encode batches of session rows as one text chunk per batch.
+
+    Raises:
+        ValueError: If `fmt` is not a key of EXPORT_MEDIA_TYPES.
+    """
+    if fmt == "csv":
+        return _csv_chunks(batches)
+    if fmt == "ndjson":
+        return _ndjson_chunks(batches)
+    raise ValueError(f"Unsupported export format: {fmt}")
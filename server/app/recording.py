@@ -0,0 +1,325 @@
+"""
+recording.py - Per-frame session recordings in a memory-mappable format.
+
+The database only stores each session's final rep count. With recording
+enabled, every processed frame's landmarks, timestamp and strategy output
+is appended to a flat float32 file next to formcheck.db, so sessions can
+later be replayed, re-scored with new thresholds, or analyzed offline.
+
+File Layout (recordings/<recording_id>.f32 + <recording_id>.json):
+
+    .f32  Append-only little-endian float32 rows, ROW_WIDTH columns each:
+        ┌──────┬──────────┬──────┬───────┬──────────┬──────────────────┐
+        │ t    │ detected │ reps │ angle │ feedback │ landmarks        │
+        │ 1    │ 1        │ 1    │ 1     │ 1        │ 33 × 4 (x,y,z,v) │
+        └──────┴──────────┴──────┴───────┴──────────┴──────────────────┘
+        t: seconds since session start
+        detected: 1.0 if a pose was found (landmarks are NaN otherwise)
+        angle: strategy's feedback angle (NaN if none)
+        feedback: index into the sidecar's "feedback_messages" list
+
+    .json Sidecar metadata: exercise, started_at (unix), frames, final
+        reps, column names, message table. Written when the recording
+        opens, rewritten before any rows that use a new feedback message
+        are appended, and again when the recording closes.
+
+Because rows are fixed-width with no header, the reader can np.memmap the
+file and slice columns (e.g. every frame's landmarks as (n, 33, 4)) without
+loading the whole session. A recording cut short by a crash is still
+readable up to the last complete row, feedback included: the sidecar's
+message table always covers every row already on disk.
+
+Hot Path:
+    record() only copies one row into a preallocated NumPy buffer. Full
+    buffers are handed to a single background writer thread, so the event
+    loop never touches the disk (creating the files included).
+
+Environment:
+    - RECORD_SESSIONS: "true" to record every WebSocket session (default: off)
+    - RECORDINGS_DIR: Output directory (default: recordings/ next to the DB)
+
+Usage:
+    recorder = SessionRecorder("Squats")
+    recorder.record(t, landmarks, result)
+    recorder.close(reps=10)
+
+    rec = open_recording(recorder.recording_id)
+    rec.landmarks[100:200]  # memory-mapped (100, 33, 4) view
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.schemas import LandmarkArray
+
+RECORD_SESSIONS = os.getenv("RECORD_SESSIONS", "false").lower() == "true"
+RECORDINGS_DIR = Path(os.getenv("RECORDINGS_DIR", "recordings"))
+
+NUM_LANDMARKS = 33
+COLUMNS = ("t", "detected", "reps", "angle", "feedback")
+LANDMARK_OFFSET = len(COLUMNS)
+ROW_WIDTH = LANDMARK_OFFSET + NUM_LANDMARKS * 4
+FLUSH_ROWS = 150  # ~10s of frames at 15 FPS per write
+
+_EMPTY_LANDMARKS = np.full(NUM_LANDMARKS * 4, np.nan, dtype=np.float32)
+
+
+# ---------------------------------------------------------------------------
+# Background writer
+# ---------------------------------------------------------------------------
+
+
+class _RecordingWriter:
+    """Single daemon thread that performs all recording file I/O in order."""
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="recording-writer", daemon=True
+                )
+                self._thread.start()
+        self._queue.put((fn, args))
+
+    def _run(self):
+        while True:
+            fn, args = self._queue.get()
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"Error writing recording: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until every queued write has hit the disk."""
+        self._queue.join()
+
+
+_writer = _RecordingWriter()
+
+
+def flush_recordings():
+    """Wait for pending recording writes (call on shutdown and in tests)."""
+    _writer.flush()
+
+
+def _append_rows(path: Path, rows: np.ndarray):
+    with open(path, "ab") as f:
+        rows.astype("<f4", copy=False).tofile(f)
+
+
+def _create_files(data_path: Path, meta_path: Path, meta: Dict[str, Any]):
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    data_path.touch()
+    _write_meta(meta_path, meta)
+
+
+def _write_meta(path: Path, meta: Dict[str, Any]):
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(meta))
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------------------------------
+# Recorder (hot path)
+# ---------------------------------------------------------------------------
+
+
+class SessionRecorder:
+    """
+    Buffers one session's frames and streams them to disk in the background.
+
+    Event-loop only (one recorder per WebSocket session).
+    """
+
+    def __init__(
+        self,
+        exercise: str,
+        directory: Optional[Path] = None,
+        flush_rows: int = FLUSH_ROWS,
+    ):
+        self.directory = Path(directory or RECORDINGS_DIR)
+        self.started_at = time.time()
+        self.recording_id = (
+            f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at))}"
+            f"-{uuid.uuid4().hex[:8]}"
+        )
+        self.data_path = self.directory / f"{self.recording_id}.f32"
+        self.meta_path = self.directory / f"{self.recording_id}.json"
+        self.exercise = exercise
+        self.frames = 0
+        self.closed = False
+
+        self._flush_rows = max(1, flush_rows)
+        self._buffer = np.empty((self._flush_rows, ROW_WIDTH), dtype=np.float32)
+        self._fill = 0
+        self._messages: Dict[str, int] = {}
+        # Messages in the sidecar's table as last written
+        self._published = 0
+
+        _writer.submit(_create_files, self.data_path, self.meta_path, self._meta())
+
+    def _meta(self, reps: Optional[float] = None) -> Dict[str, Any]:
+        return {
+            "recording_id": self.recording_id,
+            "exercise": self.exercise,
+            "started_at": self.started_at,
+            "ended_at": time.time() if self.closed else None,
+            "frames": self.frames,
+            "reps": reps,
+            "row_width": ROW_WIDTH,
+            "columns": list(COLUMNS) + ["landmarks"],
+            "feedback_messages": list(self._messages),
+        }
+
+    def record(
+        self,
+        t: float,
+        landmarks: Optional[LandmarkArray],
+        result: Optional[Dict[str, Any]] = None,
+        reps: float = 0,
+    ):
+        """
+        Append one frame.
+
+        Args:
+            t: Seconds since session start.
+            landmarks: Detected landmarks, or None for NO_DETECTION frames.
+            result: Strategy output (reps/feedback) if a pose was processed.
+            reps: Current rep count, used when there is no result.
+        """
+        if self.closed:
+            return
+
+        row = self._buffer[self._fill]
+        feedback = (result or {}).get("feedback") or {}
+        message = feedback.get("message")
+        angle = feedback.get("angle")
+
+        row[0] = t
+        row[1] = 1.0 if landmarks is not None else 0.0
+        row[2] = result["reps"] if result else reps
+        row[3] = np.nan if angle is None else angle
+        row[4] = np.nan if message is None else self._message_code(message)
+        row[LANDMARK_OFFSET:] = (
+            landmarks.data.reshape(-1) if landmarks is not None else _EMPTY_LANDMARKS
+        )
+
+        self._fill += 1
+        self.frames += 1
+        if self._fill == self._flush_rows:
+            self._flush()
+
+    def _message_code(self, message: str) -> int:
+        code = self._messages.get(message)
+        if code is None:
+            code = self._messages[message] = len(self._messages)
+        return code
+
+    def _flush(self):
+        if not self._fill:
+            return
+        # Hand the full buffer to the writer and start a fresh one
+        rows, self._fill = self._buffer[: self._fill], 0
+        self._buffer = np.empty((self._flush_rows, ROW_WIDTH), dtype=np.float32)
+        if len(self._messages) > self._published:
+            # Table first, so rows on disk never use a code it lacks
+            self._published = len(self._messages)
+            _writer.submit(_write_meta, self.meta_path, self._meta())
+        _writer.submit(_append_rows, self.data_path, rows)
+
+    def close(self, reps: Optional[float] = None):
+        """Flush remaining frames and finalize the sidecar metadata."""
+        if self.closed:
+            return
+        self._flush()
+        self.closed = True
+        _writer.submit(_write_meta, self.meta_path, self._meta(reps))
+
+
+# ---------------------------------------------------------------------------
+# Reader (memory-mapped)
+# ---------------------------------------------------------------------------
+
+
+class Recording:
+    """
+    Read-only, memory-mapped view of a recorded session.
+
+    Column accessors return views into the mapped file; nothing is loaded
+    until it's sliced or computed on.
+    """
+
+    def __init__(self, data_path: Path, meta_path: Path):
+        self.meta: Dict[str, Any] = json.loads(meta_path.read_text())
+        width = self.meta.get("row_width", ROW_WIDTH)
+        rows = data_path.stat().st_size // (width * 4)
+        if rows:
+            self.rows = np.memmap(data_path, dtype="<f4", mode="r", shape=(rows, width))
+        else:
+            self.rows = np.empty((0, width), dtype="<f4")
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.rows[:, 0]
+
+    @property
+    def detected(self) -> np.ndarray:
+        return self.rows[:, 1] > 0.5
+
+    @property
+    def reps(self) -> np.ndarray:
+        return self.rows[:, 2]
+
+    @property
+    def angles(self) -> np.ndarray:
+        return self.rows[:, 3]
+
+    @property
+    def feedback_codes(self) -> np.ndarray:
+        return self.rows[:, 4]
+
+    @property
+    def landmarks(self) -> np.ndarray:
+        """(frames, 33, 4) landmark stack (NaN rows where undetected)."""
+        return self.rows[:, LANDMARK_OFFSET:].reshape(-1, NUM_LANDMARKS, 4)
+
+    def feedback_messages(self) -> List[Optional[str]]:
+        table = self.meta.get("feedback_messages", [])
+        return [
+            None if np.isnan(code) else table[int(code)] for code in self.feedback_codes
+        ]
+
+
+def open_recording(recording_id: str, directory: Optional[Path] = None) -> Recording:
+    """Memory-map a recording by id (raises FileNotFoundError if unknown)."""
+    directory = Path(directory or RECORDINGS_DIR)
+    return Recording(
+        directory / f"{recording_id}.f32", directory / f"{recording_id}.json"
+    )
+
+
+def list_recordings(directory: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """Metadata of every recording in `directory`, newest first."""
+    directory = Path(directory or RECORDINGS_DIR)
+    if not directory.exists():
+        return []
+    metas = [json.loads(p.read_text()) for p in directory.glob("*.json")]
+    return sorted(metas, key=lambda m: m.get("started_at", 0), reverse=True)
@@ -0,0 +1,105 @@
+"""
+response_cache.py - Version-keyed response cache with ETag support.
+
+The dashboard polls /api/stats, /api/analytics and /api/sessions, and each
+call used to re-run its queries even though workout data only changes when
+a session is saved or deleted. Database.data_version changes on every
+committed mutation, so a response computed at version N stays valid until
+the version moves on.
+
+Two layers:
+    1. ETag / If-None-Match: The ETag is the data version. A client that
+       already has the current version gets 304 Not Modified with no body
+       and no data query; reading the version costs one PRAGMA on a held
+       connection (see Database.data_version).
+    2. Body cache: The serialized JSON body is kept per (endpoint, params)
+       key with the version it was computed at, so other clients (or a
+       client without the ETag) get the bytes without re-running the
+       endpoint's queries.
+
+Entries are never invalidated explicitly; a lookup at a newer version just
+recomputes. The cache is a bounded LRU (MAX_ENTRIES). Responses that also
+depend on something besides stored data (the streak depends on today's
+date) fold it into the version they pass in.
+
+Workers:
+    The data version is stored in the database (see app/database.py), so
+    every worker issues the same ETag for the same data and a tag from one
+    worker revalidates on another. Only the body cache is per process.
+
+Usage:
+    cache = ResponseCache()
+    return cache.respond(request, ("stats",), db.data_version, db.get_stats)
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+
+from app import codec
+
+MAX_ENTRIES = 256
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, Tuple[Hashable, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def etag(self, version: Hashable) -> str:
+        return f'W/"{version}"'
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, version: Hashable, body: bytes):
+        with self._lock:
+            self._entries[key] = (version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def respond(
+        self,
+        request: Request,
+        key: Hashable,
+        version: Hashable,
+        compute: Callable[[], Any],
+        store: bool = True,
+    ) -> Response:
+        """
+        Serve `compute()` as JSON with an ETag for `version`.
+
+        Returns 304 if the request's If-None-Match already names this
+        version, the cached body if one exists for (key, version), and
+        otherwise computes, caches (unless store=False) and returns it.
+        """
+        etag = self.etag(version)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in (tag.strip() for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+
+        body = self.get(key, version)
+        if body is None:
+            body = codec.dumps(compute())
+            if store:
+                self.put(key, version, body)
+        return Response(body, media_type="application/json", headers=headers)
@@ -1,18 +1,26 @@
 """
-schemas.py - Pydantic models for pose detection data structures.
+schemas.py - Data structures for pose detection results.
 
 Defines the data contracts between the pose detector and exercise strategies.
-Using Pydantic provides automatic validation and .dict() serialization
-for JSON WebSocket responses.
 
 Landmark Coordinates:
     - x, y: Normalized position (0.0-1.0 relative to image dimensions)
     - z: Depth estimate (less reliable, relative to hip midpoint)
     - visibility: Confidence score (0.0-1.0) for this landmark
+
+Landmark Storage:
+    The frame pipeline carries landmarks as a LandmarkArray: one (33, 4)
+    float32 array in [x, y, z, visibility] column order. Building 33
+    validated Pydantic models per frame (~10k/s at 15 FPS x 20 clients) was
+    pure overhead. LandmarkArray still supports `landmarks[11].x`, so code
+    written against List[Landmark] keeps working, and plain lists of
+    Landmark are coerced on the way into PoseResult.
 """
 
-from pydantic import BaseModel
-from typing import List
+from typing import Any, Dict, Iterable, List, NamedTuple, Sequence, Union
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict, field_validator
 
 
 class Landmark(BaseModel):
@@ -22,5 +30,82 @@ class Landmark(BaseModel):
     visibility: float
 
 
+class LandmarkPoint(NamedTuple):
+    """Lightweight read-only view of one LandmarkArray row."""
+
+    x: float
+    y: float
+    z: float
+    visibility: float
+
+
+class LandmarkArray:
+    """
+    Fixed-width landmark container backed by an (N, 4) float32 array.
+
+    Columns are x, y, z, visibility (see X, Y, Z, VISIBILITY). Indexing
+    returns a LandmarkPoint so `landmarks[11].x` works as it did with a
+    list of Landmark models; vectorized code should use `.data` directly.
+    """
+
+    __slots__ = ("data",)
+
+    FIELDS = ("x", "y", "z", "visibility")
+    X, Y, Z, VISIBILITY = range(4)
+
+    def __init__(self, data: np.ndarray):
+        self.data = np.asarray(data, dtype=np.float32).reshape(-1, 4)
+
+    @classmethod
+    def from_landmarks(cls, landmarks: Iterable[Any]) -> "LandmarkArray":
+        """Build from objects with x/y/z/visibility attributes (MediaPipe, Landmark)."""
+        return cls(
+            np.array(
+                [(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks],
+                dtype=np.float32,
+            )
+        )
+
+    @classmethod
+    def coerce(cls, landmarks: "Landmarks") -> "LandmarkArray":
+        """Return `landmarks` as a LandmarkArray, converting lists if needed."""
+        if isinstance(landmarks, cls):
+            return landmarks
+        return cls.from_landmarks(landmarks)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, index: int) -> LandmarkPoint:
+        return LandmarkPoint(*self.data[index].tolist())
+
+    def __iter__(self):
+        return (LandmarkPoint(*row) for row in self.data.tolist())
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, LandmarkArray):
+            return NotImplemented
+        return np.array_equal(self.data, other.data)
+
+    def __repr__(self) -> str:
+        return f"LandmarkArray(n={len(self)})"
+
+    def to_dicts(self) -> List[Dict[str, float]]:
+        """JSON-ready [{x, y, z, visibility}, ...] (the WebSocket RESULT shape)."""
+        fields = self.FIELDS
+        return [dict(zip(fields, row)) for row in self.data.tolist()]
+
+
+# Anything strategies and geometry accept as a frame's landmarks
+Landmarks = Union[LandmarkArray, Sequence[Landmark]]
+
+
 class PoseResult(BaseModel):
-    landmarks: List[Landmark]
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    landmarks: LandmarkArray
+
+    @field_validator("landmarks", mode="before")
+    @classmethod
+    def _coerce_landmarks(cls, value: Any) -> LandmarkArray:
+        return LandmarkArray.coerce(value)
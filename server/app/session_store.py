@@ -0,0 +1,355 @@
+"""
+session_store.py - Shared WebSocket admission and session state.
+
+The /ws connection cap used to be checked against ConnectionManager's list
+and session state lived only in main.active_sessions, both private to one
+process. Under `uvicorn --workers N` (or several containers) every worker
+enforced its own cap, so the box admitted N x MAX_WS_CONNECTIONS pipelines,
+and a client reconnecting to another worker found nothing of its session.
+
+A SessionStore holds the two pieces that have to be shared:
+
+Admission:
+    acquire(owner, limit) atomically takes one of `limit` global slots for
+    a connection and release(owner) gives it back. Slots are leases owned
+    by the worker that took them: the worker calls refresh() periodically
+    (main.py does every SLOT_LEASE / 3 seconds), so slots of a worker that
+    died without releasing them expire after SLOT_LEASE seconds instead of
+    shrinking the cap forever.
+
+Session State:
+    put(key, state, ttl) stores a JSON-serializable dict (encoded with
+    app/codec.py) that any worker can get(key) or take(key) until it
+    expires. take() removes the entry, so exactly one worker gets it, and
+    expired() pops the entries past their TTL so exactly one worker
+    handles each. Keys are namespaced by their user: "session:<token>"
+    (parked sessions), "live:<token>" / "takeover:<token>" (which worker
+    holds a live session, and requests to hand it over), "ended:<token>"
+    (sessions already saved over REST; see main.py) and "video:<job id>".
+    Live per-frame state (strategy objects, recorders, encoders) stays in
+    the worker's active_sessions; only snapshots go through the store.
+
+    main.py parks a disconnected session's snapshot under the client's
+    session token for SESSION_RESUME_TTL seconds: an INIT with the same
+    token on any worker resumes it, and if none arrives in time the
+    sweeper saves it. A `shared` store keeps parked sessions across a
+    restart; the memory store's are saved at shutdown.
+
+Backends:
+    memory - Dicts in this process; correct for a single worker (default).
+    sqlite - Tables in a SQLite file shared by all workers on the host, or
+             containers mounting the same volume. BEGIN IMMEDIATE makes each
+             check-and-take a single writer transaction.
+
+Thread Safety:
+    Methods block (sqlite: briefly, up to DB_BUSY_TIMEOUT_MS on contention)
+    and may be called from any thread; the /ws handler calls them through
+    asyncio.to_thread.
+
+Environment:
+    - SESSION_STORE: "memory" or "sqlite" (default: memory)
+    - SESSION_STORE_PATH: SQLite file for the sqlite backend (default: sessions.db)
+    - SESSION_SLOT_LEASE: Seconds an unrefreshed slot stays taken (default: 60)
+    - SESSION_RESUME_TTL: Seconds a disconnected session waits for its
+      client to reconnect before it is saved (default: 120)
+
+Usage:
+    store = create_session_store()
+    if not store.acquire(connection_id, MAX_WS_CONNECTIONS):
+        ...  # reject: server busy
+    store.put(token, {"reps": 5}, ttl=120)
+    state = store.take(token)
+    store.release(connection_id)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app import codec
+from app.database import DB_BUSY_TIMEOUT_MS
+
+SESSION_STORE = os.getenv("SESSION_STORE", "memory").lower()
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", "sessions.db")
+SLOT_LEASE = float(os.getenv("SESSION_SLOT_LEASE", "60"))
+SESSION_RESUME_TTL = float(os.getenv("SESSION_RESUME_TTL", "120"))
+
+
+class SessionStore(ABC):
+    """
+    Attributes:
+        shared: Other processes see (and outlive) this store's contents.
+
+    Args:
+        lease: Seconds a slot stays taken without refresh().
+        clock: Wall clock shared by all workers (time.time).
+    """
+
+    shared = False
+
+    def __init__(
+        self, lease: float = SLOT_LEASE, clock: Callable[[], float] = time.time
+    ):
+        self.lease = lease
+        self.clock = clock
+        # Identifies this process's slots in a shared backend
+        self.worker = uuid.uuid4().hex
+
+    # -- Admission --------------------------------------------------------
+
+    @abstractmethod
+    def acquire(self, owner: str, limit: int) -> bool:
+        """Take a slot for `owner` if fewer than `limit` are taken."""
+
+    @abstractmethod
+    def release(self, owner: str):
+        """Give back `owner`'s slot (no-op if it has none)."""
+
+    @abstractmethod
+    def refresh(self):
+        """Extend the leases of every slot this worker holds."""
+
+    @abstractmethod
+    def release_worker(self):
+        """Give back every slot this worker holds (shutdown)."""
+
+    @abstractmethod
+    def admitted(self) -> int:
+        """Slots taken across all workers."""
+
+    # -- Session state ----------------------------------------------------
+
+    @abstractmethod
+    def put(self, key: str, state: Dict[str, Any], ttl: float):
+        """Store `state` under `key` for `ttl` seconds (replacing any entry)."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the unexpired entry for `key`, if any, leaving it stored."""
+
+    @abstractmethod
+    def take(self, key: str) -> Optional[Dict[str, Any]]:
+        """Remove and return the unexpired entry for `key`, if any."""
+
+    @abstractmethod
+    def expired(
+        self, before: Optional[float] = None
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        """Remove and return every entry expiring by `before` (default: now)."""
+
+    def close(self):
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._lock = threading.Lock()
+        self._slots: Dict[str, float] = {}
+        self._states: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+    def acquire(self, owner: str, limit: int) -> bool:
+        with self._lock:
+            if owner not in self._slots and len(self._slots) >= limit:
+                return False
+            self._slots[owner] = self.clock()
+            return True
+
+    def release(self, owner: str):
+        with self._lock:
+            self._slots.pop(owner, None)
+
+    def refresh(self):
+        # Slots can't outlive the process that holds them
+        pass
+
+    def release_worker(self):
+        with self._lock:
+            self._slots.clear()
+
+    def admitted(self) -> int:
+        return len(self._slots)
+
+    def put(self, key: str, state: Dict[str, Any], ttl: float):
+        with self._lock:
+            self._states[key] = (self.clock() + ttl, state)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._states.get(key)
+        if entry is None or entry[0] <= self.clock():
+            return None
+        return entry[1]
+
+    def take(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._states.get(key)
+            # Expired entries are left to expired() so they're handled once
+            if entry is None or entry[0] <= self.clock():
+                return None
+            del self._states[key]
+            return entry[1]
+
+    def expired(
+        self, before: Optional[float] = None
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        now = self.clock() if before is None else before
+        with self._lock:
+            keys = [key for key, (expires, _) in self._states.items() if expires <= now]
+            return [(key, self._states.pop(key)[1]) for key in keys]
+
+
+_SQLITE_TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS ws_slots (
+        owner TEXT PRIMARY KEY,
+        worker TEXT NOT NULL,
+        expires REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS session_state (
+        key TEXT PRIMARY KEY,
+        state TEXT NOT NULL,
+        expires REAL NOT NULL
+    )
+    """,
+)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Args:
+        path: SQLite file shared by the workers (created if missing).
+    """
+
+    shared = True
+
+    def __init__(self, path: str = SESSION_STORE_PATH, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        # One connection per store; the lock keeps it to one thread at a time
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.Lock()
+        with self._transaction() as cursor:
+            for table in _SQLITE_TABLES:
+                cursor.execute(table)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Write transaction; IMMEDIATE takes the lock before the first read."""
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+
+    def acquire(self, owner: str, limit: int) -> bool:
+        now = self.clock()
+        with self._transaction() as cursor:
+            cursor.execute("DELETE FROM ws_slots WHERE expires <= ?", (now,))
+            cursor.execute("SELECT owner FROM ws_slots WHERE owner = ?", (owner,))
+            if cursor.fetchone() is None:
+                cursor.execute("SELECT COUNT(*) FROM ws_slots")
+                if cursor.fetchone()[0] >= limit:
+                    return False
+            cursor.execute(
+                "INSERT OR REPLACE INTO ws_slots VALUES (?, ?, ?)",
+                (owner, self.worker, now + self.lease),
+            )
+            return True
+
+    def release(self, owner: str):
+        with self._transaction() as cursor:
+            cursor.execute("DELETE FROM ws_slots WHERE owner = ?", (owner,))
+
+    def refresh(self):
+        with self._transaction() as cursor:
+            cursor.execute(
+                "UPDATE ws_slots SET expires = ? WHERE worker = ?",
+                (self.clock() + self.lease, self.worker),
+            )
+
+    def release_worker(self):
+        with self._transaction() as cursor:
+            cursor.execute("DELETE FROM ws_slots WHERE worker = ?", (self.worker,))
+
+    def admitted(self) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM ws_slots WHERE expires > ?", (self.clock(),)
+            ).fetchone()
+        return row[0]
+
+    def put(self, key: str, state: Dict[str, Any], ttl: float):
+        with self._transaction() as cursor:
+            cursor.execute(
+                "INSERT OR REPLACE INTO session_state VALUES (?, ?, ?)",
+                (key, codec.dumps_text(state), self.clock() + ttl),
+            )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM session_state WHERE key = ? AND expires > ?",
+                (key, self.clock()),
+            ).fetchone()
+        return None if row is None else codec.loads(row[0])
+
+    def take(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._transaction() as cursor:
+            cursor.execute(
+                "SELECT state FROM session_state WHERE key = ? AND expires > ?",
+                (key, self.clock()),
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            cursor.execute("DELETE FROM session_state WHERE key = ?", (key,))
+        return codec.loads(row[0])
+
+    def expired(
+        self, before: Optional[float] = None
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        with self._transaction() as cursor:
+            cursor.execute(
+                "SELECT key, state FROM session_state WHERE expires <= ?",
+                (self.clock() if before is None else before,),
+            )
+            rows = cursor.fetchall()
+            cursor.executemany(
+                "DELETE FROM session_state WHERE key = ?", [(key,) for key, _ in rows]
+            )
+        return [(key, codec.loads(state)) for key, state in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_session_store(kind: str = SESSION_STORE, **kwargs) -> SessionStore:
+    """
+    Build the configured backend.
+
+    Raises:
+        ValueError: Unknown backend name.
+    """
+    if kind == "memory":
+        return MemorySessionStore(**kwargs)
+    if kind == "sqlite":
+        return SQLiteSessionStore(**kwargs)
+    raise ValueError(f"Unknown SESSION_STORE: {kind}")
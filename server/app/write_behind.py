@@ -0,0 +1,199 @@
+"""
+write_behind.py - Asynchronous write-behind queue for session persistence.
+
+Saving a session used to commit (and fsync) inside the handler that
+triggered it: the WebSocket disconnect path blocked the event loop on disk,
+and every /api/save-session or delete paid for its own transaction.
+
+SessionWriter instead accepts mutations instantly and hands them to one
+background task, which drains everything queued so far and applies it as a
+single transaction (Database.apply_writes) in a worker thread. Under load
+many sessions share one commit; when idle each is written right away.
+
+Ordering & Consistency:
+    Mutations are applied in submission order by a single writer, so a
+    save followed by a delete of the same row can't race. Each submission
+    returns a concurrent.futures.Future that settles when its op is
+    committed, or with the op's error. A REST write endpoint awaits its
+    own future (without holding a thread) before responding, so the client
+    that made the write reads it back (e.g. the dashboard refetching after
+    a delete) and hears about a failure. Reads never wait: other clients
+    may see a write a few milliseconds late.
+
+Failure Handling:
+    If a batch transaction fails, its ops are retried one by one so a
+    single bad op can't drop the rest of the batch; failures are logged
+    and set on the failing op's future.
+
+Shutdown:
+    close() flushes everything still queued before returning. Submissions
+    made while the writer isn't running (before startup, once close() has
+    begun) are applied synchronously instead of being lost; the switch
+    happens under the same lock as enqueueing, so none slips in between.
+
+Thread Safety:
+    Submission methods may be called from the event loop or from worker
+    threads (sync endpoints, asyncio.to_thread callers).
+
+Environment:
+    - WRITE_BATCH_SIZE: Max mutations per transaction (default: 100)
+
+Usage:
+    writer = SessionWriter(db)
+    await writer.start()
+    writer.save_session("Pushups", 25, 120)  # returns a Future immediately
+    await writer.close()
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional, Tuple
+
+import structlog
+
+from app.database import Database
+
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "100"))
+
+logger = structlog.get_logger()
+
+_STOP = object()
+
+
+class SessionWriter:
+    def __init__(self, database: Database, batch_size: int = WRITE_BATCH_SIZE):
+        self.db = database
+        self.batch_size = max(1, batch_size)
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Ops submitted and ops written so far (guarded by _idle)
+        self._submitted = 0
+        self._committed = 0
+        self._idle = threading.Condition()
+        self.batches = 0
+        self.written = 0
+
+    async def start(self):
+        """Start the writer task on the running loop."""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Flush pending writes and stop the writer task."""
+        if self._task is None:
+            return
+        # From here on, new submissions are written synchronously; the stop
+        # marker goes through the loop's callback queue too, so it lands
+        # behind every op submitted before the switch
+        with self._idle:
+            loop, self._loop = self._loop, None
+            loop.call_soon(self._queue.put_nowait, _STOP)
+        await self._task
+        self._task = self._queue = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    # -- Submission -------------------------------------------------------
+
+    def save_session(
+        self,
+        exercise: str,
+        reps: int,
+        duration: int = 0,
+        timestamp: Optional[float] = None,
+    ) -> Optional[Future]:
+        """Queue a session insert; the timestamp is taken now, not at commit."""
+        if reps == 0 and duration == 0:
+            return None
+        if timestamp is None:
+            timestamp = time.time()
+        return self._submit(("save", exercise, reps, duration, timestamp))
+
+    def delete_session(self, session_id: int) -> Future:
+        return self._submit(("delete", session_id))
+
+    def delete_all_sessions(self) -> Future:
+        return self._submit(("delete_all",))
+
+    def _submit(self, op: Tuple) -> Future:
+        """Queue `op` (or write it now); the Future settles once it's written."""
+        done: Future = Future()
+        with self._idle:
+            loop = self._loop
+            if loop is not None and not loop.is_closed():
+                self._submitted += 1
+                # Always via the loop's callback queue, so queue order is
+                # submission order even when threads and the loop both submit
+                loop.call_soon_threadsafe(self._queue.put_nowait, (op, done))
+                return done
+
+        self._write([(op, done)], queued=False)
+        return done
+
+    def wait_idle(self, timeout: Optional[float] = 5.0) -> bool:
+        """
+        Block until every write submitted so far is done (worker threads only).
+
+        Returns:
+            False if writes were still pending after `timeout` seconds.
+        """
+        with self._idle:
+            submitted = self._submitted
+            return self._idle.wait_for(lambda: self._committed >= submitted, timeout)
+
+    # -- Writer task ------------------------------------------------------
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch: List[Tuple[Tuple, Future]] = []
+            item = await self._queue.get()
+            # Take whatever else is already queued, up to the batch size
+            while True:
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size or self._queue.empty():
+                    break
+                item = self._queue.get_nowait()
+
+            if batch:
+                await asyncio.to_thread(self._write, batch)
+
+    def _write(self, batch: List[Tuple[Tuple, Future]], queued: bool = True):
+        try:
+            self.db.apply_writes([op for op, _ in batch])
+            errors = [None] * len(batch)
+        except Exception as e:
+            logger.error("write_batch_failed", ops=len(batch), error=str(e))
+            errors = []
+            for op, _ in batch:
+                try:
+                    self.db.apply_writes([op])
+                    errors.append(None)
+                except Exception as e:
+                    logger.error("write_failed", op=op[0], error=str(e))
+                    errors.append(e)
+
+        for (_, done), error in zip(batch, errors):
+            if error is None:
+                done.set_result(None)
+            else:
+                done.set_exception(error)
+        if not queued:
+            return
+        self.batches += 1
+        self.written += len(batch)
+        with self._idle:
+            self._committed += len(batch)
+            self._idle.notify_all()
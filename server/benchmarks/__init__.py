@@ -0,0 +1,15 @@
+"""
+benchmarks - Deterministic replay benchmarks for the frame pipeline.
+
+Replays fixed JPEG and landmark sequences through each pipeline layer and
+writes a JSON result file, so throughput and latency can be compared across
+releases on the same (CPU-only) runner.
+
+Usage (from server/):
+    python -m benchmarks --out bench.json
+    python -m benchmarks --video workout.mp4 --recording 20250101-120000-ab12cd34
+    python -m benchmarks --compare baseline.json bench.json
+
+See benchmarks/pipeline.py for what each benchmark measures and
+benchmarks/replay.py for the input sequences.
+"""
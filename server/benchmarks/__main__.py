@@ -0,0 +1,164 @@
+"""
+Command-line entry point: python -m benchmarks [options]
+
+Runs the selected pipeline benchmarks, prints a summary table and writes the
+full results as JSON (see benchmarks/pipeline.py for the file layout).
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict
+
+from benchmarks import pipeline, replay
+
+ALL_BENCHMARKS = (
+    "pose_detector",
+    "resolution",
+    "geometry",
+    "serialization",
+    "strategies",
+    "websocket",
+)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Replay fixed frame/landmark sequences through the pipeline.",
+    )
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=ALL_BENCHMARKS,
+        default=list(ALL_BENCHMARKS),
+        help="Benchmarks to run (default: all)",
+    )
+    parser.add_argument("--out", default="bench.json", help="Result file path")
+    parser.add_argument(
+        "--video", help="Video file or directory of JPEGs (default: synthetic frames)"
+    )
+    parser.add_argument(
+        "--recording",
+        help="Recording id to replay landmarks from (default: synthetic landmarks)",
+    )
+    parser.add_argument("--recordings-dir", help="Directory holding --recording")
+    parser.add_argument("--frames", type=int, default=300, help="JPEG frames")
+    parser.add_argument(
+        "--landmark-frames", type=int, default=3000, help="Synthetic landmark frames"
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=pipeline.DEFAULT_WARMUP, help="Unmeasured frames"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="InferenceExecutor workers for the websocket benchmark (0 = inline)",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=list(pipeline.RESOLUTION_SIZES),
+        help="Inference sizes for the resolution benchmark (0 = native, always run)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BASELINE", "CURRENT"),
+        help="Compare two result files instead of running benchmarks",
+    )
+    return parser.parse_args(argv)
+
+
+def print_summary(benchmarks: Dict[str, Dict[str, Any]]):
+    print(
+        f"{'benchmark':<24} {'fps':>10} {'stage':<24} {'p50':>9} {'p95':>9} {'p99':>9}"
+    )
+    for name, result in benchmarks.items():
+        first = True
+        for stage, stats in result["stages"].items():
+            fps = f"{result['fps']:.1f}" if first and result["fps"] else ""
+            print(
+                f"{name if first else '':<24} {fps:>10} {stage:<24} "
+                f"{stats['p50']:>9.3f} {stats['p95']:>9.3f} {stats['p99']:>9.3f}"
+            )
+            first = False
+    print("(latencies in ms)")
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        for row in pipeline.compare_results(baseline, current):
+            print(json.dumps(row))
+        return 0
+
+    needs_jpeg = {"pose_detector", "resolution", "websocket"} & set(args.only)
+    needs_landmarks = {"geometry", "serialization", "strategies"} & set(args.only)
+
+    frames = []
+    if needs_jpeg:
+        frames = (
+            replay.jpeg_frames_from_path(args.video, limit=args.frames)
+            if args.video
+            else replay.synthetic_jpeg_frames(args.frames, seed=args.seed)
+        )
+    landmarks = None
+    if needs_landmarks:
+        landmarks = (
+            replay.recording_landmarks(args.recording, args.recordings_dir)
+            if args.recording
+            else replay.synthetic_landmarks(args.landmark_frames, seed=args.seed)
+        )
+
+    benchmarks: Dict[str, Dict[str, Any]] = {}
+    if "pose_detector" in args.only:
+        benchmarks["pose_detector"] = pipeline.bench_pose_detector(
+            frames, warmup=args.warmup
+        )
+    if "resolution" in args.only:
+        try:
+            benchmarks.update(
+                pipeline.bench_resolution(frames, sizes=args.sizes, warmup=args.warmup)
+            )
+        except ValueError as e:
+            print(f"resolution: {e}", file=sys.stderr)
+            return 1
+    if "geometry" in args.only:
+        benchmarks["geometry"] = pipeline.bench_geometry(landmarks, warmup=args.warmup)
+    if "serialization" in args.only:
+        benchmarks.update(pipeline.bench_serialization(landmarks, warmup=args.warmup))
+    if "strategies" in args.only:
+        benchmarks.update(pipeline.bench_strategies(landmarks, warmup=args.warmup))
+    if "websocket" in args.only:
+        benchmarks["websocket"] = pipeline.bench_websocket(
+            frames, workers=args.workers, warmup=args.warmup
+        )
+
+    config = {
+        "only": args.only,
+        "video": args.video,
+        "recording": args.recording,
+        "frames": len(frames),
+        "landmark_frames": None if landmarks is None else len(landmarks),
+        "warmup": args.warmup,
+        "workers": args.workers,
+        "sizes": args.sizes,
+        "seed": args.seed,
+    }
+    pipeline.write_results(args.out, benchmarks, config)
+    print_summary(benchmarks)
+    print(f"Results written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
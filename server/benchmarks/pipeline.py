@@ -0,0 +1,502 @@
+"""
+pipeline.py - Replay benchmarks for each layer of the frame pipeline.
+
+Benchmarks:
+    pose_detector  - PoseDetector.process_frame over JPEG frames. Stages come
+                     from the detector's own last_timings (jpeg_decode,
+                     color_convert, inference), the same numbers /metrics
+                     reports in production; `skipped` counts frames the
+                     motion gate served without inference.
+    geometry       - calculate_angle once per JOINT_ANGLES entry (scalar),
+                     calculate_angles per frame, and calculate_angles over
+                     the whole stack (reported per frame).
+    resolution.<N> - PoseDetector.process_frame with INFERENCE_SIZE=N (0 =
+                     native): latency per stage plus landmark error vs the
+                     native-size run of the same frames, i.e. the accuracy
+                     cost of decoding/inferring at a smaller size. Motion
+                     gate and ROI crop are off. Needs frames with a person
+                     in them (--video); synthetic frames are rejected.
+    serialization.<F>
+                   - Building the RESULT message for F = json (legacy dicts,
+                     encoded with the JSON_CODEC backend, app/codec.py),
+                     compact (keyframes only) and delta, with mean message
+                     bytes; the serialize stage of the /ws handler.
+    strategy.<X>   - ExerciseStrategy.process for every EXERCISE_MAP entry,
+                     fed the shared compute_joint_angles() vector.
+    websocket      - The full /ws handler via TestClient: binary frame in,
+                     RESULT/NO_DETECTION out, one frame in flight at a time.
+                     Stage "round_trip" is client-observed latency.
+
+Every benchmark reports frames, wall seconds, fps, per-stage latency
+percentiles (ms) and peak RSS (MB, max of this process and its children so
+far; ru_maxrss only ever grows, so run a benchmark alone to isolate it).
+
+Determinism:
+    Inputs come from benchmarks/replay.py and are identical across runs.
+    The first `warmup` frames of every benchmark are run but not measured.
+"""
+
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from app import codec
+from app.core.geometry import calculate_angle, calculate_angles
+from app.core.protocol import LandmarkEncoder
+from app.engine.exercises import (
+    ANGLE_TRIPLES,
+    EXERCISE_MAP,
+    JOINT_ANGLES,
+    compute_joint_angles,
+)
+from app.schemas import LandmarkArray
+
+PERCENTILES = (50, 95, 99)
+DEFAULT_WARMUP = 10
+# Inference input sizes compared by bench_resolution (0 = native)
+RESOLUTION_SIZES = (0, 480, 320, 240)
+
+# Bumped when the result file layout changes incompatibly
+RESULT_VERSION = 1
+
+
+# ---------------------------------------------------------------------------
+# Measurement helpers
+# ---------------------------------------------------------------------------
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process or any child, in MB."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(max(own, children) / scale, 1)
+
+
+def summarize(samples: Sequence[float]) -> Dict[str, float]:
+    """Latency percentiles/mean/max in milliseconds for samples in seconds."""
+    ms = np.asarray(samples, dtype=np.float64) * 1000
+    if not len(ms):
+        return {}
+    stats = {f"p{p}": float(np.percentile(ms, p)) for p in PERCENTILES}
+    stats["mean"] = float(ms.mean())
+    stats["max"] = float(ms.max())
+    return {k: round(v, 4) for k, v in stats.items()}
+
+
+def _result(frames: int, seconds: float, stages: Dict[str, List[float]], **extra):
+    return {
+        "frames": frames,
+        "seconds": round(seconds, 4),
+        "fps": round(frames / seconds, 2) if seconds > 0 else None,
+        "stages": {name: summarize(s) for name, s in stages.items()},
+        "peak_rss_mb": peak_rss_mb(),
+        **extra,
+    }
+
+
+@contextmanager
+def _patched(obj: Any, attr: str, value: Any) -> Iterator[None]:
+    original = getattr(obj, attr)
+    setattr(obj, attr, value)
+    try:
+        yield
+    finally:
+        setattr(obj, attr, original)
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+
+def bench_pose_detector(
+    frames: Sequence[bytes],
+    detector_factory: Optional[Callable[[], Any]] = None,
+    warmup: int = DEFAULT_WARMUP,
+) -> Dict[str, Any]:
+    """PoseDetector.process_frame per JPEG frame, with its stage timings."""
+    if detector_factory is None:
+        from app.core.pose_detector import PoseDetector
+
+        detector_factory = PoseDetector
+
+    detector = detector_factory()
+    try:
+        for frame in frames[:warmup]:
+            detector.process_frame(frame)
+        detector.reset()
+
+        stages: Dict[str, List[float]] = {"total": []}
+        detected = skipped = 0
+        start = time.perf_counter()
+        for frame in frames:
+            t0 = time.perf_counter()
+            result = detector.process_frame(frame)
+            stages["total"].append(time.perf_counter() - t0)
+            detected += result is not None
+            timings = getattr(detector, "last_timings", {})
+            # Served by the motion gate without inference
+            skipped += "motion_gate" in timings and "inference" not in timings
+            for stage, seconds in timings.items():
+                stages.setdefault(stage, []).append(seconds)
+        elapsed = time.perf_counter() - start
+    finally:
+        detector.close()
+
+    return _result(len(frames), elapsed, stages, detected=detected, skipped=skipped)
+
+
+def _default_sized_detector(size: int):
+    from app.core.pose_detector import PoseDetector
+
+    # Every frame through inference at full view: a skipped or cropped frame
+    # would be compared against a different input than the native run saw
+    return PoseDetector(inference_size=size, roi_crop=False, motion_gate=False)
+
+
+def landmark_error(
+    reference: Sequence[Optional[np.ndarray]], landmarks: Sequence[Optional[np.ndarray]]
+) -> Dict[str, Any]:
+    """
+    Normalized x/y distance between two runs over the same frames.
+
+    Only frames detected in both runs count; `agreement` is the fraction of
+    frames where both runs agree on whether a pose was found.
+    """
+    distances = []
+    agree = 0
+    for ref, lms in zip(reference, landmarks):
+        agree += (ref is None) == (lms is None)
+        if ref is not None and lms is not None:
+            distances.append(np.linalg.norm(ref[:, :2] - lms[:, :2], axis=1).mean())
+    return {
+        "agreement": round(agree / len(reference), 4) if reference else None,
+        "mean_error": round(float(np.mean(distances)), 5) if distances else None,
+        "max_error": round(float(np.max(distances)), 5) if distances else None,
+    }
+
+
+def bench_resolution(
+    frames: Sequence[bytes],
+    sizes: Sequence[int] = RESOLUTION_SIZES,
+    detector_factory: Callable[[int], Any] = _default_sized_detector,
+    warmup: int = DEFAULT_WARMUP,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Latency/accuracy trade-off of the inference input size.
+
+    `detector_factory(size)` builds a detector capped at `size` pixels. Each
+    size replays the same frames; errors are measured against size 0.
+
+    Raises:
+        ValueError: The native-size run found no pose (e.g. synthetic
+            frames), so there is nothing to measure error against.
+    """
+    sizes = [0] + [size for size in sizes if size]
+    results = {}
+    reference: List[Optional[np.ndarray]] = []
+
+    for size in sizes:
+        detector = detector_factory(size)
+        try:
+            for frame in frames[:warmup]:
+                detector.process_frame(frame)
+            detector.reset()
+
+            stages: Dict[str, List[float]] = {"total": []}
+            landmarks: List[Optional[np.ndarray]] = []
+            start = time.perf_counter()
+            for frame in frames:
+                t0 = time.perf_counter()
+                result = detector.process_frame(frame)
+                stages["total"].append(time.perf_counter() - t0)
+                landmarks.append(None if result is None else result.landmarks.data)
+                for stage, seconds in getattr(detector, "last_timings", {}).items():
+                    stages.setdefault(stage, []).append(seconds)
+            elapsed = time.perf_counter() - start
+        finally:
+            detector.close()
+
+        if not size:
+            if not any(lms is not None for lms in landmarks):
+                raise ValueError(
+                    "No pose detected at native size, so landmark error can't "
+                    "be measured; run with --video on real footage"
+                )
+            reference = landmarks
+        results[f"resolution.{size}"] = _result(
+            len(frames),
+            elapsed,
+            stages,
+            inference_size=size,
+            detected=sum(lms is not None for lms in landmarks),
+            **landmark_error(reference, landmarks),
+        )
+    return results
+
+
+def bench_geometry(
+    landmarks: np.ndarray, warmup: int = DEFAULT_WARMUP
+) -> Dict[str, Any]:
+    """Scalar vs vectorized joint angles over a (frames, 33, 4) stack."""
+    arrays = [LandmarkArray(frame) for frame in landmarks]
+    triples = [triple for _, triple in JOINT_ANGLES]
+
+    def scalar(lms: LandmarkArray):
+        return [calculate_angle(lms[a], lms[b], lms[c]) for a, b, c in triples]
+
+    def vector(lms: LandmarkArray):
+        return calculate_angles(lms, ANGLE_TRIPLES)
+
+    for lms in arrays[:warmup]:
+        scalar(lms)
+        vector(lms)
+
+    stages: Dict[str, List[float]] = {"calculate_angle": [], "calculate_angles": []}
+    start = time.perf_counter()
+    for lms in arrays:
+        t0 = time.perf_counter()
+        scalar(lms)
+        t1 = time.perf_counter()
+        vector(lms)
+        stages["calculate_angle"].append(t1 - t0)
+        stages["calculate_angles"].append(time.perf_counter() - t1)
+    elapsed = time.perf_counter() - start
+
+    # One call for the whole stack, as video analysis does
+    t0 = time.perf_counter()
+    calculate_angles(landmarks, ANGLE_TRIPLES)
+    batch = (time.perf_counter() - t0) / len(landmarks)
+    stages["calculate_angles_batch"] = [batch]
+
+    return _result(len(arrays), elapsed, stages)
+
+
+def bench_serialization(
+    landmarks: np.ndarray, warmup: int = DEFAULT_WARMUP
+) -> Dict[str, Dict[str, Any]]:
+    """RESULT message size and encode time per wire format."""
+    arrays = [LandmarkArray(frame) for frame in landmarks]
+    fields = {"type": "RESULT", "timestamp": 0.0, "reps": 0}
+    fields.update(feedback="Good form", state="UP", seq=0)
+
+    def as_json(lms: LandmarkArray, encoder: Any) -> bytes:
+        return codec.dumps({**fields, "landmarks": lms.to_dicts()})
+
+    def as_compact(lms: LandmarkArray, encoder: LandmarkEncoder) -> bytes:
+        return encoder.encode(lms.data, fields)
+
+    formats = {"json": (as_json, None), "compact": (as_compact, False)}
+    formats["delta"] = (as_compact, True)
+
+    results = {}
+    for name, (encode, delta) in formats.items():
+        encoder = LandmarkEncoder(delta=bool(delta))
+        for lms in arrays[:warmup]:
+            encode(lms, encoder)
+        encoder.reset()
+
+        samples = []
+        sizes = []
+        start = time.perf_counter()
+        for lms in arrays:
+            t0 = time.perf_counter()
+            message = encode(lms, encoder)
+            samples.append(time.perf_counter() - t0)
+            sizes.append(len(message))
+        elapsed = time.perf_counter() - start
+
+        results[f"serialization.{name}"] = _result(
+            len(arrays),
+            elapsed,
+            {"serialize": samples},
+            mean_bytes=round(float(np.mean(sizes)), 1),
+        )
+    return results
+
+
+def bench_strategies(
+    landmarks: np.ndarray, warmup: int = DEFAULT_WARMUP
+) -> Dict[str, Dict[str, Any]]:
+    """Every registered ExerciseStrategy replaying the same landmark stream."""
+    arrays = [LandmarkArray(frame) for frame in landmarks]
+    angles = [compute_joint_angles(lms) for lms in arrays]
+    results = {}
+
+    for name, strategy_cls in EXERCISE_MAP.items():
+        strategy = strategy_cls()
+        for lms, vec in zip(arrays[:warmup], angles[:warmup]):
+            strategy.process(lms, vec)
+        strategy = strategy_cls()
+
+        samples = []
+        result: Dict[str, Any] = {}
+        start = time.perf_counter()
+        for lms, vec in zip(arrays, angles):
+            t0 = time.perf_counter()
+            result = strategy.process(lms, vec)
+            samples.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+
+        # Final reps double as a determinism check (Plank reports seconds)
+        results[f"strategy.{name}"] = _result(
+            len(arrays), elapsed, {"process": samples}, reps=result.get("reps")
+        )
+    return results
+
+
+def bench_websocket(
+    frames: Sequence[bytes],
+    detector_factory: Optional[Callable[[], Any]] = None,
+    workers: int = 0,
+    exercise: str = "Pushups",
+    warmup: int = DEFAULT_WARMUP,
+) -> Dict[str, Any]:
+    """
+    End-to-end /ws round trips with binary frames.
+
+    Runs the real app (decode, inference executor, strategy, serialize)
+    in-process. Sessions are not saved to the database, and the load
+    governor is disabled so every frame runs at the same model complexity.
+    """
+    from fastapi.testclient import TestClient
+
+    import main
+    from app.core.governor import LoadGovernor
+    from app.core.inference import InferenceExecutor
+    from app.core.pose_detector import PoseDetector
+    from app.core.protocol import encode_binary_frame
+
+    executor = InferenceExecutor(
+        workers=workers, detector_factory=detector_factory or PoseDetector
+    )
+    samples: List[float] = []
+    detected = 0
+
+    def receive_reply(ws) -> Dict[str, Any]:
+        # Frames get one RESULT/ERROR each; skip anything else (CONTROL)
+        while True:
+            message = json.loads(ws.receive_text())
+            if message["type"] != "CONTROL":
+                return message
+
+    with (
+        _patched(main, "inference", executor),
+        _patched(main, "governor", LoadGovernor(enabled=False)),
+        _patched(main.session_writer, "save_session", lambda *args, **kwargs: None),
+        TestClient(main.app) as client,
+        client.websocket_connect("/ws") as ws,
+    ):
+        ws.send_text(json.dumps({"type": "INIT", "exercise": exercise}))
+
+        for seq, frame in enumerate(frames[:warmup]):
+            ws.send_bytes(encode_binary_frame(frame, timestamp=seq, seq=seq))
+            receive_reply(ws)
+
+        start = time.perf_counter()
+        for seq, frame in enumerate(frames):
+            t0 = time.perf_counter()
+            ws.send_bytes(encode_binary_frame(frame, timestamp=seq, seq=seq))
+            response = receive_reply(ws)
+            samples.append(time.perf_counter() - t0)
+            detected += response["type"] == "RESULT"
+        elapsed = time.perf_counter() - start
+
+    return _result(
+        len(frames),
+        elapsed,
+        {"round_trip": samples},
+        detected=detected,
+        workers=workers,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Result files
+# ---------------------------------------------------------------------------
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    """Where the numbers came from; compare results only on like runners."""
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "git_revision": _git_revision(),
+    }
+    try:
+        import mediapipe
+
+        info["mediapipe"] = mediapipe.__version__
+    except ImportError:
+        info["mediapipe"] = None
+    info["json_codec"] = codec.codec.name
+    return info
+
+
+def write_results(
+    path: str | Path, benchmarks: Dict[str, Dict[str, Any]], config: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Write a benchmark result file and return its contents."""
+    document = {
+        "version": RESULT_VERSION,
+        "created_at": time.time(),
+        "environment": environment(),
+        "config": config,
+        "benchmarks": benchmarks,
+    }
+    Path(path).write_text(json.dumps(document, indent=2))
+    return document
+
+
+def compare_results(
+    baseline: Dict[str, Any], current: Dict[str, Any], stat: str = "p95"
+) -> List[Dict[str, Any]]:
+    """
+    Per-benchmark fps and per-stage latency ratios (current / baseline).
+
+    fps_ratio < 1 or latency ratio > 1 means `current` is slower.
+    """
+    rows = []
+    for name, new in current["benchmarks"].items():
+        old = baseline["benchmarks"].get(name)
+        if not old:
+            continue
+        row: Dict[str, Any] = {"benchmark": name}
+        if old.get("fps") and new.get("fps"):
+            row["fps_ratio"] = round(new["fps"] / old["fps"], 3)
+        for stage, stats in new["stages"].items():
+            before = old["stages"].get(stage, {}).get(stat)
+            if before and stats.get(stat) is not None:
+                row[f"{stage}.{stat}_ratio"] = round(stats[stat] / before, 3)
+        rows.append(row)
+    return rows
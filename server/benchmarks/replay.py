@@ -0,0 +1,164 @@
+"""
+replay.py - Deterministic input sequences for the pipeline benchmarks.
+
+Every benchmark run must see byte-identical inputs, otherwise a "regression"
+may just be a different workload. Two kinds of sequence are provided:
+
+JPEG Frames (PoseDetector, /ws):
+    - jpeg_frames_from_path(): A recorded video file or a directory of
+      .jpg files, re-encoded at the client's size and JPEG quality.
+    - synthetic_jpeg_frames(): Seeded 640x480 frames with a moving stick
+      figure over a textured background. MediaPipe rarely finds a pose in
+      them, so they measure decode and detection cost, not tracking.
+
+Landmark Sequences (geometry, strategies):
+    - recording_landmarks(): Detected frames of a session recorded with
+      RECORD_SESSIONS (see app/recording.py).
+    - synthetic_landmarks(): Seeded (frames, 33, 4) stack where the left
+      elbow and knee bend through full reps and the body line sags now and
+      then, so every strategy walks its whole state machine.
+"""
+
+import math
+from pathlib import Path
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from app.recording import open_recording
+
+# Match the client capture settings (client/src/lib/constants.ts)
+FRAME_WIDTH = 640
+FRAME_HEIGHT = 480
+JPEG_QUALITY = 60
+FRAME_RATE = 15
+
+# Frames per synthetic rep (~2s at 15 FPS)
+REP_FRAMES = 30
+
+
+def encode_jpeg(image: np.ndarray, quality: int = JPEG_QUALITY) -> bytes:
+    ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return buf.tobytes()
+
+
+def jpeg_frames_from_path(path: str | Path, limit: Optional[int] = None) -> List[bytes]:
+    """
+    Load JPEG frames from a video file or a directory of .jpg/.jpeg files.
+
+    Frames are resized to the client's capture size and re-encoded at its
+    JPEG quality, so the payloads match what /ws receives in production.
+    """
+    path = Path(path)
+    frames: List[bytes] = []
+
+    if path.is_dir():
+        files = sorted(
+            p for p in path.iterdir() if p.suffix.lower() in (".jpg", ".jpeg")
+        )
+        images = (cv2.imread(str(p), cv2.IMREAD_COLOR) for p in files)
+    else:
+        cap = cv2.VideoCapture(str(path))
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video: {path}")
+
+        def read_video():
+            try:
+                while True:
+                    ok, image = cap.read()
+                    if not ok:
+                        return
+                    yield image
+            finally:
+                cap.release()
+
+        images = read_video()
+
+    for image in images:
+        if limit is not None and len(frames) >= limit:
+            break
+        if image is None:
+            continue
+        image = cv2.resize(image, (FRAME_WIDTH, FRAME_HEIGHT))
+        frames.append(encode_jpeg(image))
+
+    if not frames:
+        raise ValueError(f"No frames found in {path}")
+    return frames
+
+
+def synthetic_jpeg_frames(n: int, seed: int = 0) -> List[bytes]:
+    """Seeded client-sized JPEG frames of a stick figure doing pushups."""
+    rng = np.random.default_rng(seed)
+    # Static textured background so JPEG sizes resemble a real room
+    background = cv2.GaussianBlur(
+        rng.integers(0, 256, (FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8), (9, 9), 0
+    )
+    frames = []
+    for i in range(n):
+        image = background.copy()
+        dip = 40 * (1 - math.cos(2 * math.pi * i / REP_FRAMES)) / 2
+        head = (180, int(200 + dip))
+        hip = (360, int(250 + dip / 2))
+        ankle = (520, 300)
+        hand = (200, 330)
+        elbow = (150, int(265 + dip / 2))
+        for a, b in ((head, hip), (hip, ankle), (head, elbow), (elbow, hand)):
+            cv2.line(image, a, b, (230, 210, 190), 12)
+        cv2.circle(image, (head[0] - 30, head[1] - 10), 24, (200, 180, 160), -1)
+        frames.append(encode_jpeg(image))
+    return frames
+
+
+def _rotate(vector: np.ndarray, degrees: float) -> np.ndarray:
+    r = math.radians(degrees)
+    c, s = math.cos(r), math.sin(r)
+    return np.array([c * vector[0] - s * vector[1], s * vector[0] + c * vector[1]])
+
+
+def synthetic_landmarks(n: int, seed: int = 0) -> np.ndarray:
+    """
+    Seeded (n, 33, 4) landmark stack exercising every strategy.
+
+    The left elbow and knee swing between ~70° and ~175° once per
+    REP_FRAMES, and every third rep the hip sags out of plank alignment.
+    """
+    rng = np.random.default_rng(seed)
+    stack = np.empty((n, 33, 4), dtype=np.float32)
+    base = rng.uniform(0.3, 0.7, (33, 2))
+
+    for i in range(n):
+        phase = (1 - math.cos(2 * math.pi * i / REP_FRAMES)) / 2  # 0 → 1 → 0
+        bend = 175 - 105 * phase
+        sag = 0.08 * phase if (i // REP_FRAMES) % 3 == 2 else 0.0
+
+        # Side view, body roughly horizontal (plank / pushup top position)
+        xy = base.copy()
+        xy[11] = (0.30, 0.40)  # shoulder
+        xy[23] = (0.55, 0.42 + sag)  # hip
+        xy[25] = (0.70, 0.43)  # knee
+
+        # Elbow below the shoulder; wrist rotated so the elbow angle = bend
+        xy[13] = xy[11] + (0.0, 0.12)
+        xy[15] = xy[13] + _rotate((xy[11] - xy[13]) * 0.9, bend)
+        # Ankle rotated about the knee so the knee angle = bend
+        xy[27] = xy[25] + _rotate((xy[23] - xy[25]) * 0.9, -bend)
+
+        stack[i, :, :2] = xy + rng.normal(0, 0.002, xy.shape)
+        stack[i, :, 2] = 0.0
+        stack[i, :, 3] = 0.95
+    return stack
+
+
+def recording_landmarks(
+    recording_id: str, directory: Optional[Path] = None
+) -> np.ndarray:
+    """Detected frames of a recorded session as a (frames, 33, 4) array."""
+    recording = open_recording(recording_id, directory=directory)
+    stack = np.asarray(recording.landmarks[recording.detected], dtype=np.float32)
+    if not len(stack):
+        raise ValueError(f"Recording {recording_id} has no detected frames")
+    return stack
@@ -3,15 +3,39 @@ main.py - FormCheck FastAPI Backend Server
 
 Real-time pose analysis server for exercise form feedback. Provides:
 1. WebSocket endpoint (/ws) for streaming pose detection at 15 FPS
+   (binary JPEG frames or legacy base64-in-JSON, see app/core/protocol.py)
 2. REST API endpoints for session history, stats, and analytics
+   plus offline video analysis (/api/analyze-video, polled by job id)
+3. Prometheus metrics (/metrics) with per-stage frame latency histograms
 
 Architecture:
 - WebSocket connections maintain per-client exercise strategies (Strategy pattern)
 - Pose detection via MediaPipe runs server-side to offload compute from browser
-- Sessions auto-save on disconnect if reps > 0
+- Inference runs in a worker process pool (InferenceExecutor), never on the event loop
+- Latest-frame-wins backpressure: stale frames are dropped, never queued
+- RESULTs are JSON by default; clients may negotiate a compact binary
+  landmark format with optional deltas (app/core/protocol.py)
+- Load governor trades model complexity and client capture rate for latency
+  under load, via CONTROL messages (app/core/governor.py)
+- Sessions save once, when they end: an END message, or (for clients that
+  send a session token in INIT) SESSION_RESUME_TTL after a disconnect with
+  no resuming INIT; tokenless sessions still save on disconnect if reps > 0.
+  An INIT whose token is still live on another connection (the client
+  reconnected before the server noticed the drop) takes that session over,
+  on this worker or, through the shared store, from another one. A token
+  saved over /api/save-session is tombstoned, so its socket's copy is dropped
+- The connection cap is a global admission counter in a SessionStore shared
+  by all workers (app/session_store.py), so `--workers N` keeps one cap
+- Session writes are queued and batched off the event loop (app/write_behind.py)
+- Dashboard reads are cached per data version and served with ETags (304s);
+  the version lives in the database, so ETags hold across workers
+- JSON is encoded/decoded with orjson when installed (app/codec.py)
+- Optional per-frame session recordings (RECORD_SESSIONS, see app/recording.py)
 
 Key Dependencies:
 - PoseDetector: Wraps MediaPipe for landmark extraction
+- InferenceExecutor: Process pool that owns long-lived PoseDetectors
+- DetectorPool: Bounded, pre-warmed detectors checked out per connection
 - ConnectionManager: Tracks active WebSocket connections
 - ExerciseStrategy: Per-exercise rep counting and feedback logic
 - Database: SQLite persistence for sessions and settings
@@ -19,29 +43,85 @@ Key Dependencies:
 Rate Limits:
 - Health/sessions: 60/min per IP
 - Analytics: 30/min per IP (more expensive query)
-- WebSocket: Max 20 concurrent connections globally
+- Video uploads: 5/min per IP
+- WebSocket: MAX_WS_CONNECTIONS (20) concurrent connections across all workers
 
 Environment:
 - ALLOWED_ORIGINS: Comma-separated origins for CORS
 - SENTRY_DSN: Optional error tracking
 - ENVIRONMENT: 'development' allows all origins
+- INFERENCE_WORKERS: Pose inference worker processes (0 = inline threads)
+- MAX_DETECTORS / DETECTOR_PRELOAD: Detector pool cap and warm count
+- VIDEO_WORKERS / MAX_VIDEO_MB: Offline video analysis pool size and upload limit
+- WRITE_BATCH_SIZE: Max session writes per transaction
+- WRITE_TIMEOUT: Seconds a REST write waits for its commit before a 503
+- RECORD_SESSIONS / RECORDINGS_DIR: Record per-frame landmarks for replay
+- GOVERNOR_*: Load governor thresholds (see app/core/governor.py)
+- JSON_CODEC: orjson / stdlib / auto JSON backend (see app/codec.py)
+- MAX_WS_CONNECTIONS: Concurrent WebSocket connections, across workers
+- SESSION_STORE / SESSION_STORE_PATH: memory (one worker) or a shared sqlite file
+  (also carries video job status, so any worker answers a job poll)
+- SESSION_RESUME_TTL: Seconds a dropped session can be resumed by its token
+- SESSION_TAKEOVER_TIMEOUT: Seconds an INIT waits for another worker to hand
+  over a session that is still live there
 
 Usage:
     uvicorn main:app --host 0.0.0.0 --port 8000 --reload
 """
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query, Request
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-import json
+from fastapi.responses import StreamingResponse
+from contextlib import asynccontextmanager
+import asyncio
+import datetime
+import math
 import time
-from typing import Dict, Any, List
+import uuid
+from typing import Dict, Any, List, Optional, Tuple
 import os
 from dotenv import load_dotenv
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
-from app.core.pose_detector import PoseDetector
+from app import codec
+from app.core.backpressure import LatestFrameSlot
 from app.core.connection_manager import ConnectionManager
-from app.engine.exercises import get_strategy
-from app.database import db
+from app.core.detector_pool import PoolExhaustedError
+from app.core.governor import DEFAULT_LEVEL, LOAD_LEVELS, LoadGovernor, LoadLevel
+from app.core.inference import InferenceExecutor
+from app.core.metrics import (
+    ACTIVE_SESSIONS,
+    FRAMES_TOTAL,
+    INFERENCE_CAPACITY,
+    INFERENCE_SESSIONS,
+    LOAD_LEVEL,
+    observe_motion_gate,
+    observe_stages,
+    timed,
+)
+from app.core.protocol import LandmarkEncoder, ProtocolError, decode_binary_frame
+from app.database import db, period_start
+from app.engine.exercises import compute_joint_angles, get_strategy
+from app.engine.video_analysis import (
+    MAX_VIDEO_BYTES,
+    VideoAnalyzer,
+    VideoTooLargeError,
+    store_upload,
+)
+from app.export import EXPORT_MEDIA_TYPES, export_sessions
+from app.recording import RECORD_SESSIONS, SessionRecorder, flush_recordings
+from app.response_cache import ResponseCache
+from app.session_store import SESSION_RESUME_TTL, create_session_store
+from app.write_behind import SessionWriter
 
 # Error Handling Strategy:
 #   - Rate Limiting: SlowAPI with 100 req/min default, 200 for trusted IPs
@@ -51,7 +131,7 @@ from app.database import db
 #   - Graceful Degradation: Failed pose detection returns NO_DETECTION type
 
 # Security & Validation
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
@@ -80,7 +160,108 @@ structlog.configure(
 )
 logger = structlog.get_logger()
 
-app = FastAPI()
+# Global Services
+manager = ConnectionManager()
+inference = InferenceExecutor()
+governor = LoadGovernor(workers=inference.workers)
+session_writer = SessionWriter(db)
+response_cache = ResponseCache()
+session_store = create_session_store()
+video_analyzer = VideoAnalyzer(
+    save_session=session_writer.save_session, store=session_store
+)
+# Limit active WS connections (enforced across workers by session_store)
+MAX_WS_CONNECTIONS = int(os.getenv("MAX_WS_CONNECTIONS", "20"))
+# How long an INIT waits for another worker to hand over a live session
+SESSION_TAKEOVER_TIMEOUT = float(os.getenv("SESSION_TAKEOVER_TIMEOUT", "3"))
+TAKEOVER_POLL = 0.25
+# How long a REST write waits for the write-behind queue to commit it
+WRITE_TIMEOUT = float(os.getenv("WRITE_TIMEOUT", "5"))
+
+
+async def refresh_slots():
+    """Keep this worker's admission slots and live tokens leased."""
+    while True:
+        await asyncio.sleep(session_store.lease / 3)
+        tokens = [s["token"] for s in active_sessions.values() if s["token"]]
+        try:
+            await asyncio.to_thread(session_store.refresh)
+            await asyncio.to_thread(mark_live, tokens)
+        except Exception as e:
+            logger.error("slot_refresh_failed", error=str(e))
+
+
+async def serve_takeovers():
+    """Hand over live sessions that a client resumed on another worker."""
+    while True:
+        await asyncio.sleep(TAKEOVER_POLL)
+        try:
+            await hand_over_sessions()
+        except Exception as e:
+            logger.error("session_takeover_failed", error=str(e))
+
+
+async def store_update(method, *args):
+    """Run a blocking session_store write that must land even if we're cancelled."""
+    await asyncio.shield(asyncio.to_thread(method, *args))
+
+
+def save_expired(before: Optional[float] = None):
+    """Pop expired store entries and save the parked sessions (blocks)."""
+    save_expired_sessions(session_store.expired(before))
+
+
+async def expire_parked_sessions():
+    """Save parked sessions whose client didn't come back in time."""
+    while True:
+        await asyncio.sleep(SESSION_RESUME_TTL / 4)
+        # Popping and saving are one thread call, so entries can't be popped
+        # and then lost to a cancellation before they're saved
+        step = asyncio.ensure_future(asyncio.to_thread(save_expired))
+        try:
+            await asyncio.shield(step)
+        except asyncio.CancelledError:
+            await step
+            raise
+        except Exception as e:
+            logger.error("parked_session_expiry_failed", error=str(e))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Spawn inference workers up front so the first client doesn't pay for it
+    inference.start()
+    logger.info(
+        "inference_started",
+        workers=inference.workers,
+        capacity=inference.capacity,
+        preload=inference.preload,
+    )
+    await session_writer.start()
+    background = [
+        asyncio.create_task(refresh_slots()),
+        asyncio.create_task(expire_parked_sessions()),
+    ]
+    if session_store.shared:
+        background.append(asyncio.create_task(serve_takeovers()))
+    yield
+    for task in background:
+        task.cancel()
+    # Lets an expiry pass that was running finish saving what it popped
+    await asyncio.gather(*background, return_exceptions=True)
+    await video_analyzer.shutdown()
+    await asyncio.to_thread(session_store.release_worker)
+    if not session_store.shared:
+        # Nobody can resume these once this process is gone
+        save_expired(before=math.inf)
+    session_store.close()
+    inference.shutdown()
+    await session_writer.close()
+    await asyncio.to_thread(flush_recordings)
+    db.close()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=codec.CodecJSONResponse)
 
 # Rate Limiting Setup
 limiter = Limiter(key_func=get_remote_address)
@@ -106,15 +287,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "DELETE", "PATCH", "PUT"],
     allow_headers=["Content-Type", "Authorization"],
+    # Lets the dashboard name export downloads after the server's file name
+    expose_headers=["Content-Disposition"],
 )
 
-# Global Services
-manager = ConnectionManager()
-MAX_WS_CONNECTIONS = 20  # Limit active WS connections
-
 # Session State: WebSocket -> Dict {"strategy": ExerciseStrategy, "name": str}
 active_sessions: Dict[WebSocket, Dict[str, Any]] = {}
 
+# Gauges are read at scrape time (inference may be swapped out in tests)
+ACTIVE_SESSIONS.set_function(lambda: len(active_sessions))
+INFERENCE_SESSIONS.set_function(lambda: inference.active_sessions)
+INFERENCE_CAPACITY.set_function(lambda: inference.capacity)
+LOAD_LEVEL.set_function(lambda: LOAD_LEVELS.index(governor.level))
+
 
 @app.get("/health")
 @limiter.limit("10/minute")
@@ -123,27 +308,215 @@ def health_check(request: Request):
         "status": "ok",
         "service": "FormCheck API V2",
         "active_connections": len(manager.active_connections),
+        "admitted_connections": session_store.admitted(),
+        "load": governor.stats(),
     }
 
 
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint (per-stage frame latency, session gauges)"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/api/sessions")
 @limiter.limit("60/minute")
-def get_sessions(request: Request, limit: int = Query(default=10, ge=-1, le=1000)):
-    return db.get_recent_sessions(limit)
+def get_sessions(
+    request: Request,
+    limit: int = Query(default=10, ge=-1, le=1000),
+    paginate: bool = False,
+    cursor: Optional[str] = None,
+    exercise: Optional[str] = None,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+):
+    """
+    Session history, newest first.
+
+    Plain mode returns a list of the latest `limit` sessions (-1 = all).
+    Paginated mode (paginate=true, or any cursor/filter) returns
+    {"sessions": [...], "next_cursor": ...}; pass next_cursor back as
+    `cursor` for the following page.
+    """
+    filtered = any(v is not None for v in (cursor, exercise, start, end))
+    paginated = paginate or filtered
+
+    def compute():
+        if not paginated:
+            return db.get_recent_sessions(limit)
+
+        if limit < 1:
+            raise HTTPException(
+                status_code=400, detail="limit must be positive when paginating"
+            )
+        try:
+            return db.get_sessions_page(limit, cursor, exercise, start, end)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+    key = ("sessions", limit, paginated, cursor, exercise, start, end)
+    # The full history (-1) is only ETag-checked, never held in the cache
+    return response_cache.respond(
+        request, key, db.data_version, compute, store=limit >= 0
+    )
+
+
+@app.get("/api/export")
+@limiter.limit("10/minute")
+def export_history(
+    request: Request,
+    fmt: str = Query(default="csv", alias="format", pattern="^(csv|ndjson)$"),
+    exercise: Optional[str] = None,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+):
+    """Stream the (filtered) session history as CSV or NDJSON"""
+    chunks = export_sessions(fmt, db.iter_sessions(exercise, start, end))
+    filename = f"formcheck_export_{time.strftime('%Y-%m-%d')}.{fmt}"
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @app.get("/api/stats")
 @limiter.limit("60/minute")
 def get_stats(request: Request):
     """Return dashboard stats (streak, total reps, etc)"""
-    return db.get_stats()
+    # The streak also depends on the date, so it's part of the version
+    version = f"{db.data_version}.{datetime.date.today().isoformat()}"
+    return response_cache.respond(request, ("stats",), version, db.get_stats)
+
+
+# Periods returned by /api/activity when no start date is given, and the cap
+ACTIVITY_DEFAULT_PERIODS = {"day": 7, "week": 8, "month": 6}
+ACTIVITY_MAX_PERIODS = 1000
+ACTIVITY_PERIOD_DAYS = {"day": 1, "week": 7, "month": 28}
+
+
+@app.get("/api/activity")
+@limiter.limit("60/minute")
+def get_activity(
+    request: Request,
+    bucket: str = Query(default="day", pattern="^(day|week|month)$"),
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
+    exercise: Optional[str] = None,
+):
+    """
+    Reps/sessions/duration per day, week or month for charts.
+
+    start/end are local dates (YYYY-MM-DD, inclusive). end defaults to
+    today and start to ACTIVITY_DEFAULT_PERIODS[bucket] periods back.
+    """
+    today = datetime.date.today()
+    end = end or today
+    if start is None:
+        periods = ACTIVITY_DEFAULT_PERIODS[bucket]
+        start = end
+        for _ in range(periods - 1):
+            start = period_start(bucket, start) - datetime.timedelta(days=1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days // ACTIVITY_PERIOD_DAYS[bucket] >= ACTIVITY_MAX_PERIODS:
+        raise HTTPException(status_code=400, detail="Date range too long")
+
+    key = ("activity", bucket, start, end, exercise)
+    version = f"{db.data_version}.{today.isoformat()}"
+    return response_cache.respond(
+        request,
+        key,
+        version,
+        lambda: {
+            "bucket": bucket,
+            "series": db.get_activity(bucket, start, end, exercise),
+        },
+    )
 
 
 @app.get("/api/analytics")
 @limiter.limit("30/minute")
 def get_analytics(request: Request):
     """Return advanced analytics (PRs, Distribution)"""
-    return db.get_analytics()
+    return response_cache.respond(
+        request, ("analytics",), db.data_version, db.get_analytics
+    )
+
+
+# Room for the multipart headers and form fields around the video itself
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+
+class VideoUpload(BaseModel):
+    exercise: str = "Pushups"
+    save: bool = True
+
+
+def upload_too_large() -> VideoTooLargeError:
+    return VideoTooLargeError(
+        f"Video exceeds {MAX_VIDEO_BYTES // (1024 * 1024)} MB limit"
+    )
+
+
+def capped_receive(receive, max_bytes: int):
+    """Wrap an ASGI receive so the body stops at `max_bytes`."""
+    received = 0
+
+    async def capped():
+        nonlocal received
+        message = await receive()
+        received += len(message.get("body", b""))
+        if received > max_bytes:
+            raise upload_too_large()
+        return message
+
+    return capped
+
+
+@app.post("/api/analyze-video", status_code=202)
+@limiter.limit("5/minute")
+async def analyze_video(request: Request):
+    """
+    Upload a recorded workout for offline analysis (poll the returned job).
+
+    Multipart form: file, exercise (default Pushups), save (default true).
+    Parsed here rather than by FastAPI so an oversized upload is refused
+    while it streams in, instead of after being spooled to disk in full.
+    """
+    max_bytes = MAX_VIDEO_BYTES + UPLOAD_FORM_OVERHEAD
+    try:
+        if int(request.headers.get("content-length", 0)) > max_bytes:
+            raise upload_too_large()
+        body = Request(request.scope, capped_receive(request.receive, max_bytes))
+        async with body.form(max_files=1) as form:
+            fields = VideoUpload.model_validate(
+                {key: value for key, value in form.items() if key != "file"}
+            )
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=422, detail="file is required")
+            path = await asyncio.to_thread(store_upload, upload.file, upload.filename)
+    except VideoTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e)) from e
+    except ValidationError as e:
+        raise RequestValidationError(e.errors()) from e
+
+    job = video_analyzer.submit(path, fields.exercise, save=fields.save)
+    # Before replying, so a poll served by another worker finds the job
+    await video_analyzer.publish(job)
+    logger.info("video_analysis_queued", job_id=job["id"], exercise=fields.exercise)
+    return job
+
+
+@app.get("/api/analyze-video/{job_id}")
+@limiter.limit("60/minute")
+def get_video_analysis(request: Request, job_id: str):
+    """Poll an offline analysis job (status, progress, result)"""
+    job = video_analyzer.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 class GoalUpdate(BaseModel):
@@ -165,121 +538,585 @@ class SessionCreate(BaseModel):
     exercise: str
     reps: int
     duration: int = 0
+    # Token of the /ws session this replaces (saved here, not on expiry)
+    session: Optional[str] = None
+
+
+async def committed(write) -> None:
+    """
+    Wait for a queued write so the caller reads back its own change.
+
+    Raises:
+        HTTPException: 500 if the write failed, 503 if it isn't committed
+            within WRITE_TIMEOUT (it may still land later).
+    """
+    if write is None:
+        return
+    try:
+        # Shielded: a timed-out write stays queued rather than cancelled
+        await asyncio.wait_for(
+            asyncio.shield(asyncio.wrap_future(write)), WRITE_TIMEOUT
+        )
+    except asyncio.TimeoutError as e:
+        logger.error("write_timeout", timeout=WRITE_TIMEOUT)
+        raise HTTPException(status_code=503, detail="Write not committed yet") from e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Write failed") from e
 
 
 @app.post("/api/save-session")
-def save_session(session: SessionCreate):
+async def save_session(session: SessionCreate):
     """Manually save a completed session"""
     logger.info("manual_save", exercise=session.exercise, reps=session.reps)
-    db.save_session(session.exercise, session.reps, session.duration)
+    if session.session:
+        # Whatever copy the socket still holds must not be saved as well
+        await asyncio.to_thread(session_store.take, parked_key(session.session))
+        await asyncio.to_thread(mark_saved, session.session)
+    await committed(
+        session_writer.save_session(session.exercise, session.reps, session.duration)
+    )
     return {"status": "saved"}
 
 
 @app.delete("/api/sessions/{session_id}")
-def delete_session(session_id: int):
+async def delete_session(session_id: int):
     """Delete a specific session"""
-    db.delete_session(session_id)
+    await committed(session_writer.delete_session(session_id))
     return {"status": "deleted", "id": session_id}
 
 
 @app.delete("/api/sessions")
-def delete_all_sessions():
+async def delete_all_sessions():
     """Delete all sessions"""
-    db.delete_all_sessions()
+    await committed(session_writer.delete_all_sessions())
     return {"status": "all deleted"}
 
 
-@app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    # Connection Limit Check
-    if len(manager.active_connections) >= MAX_WS_CONNECTIONS:
-        logger.warn("ws_connection_rejected", reason="capacity_reached")
-        await websocket.close(code=1008, reason="Server busy")
+def start_session(
+    exercise_name: str,
+    load_level: LoadLevel = DEFAULT_LEVEL,
+    encoder: Optional[LandmarkEncoder] = None,
+    token: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Fresh per-connection session state for an exercise.
+
+    `load_level` is what the connection's detector and client are already
+    set to (the default for a new connection). `encoder` sends RESULTs in
+    the compact binary format; None keeps JSON. `token` is the client's
+    session token, which makes the session resumable after a disconnect.
+    """
+    return {
+        "strategy": get_strategy(exercise_name),
+        "name": exercise_name,
+        "start_time": time.time(),
+        # Seconds spent on earlier connections of a resumed session
+        "elapsed": 0.0,
+        "recorder": SessionRecorder(exercise_name) if RECORD_SESSIONS else None,
+        "load_level": load_level,
+        "encoder": encoder,
+        "token": token,
+    }
+
+
+def session_token(init: Dict[str, Any]) -> Optional[str]:
+    """The resumable-session token an INIT carries, if it's usable."""
+    token = init.get("session")
+    if isinstance(token, str) and 0 < len(token) <= 64:
+        return token
+    return None
+
+
+def parked_key(token: str) -> str:
+    """Session store key a disconnected session is parked under."""
+    return f"session:{token}"
+
+
+def ended_key(token: str) -> str:
+    """Store key marking a token whose session was saved over REST."""
+    return f"ended:{token}"
+
+
+def mark_saved(token: str):
+    """Record that `token`'s session is saved, so no other copy is (blocks)."""
+    # Outlives any copy parked after the save, which expires within the TTL
+    session_store.put(ended_key(token), {}, 2 * SESSION_RESUME_TTL)
+
+
+def token_saved(token: str) -> bool:
+    """Whether `token`'s session was already saved over REST (blocks)."""
+    return session_store.get(ended_key(token)) is not None
+
+
+def live_key(token: str) -> str:
+    """Store key naming the worker a session token is live on (shared stores)."""
+    return f"live:{token}"
+
+
+def takeover_key(token: str) -> str:
+    """Store key asking that worker to hand the live session over."""
+    return f"takeover:{token}"
+
+
+def mark_live(tokens: List[str]):
+    """Record that these tokens' sessions are live on this worker (blocks)."""
+    if not session_store.shared:
+        return  # Every connection is in this process's active_sessions
+    for token in tokens:
+        session_store.put(
+            live_key(token), {"worker": session_store.worker}, session_store.lease
+        )
+
+
+def unmark_live(token: str):
+    """Drop this worker's live record for `token`, if it still owns it (blocks)."""
+    if not session_store.shared:
         return
+    owner = session_store.get(live_key(token))
+    if owner and owner["worker"] == session_store.worker:
+        session_store.take(live_key(token))
 
-    await manager.connect(websocket)
-    detector = PoseDetector()
 
-    # Initialize default session
-    active_sessions[websocket] = {
-        "strategy": get_strategy("Pushups"),
-        "name": "Pushups",
-        "start_time": time.time(),
+def request_takeover(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Ask the worker holding `token`'s live session to park it, and take the
+    snapshot (blocks up to SESSION_TAKEOVER_TIMEOUT). See hand_over_sessions.
+    """
+    if not session_store.shared:
+        return None
+    owner = session_store.get(live_key(token))
+    if owner is None or owner["worker"] == session_store.worker:
+        return None
+    session_store.put(takeover_key(token), {}, SESSION_TAKEOVER_TIMEOUT)
+    deadline = time.monotonic() + SESSION_TAKEOVER_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(TAKEOVER_POLL)
+        parked = session_store.take(parked_key(token))
+        if parked is not None:
+            return parked
+    # No answer (the worker died?): start over; a late handover gets saved
+    session_store.take(takeover_key(token))
+    return None
+
+
+def requested_takeovers(tokens: List[str]) -> List[str]:
+    """Tokens another worker asked this one to hand over (blocks)."""
+    return [
+        token
+        for token in tokens
+        if session_store.get(takeover_key(token)) is not None
+        and session_store.take(takeover_key(token)) is not None
+    ]
+
+
+async def close_replaced(websocket: WebSocket):
+    """Close a connection whose session a reconnecting client took over."""
+    try:
+        await websocket.close(code=4000, reason="Session resumed elsewhere")
+    except Exception as e:
+        # Usually already dead: that's why the client reconnected
+        logger.debug("replaced_close_failed", error=str(e))
+
+
+async def hand_over_sessions():
+    """Park the live sessions other workers asked for, closing their sockets."""
+    holders = {s["token"]: ws for ws, s in active_sessions.items() if s["token"]}
+    if not holders:
+        return
+    for token in await asyncio.to_thread(requested_takeovers, list(holders)):
+        websocket = holders[token]
+        session = active_sessions.get(websocket)
+        if session is None or session["token"] != token:
+            continue  # Ended or switched while we looked
+        # Detached first, so the old connection's teardown has nothing to save
+        del active_sessions[websocket]
+        await asyncio.to_thread(finish_session, session)
+        await close_replaced(websocket)
+        logger.info("session_handed_over", exercise=session["name"])
+
+
+async def claim_session(websocket: WebSocket, token: str) -> Optional[Dict[str, Any]]:
+    """
+    Snapshot of the session `token` names, taken from wherever it is.
+
+    A client that loses its network reconnects and re-INITs before the
+    server notices the old connection is gone, so the session may still be
+    live: on another connection of this worker (detached here), or on
+    another worker (asked to hand it over). Otherwise it may be parked.
+    """
+    for other, held in list(active_sessions.items()):
+        if other is not websocket and held["token"] == token:
+            del active_sessions[other]
+            end_session(held)
+            await close_replaced(other)
+            logger.info("session_taken_over", exercise=held["name"])
+            return park_snapshot(held)
+    parked = await asyncio.to_thread(session_store.take, parked_key(token))
+    if parked is None:
+        parked = await asyncio.to_thread(request_takeover, token)
+    return parked
+
+
+def session_duration(session: Dict[str, Any]) -> int:
+    return int(session["elapsed"] + time.time() - session["start_time"])
+
+
+def park_snapshot(session: Dict[str, Any]) -> Dict[str, Any]:
+    """What a disconnected session needs to resume, or to be saved later."""
+    return {
+        "exercise": session["name"],
+        "strategy": session["strategy"].snapshot(),
+        "duration": session_duration(session),
+        "ended_at": time.time(),
     }
 
+
+def resume_session(session: Dict[str, Any], parked: Dict[str, Any]) -> bool:
+    """Continue a parked session in `session`; False if it was another exercise."""
+    if parked["exercise"] != session["name"]:
+        return False
+    session["strategy"].restore(parked["strategy"])
+    session["elapsed"] = parked["duration"]
+    return True
+
+
+def persist_session(
+    exercise: str,
+    reps: float,
+    duration: int,
+    timestamp: Optional[float] = None,
+    **log: Any,
+):
+    """Queue a finished session for saving if it counted anything."""
+    if reps > 0:
+        logger.info(
+            "saving_session", exercise=exercise, reps=reps, duration=duration, **log
+        )
+        session_writer.save_session(exercise, reps, duration, timestamp)
+
+
+def save_session_now(session: Dict[str, Any], **log: Any):
+    persist_session(
+        session["name"], session["strategy"].reps, session_duration(session), **log
+    )
+
+
+def save_parked_session(parked: Dict[str, Any]):
+    persist_session(
+        parked["exercise"],
+        parked["strategy"]["reps"],
+        parked["duration"],
+        parked["ended_at"],
+        parked=True,
+    )
+
+
+def save_expired_sessions(entries: List[Tuple[str, Dict[str, Any]]]):
+    """Save the parked sessions among expired store entries (blocks)."""
+    ended = {key for key, _ in entries if key.startswith("ended:")}
+    for key, state in entries:
+        # Other entries (video job status, tombstones) just lapse
+        if not key.startswith("session:"):
+            continue
+        token = key[len("session:") :]
+        if ended_key(token) in ended or token_saved(token):
+            continue  # The client saved it over REST already
+        save_parked_session(state)
+
+
+def finish_session(session: Optional[Dict[str, Any]], **log: Any):
+    """Park a resumable session when its connection ends, else save it (blocks)."""
+    if not session:
+        return
+    end_session(session)
+    if session["token"]:
+        try:
+            unmark_live(session["token"])
+            if token_saved(session["token"]):
+                logger.info("session_already_saved", exercise=session["name"])
+                return
+            # The client may reconnect (to any worker): saved on expiry
+            session_store.put(
+                parked_key(session["token"]), park_snapshot(session), SESSION_RESUME_TTL
+            )
+            logger.info(
+                "session_parked",
+                exercise=session["name"],
+                reps=session["strategy"].reps,
+            )
+            return
+        except Exception as e:
+            logger.error("session_park_failed", error=str(e))
+    # Save if there was activity (reps > 0)
+    save_session_now(session, **log)
+
+
+async def close_connection(
+    connection_id: str,
+    inference_session: str,
+    session: Optional[Dict[str, Any]],
+    stats: Dict[str, Any],
+):
+    """Release everything a /ws connection held, on any exit path."""
+    try:
+        # Every exit path keeps the workout: parked for resume, or saved
+        await asyncio.to_thread(finish_session, session, **stats)
+    except Exception as e:
+        logger.error("session_finish_failed", error=str(e))
+    try:
+        await asyncio.to_thread(session_store.release, connection_id)
+    finally:
+        # Return the detector to the pool (reset)
+        await inference.close_session(inference_session)
+
+
+def result_encoder(init: Dict[str, Any]) -> Optional[LandmarkEncoder]:
+    """Encoder for the RESULT format an INIT message asks for (see protocol.py)."""
+    if init.get("format") == "compact":
+        return LandmarkEncoder(delta=bool(init.get("delta")))
+    return None
+
+
+def end_session(session: Optional[Dict[str, Any]]):
+    """Finalize a session's recording (buffered; no disk I/O here)."""
+    if session and session.get("recorder"):
+        session["recorder"].close(reps=session["strategy"].reps)
+
+
+async def apply_load_level(
+    websocket: WebSocket, inference_session: str, session: Dict[str, Any]
+):
+    """Move a connection to the governor's current level (detector + client)."""
+    level = governor.level
+    applied = session["load_level"]
+    if level == applied:
+        return
+
+    session["load_level"] = level
+    if level.model_complexity != applied.model_complexity:
+        await inference.set_model_complexity(inference_session, level.model_complexity)
+    await websocket.send_text(codec.dumps_text(level.control_message()))
+    logger.info("load_level_applied", **governor.stats())
+
+
+async def process_frame(
+    websocket: WebSocket,
+    inference_session: str,
+    payload,
+    timestamp,
+    seq: Optional[int] = None,
+):
+    """Run one frame through inference + strategy and send the response."""
+    session = active_sessions.get(websocket)
+    if not session:
+        return
+
+    strategy = session["strategy"]
+    with governor.track():
+        pose_result, timings = await inference.process(inference_session, payload)
+    observe_stages(timings)
+    observe_motion_gate(timings)
+
+    if pose_result and pose_result.landmarks:
+        with timed("strategy"):
+            # One vectorized pass for every joint angle the strategies use
+            angles = compute_joint_angles(pose_result.landmarks)
+            result = strategy.process(pose_result.landmarks, angles)
+
+        response = {
+            "type": "RESULT",
+            "timestamp": timestamp,
+            "reps": result["reps"],
+            "feedback": result["feedback"],
+            "state": result["state"],
+        }
+    else:
+        # Preserve rep count even when pose not detected
+        response = {
+            "type": "NO_DETECTION",
+            "reps": strategy.reps,  # Keep the current count
+        }
+
+    if seq is not None:
+        response["seq"] = seq
+
+    recorder = session.get("recorder")
+    if recorder:
+        t = time.time() - session["start_time"]
+        if response["type"] == "RESULT":
+            recorder.record(t, pose_result.landmarks, result)
+        else:
+            recorder.record(t, None, reps=strategy.reps)
+
+    encoder = session["encoder"]
+    with timed("serialize"):
+        if encoder is None:
+            if response["type"] == "RESULT":
+                response["landmarks"] = pose_result.landmarks.to_dicts()
+            message = codec.dumps_text(response)
+        elif response["type"] == "RESULT":
+            message = encoder.encode(pose_result.landmarks.data, response)
+        else:
+            # The client has no skeleton to apply deltas to any more
+            encoder.reset()
+            message = codec.dumps_text(response)
+    if isinstance(message, bytes):
+        await websocket.send_bytes(message)
+    else:
+        await websocket.send_text(message)
+
+    # Takes effect from the next frame
+    await apply_load_level(websocket, inference_session, session)
+
+
+async def receive_messages(websocket: WebSocket, frames: LatestFrameSlot):
+    """
+    Read client messages as fast as they arrive.
+
+    Control messages (INIT) are applied immediately; frames go into the
+    latest-frame-wins slot, so a slow pipeline drops stale frames instead
+    of queueing them. Closes the slot when the socket goes away.
+    """
     try:
         while True:
-            data = await websocket.receive_text()
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
             try:
-                message = json.loads(data)
-                msg_type = message.get("type", "FRAME")
+                if message.get("bytes") is not None:
+                    # Binary mode: header + raw JPEG, no JSON/base64 round-trip
+                    frame = decode_binary_frame(message["bytes"])
+                    if frames.put((frame.jpeg, frame.timestamp, frame.seq)):
+                        FRAMES_TOTAL.labels("dropped").inc()
+                    continue
+
+                with timed("json_parse"):
+                    data = codec.loads(message["text"])
+                msg_type = data.get("type", "FRAME")
 
                 if msg_type == "INIT":
                     # Client signaling exercise type
-                    exercise_name = message.get("exercise", "Pushups")
-                    active_sessions[websocket] = {
-                        "strategy": get_strategy(exercise_name),
-                        "name": exercise_name,
-                        "start_time": time.time(),
-                    }
-                    logger.info("client_init", exercise=exercise_name)
+                    exercise_name = data.get("exercise", "Pushups")
+                    token = session_token(data)
+                    if token and await asyncio.to_thread(token_saved, token):
+                        # That workout was saved over REST: start a fresh,
+                        # unresumable one rather than one that's never saved
+                        token = None
+                    previous = active_sessions.get(websocket)
+                    if (
+                        previous
+                        and token
+                        and previous["token"] == token
+                        and previous["name"] == exercise_name
+                    ):
+                        # Repeated INIT for the running session: keep counting
+                        previous["encoder"] = result_encoder(data)
+                        continue
 
-                elif msg_type == "FRAME":
-                    payload = message.get("payload")
-                    timestamp = message.get("timestamp")
+                    session = start_session(
+                        exercise_name,
+                        previous["load_level"] if previous else DEFAULT_LEVEL,
+                        result_encoder(data),
+                        token,
+                    )
+                    end_session(previous)
+                    active_sessions[websocket] = session
+                    if previous and previous["token"]:
+                        # The client moved on: that resumable session is over
+                        save_session_now(previous)
+                    if previous and previous["token"] not in (None, token):
+                        await asyncio.to_thread(unmark_live, previous["token"])
+                    parked = None
+                    if token:
+                        parked = await claim_session(websocket, token)
+                        await asyncio.to_thread(mark_live, [token])
+                    if parked and not resume_session(session, parked):
+                        save_parked_session(parked)
+                        parked = None
+                    logger.info(
+                        "client_init", exercise=exercise_name, resumed=bool(parked)
+                    )
 
+                elif msg_type == "END":
+                    # Workout finished: save it now; it can't be resumed
                     session = active_sessions.get(websocket)
-                    if not session:
-                        continue
+                    if session:
+                        end_session(session)
+                        save_session_now(session)
+                        active_sessions[websocket] = start_session(
+                            session["name"], session["load_level"], session["encoder"]
+                        )
+                        if session["token"]:
+                            await asyncio.to_thread(unmark_live, session["token"])
+
+                elif msg_type == "FRAME":
+                    # Legacy JSON mode: base64 JPEG in "payload"
+                    if frames.put((data.get("payload"), data.get("timestamp"), None)):
+                        FRAMES_TOTAL.labels("dropped").inc()
 
-                    strategy = session["strategy"]
-                    pose_result = detector.process_frame(payload)
-
-                    if pose_result and pose_result.landmarks:
-                        result = strategy.process(pose_result.landmarks)
-
-                        response = {
-                            "type": "RESULT",
-                            "timestamp": timestamp,
-                            "landmarks": [lm.dict() for lm in pose_result.landmarks],
-                            "reps": result["reps"],
-                            "feedback": result["feedback"],
-                            "state": result["state"],
-                        }
-                    else:
-                        # Preserve rep count even when pose not detected
-                        response = {
-                            "type": "NO_DETECTION",
-                            "reps": strategy.reps,  # Keep the current count
-                        }
-
-                    await websocket.send_text(json.dumps(response))
-
-            except json.JSONDecodeError:
+            except (codec.DecodeError, ProtocolError):
                 pass
             except Exception as e:
+                # One bad message (or store hiccup) must not end the session
                 logger.error("ws_msg_error", error=str(e))
+    finally:
+        frames.close()
 
-    except WebSocketDisconnect:
-        logger.info("client_disconnect")
+
+@app.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket):
+    # Connection Limit Check (global: every worker shares the slots)
+    connection_id = uuid.uuid4().hex
+    admitted = await asyncio.to_thread(
+        session_store.acquire, connection_id, MAX_WS_CONNECTIONS
+    )
+    if not admitted:
+        logger.warning("ws_connection_rejected", reason="capacity_reached")
+        await websocket.close(code=1008, reason="Server busy")
+        return
+
+    await manager.connect(websocket)
+    try:
+        # Check out a warm, pooled detector instead of building a new model
+        inference_session = await inference.open_session()
+    except PoolExhaustedError:
+        logger.warning("ws_connection_rejected", reason="detectors_exhausted")
         manager.disconnect(websocket)
-        detector.close()
+        await store_update(session_store.release, connection_id)
+        await websocket.close(code=1013, reason="Server busy")
+        return
 
-        # Save session data
+    # Initialize default session
+    active_sessions[websocket] = start_session("Pushups")
+
+    # Receive task drains the socket; this loop only ever sees the newest frame
+    frames = LatestFrameSlot()
+    receiver = asyncio.create_task(receive_messages(websocket, frames))
+
+    try:
+        while (frame := await frames.get()) is not None:
+            FRAMES_TOTAL.labels("processed").inc()
+            try:
+                with timed("total"):
+                    await process_frame(websocket, inference_session, *frame)
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                logger.error("ws_msg_error", error=str(e))
+
+        # Slot closed: surface the receiver's WebSocketDisconnect (or error)
+        await receiver
+
+    except WebSocketDisconnect:
+        logger.info("client_disconnect", **frames.stats())
+    except Exception as e:
+        logger.error("ws_connection_error", error=str(e), **frames.stats())
+    finally:
+        receiver.cancel()
+        manager.disconnect(websocket)
         session = active_sessions.pop(websocket, None)
-        if session:
-            strategy = session["strategy"]
-            name = session["name"]
-            # Save if there was activity (reps > 0)
-            if strategy.reps > 0:
-                end_time = time.time()
-                start_time = session.get("start_time", end_time)
-                duration = int(end_time - start_time) if start_time else 0
-
-                logger.info(
-                    "saving_session",
-                    exercise=name,
-                    reps=strategy.reps,
-                    duration=duration,
-                )
-                db.save_session(name, strategy.reps, duration)
+        # Runs to completion even if this handler is cancelled part-way
+        await asyncio.shield(
+            close_connection(connection_id, inference_session, session, frames.stats())
+        )
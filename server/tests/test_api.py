@@ -1,7 +1,11 @@
+from concurrent.futures import Future
+
 from fastapi.testclient import TestClient
 import pytest
+import main
 from main import app
 from app.database import db
+from app.session_store import MemorySessionStore
 
 # Override DB to use a temporary file or mock for API tests
 # Similar to test_database.py, but applied to the app's global db instance
@@ -49,6 +53,19 @@ def test_save_and_delete_session(client):
     assert saved is None
 
 
+def test_failed_or_slow_write_is_an_error(client, monkeypatch):
+    def fail(ops):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(main.session_writer.db, "apply_writes", fail)
+    assert client.delete("/api/sessions/1").status_code == 500
+
+    stalled = Future()  # Never committed
+    monkeypatch.setattr(main.session_writer, "delete_all_sessions", lambda: stalled)
+    monkeypatch.setattr(main, "WRITE_TIMEOUT", 0.05)
+    assert client.delete("/api/sessions").status_code == 503
+
+
 def test_goal_endpoints(client):
     # Set Goal
     response = client.post("/api/settings/goal", json={"goal": 888})
@@ -58,3 +75,111 @@ def test_goal_endpoints(client):
     response = client.get("/api/settings/goal")
     assert response.status_code == 200
     assert response.json()["goal"] == 888
+
+
+def test_manual_save_claims_the_parked_session(client, monkeypatch):
+    store = MemorySessionStore()
+    monkeypatch.setattr(main, "session_store", store)
+    store.put("session:tok", {"exercise": "Squats", "reps": 4}, ttl=60)
+
+    payload = {"exercise": "Squats", "reps": 4, "duration": 30, "session": "tok"}
+    assert client.post("/api/save-session", json=payload).status_code == 200
+    # Nothing left for the expiry sweep to save a second time, and a
+    # tombstone for a copy the socket parks later
+    assert store.expired(before=float("inf")) == [("ended:tok", {})]
+
+
+def test_paginated_sessions(client):
+    for reps in (1, 2, 3):
+        client.post("/api/save-session", json={"exercise": "Page Test", "reps": reps})
+
+    first = client.get("/api/sessions?exercise=Page Test&limit=2").json()
+    assert [s["reps"] for s in first["sessions"]] == [3, 2]
+    second = client.get(
+        "/api/sessions",
+        params={"exercise": "Page Test", "limit": 2, "cursor": first["next_cursor"]},
+    ).json()
+    assert [s["reps"] for s in second["sessions"]] == [1]
+    assert second["next_cursor"] is None
+
+    assert client.get("/api/sessions?cursor=bogus").status_code == 400
+    assert client.get("/api/sessions?paginate=true&limit=-1").status_code == 400
+
+    for s in first["sessions"] + second["sessions"]:
+        client.delete(f"/api/sessions/{s['id']}")
+
+
+def test_export_streams_csv_and_ndjson(client):
+    import csv
+    import io
+    import json
+    import time
+    from datetime import datetime
+
+    client.post("/api/save-session", json={"exercise": "Export Test", "reps": 7})
+
+    response = client.get("/api/export?exercise=Export Test")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "attachment" in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(r["exercise"], r["reps"]) for r in rows] == [("Export Test", "7")]
+    assert rows[0]["datetime"].endswith("+00:00")
+    # timestamp stays Unix epoch seconds; datetime is the same instant
+    timestamp = float(rows[0]["timestamp"])
+    assert abs(timestamp - time.time()) < 60
+    parsed = datetime.fromisoformat(rows[0]["datetime"]).timestamp()
+    assert parsed == pytest.approx(timestamp, abs=1e-3)
+
+    response = client.get("/api/export?format=ndjson&exercise=Export Test")
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["reps"] for line in lines] == [7]
+
+    assert client.get("/api/export?format=xml").status_code == 422
+    client.delete(f"/api/sessions/{lines[0]['id']}")
+
+
+@pytest.mark.parametrize("path", ["/api/stats", "/api/analytics", "/api/sessions"])
+def test_etag_revalidation(client, path):
+    import main
+
+    first = client.get(path)
+    etag = first.headers["etag"]
+    hits = main.response_cache.hits
+
+    cached = client.get(path)
+    assert cached.json() == first.json()
+    assert main.response_cache.hits == hits + 1
+
+    not_modified = client.get(path, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    # Any write moves the version on
+    client.post("/api/save-session", json={"exercise": "ETag Test", "reps": 1})
+    changed = client.get(path, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+    saved = client.get("/api/sessions?exercise=ETag Test").json()["sessions"]
+    client.delete(f"/api/sessions/{saved[0]['id']}")
+
+
+def test_activity_endpoint(client):
+    import datetime
+
+    days = client.get("/api/activity").json()
+    assert days["bucket"] == "day"
+    assert len(days["series"]) == 7
+    assert days["series"][-1]["period"] == datetime.date.today().isoformat()
+
+    weeks = client.get("/api/activity?bucket=week").json()["series"]
+    assert len(weeks) == 8
+    assert datetime.date.fromisoformat(weeks[0]["period"]).weekday() == 0
+
+    assert client.get("/api/activity?bucket=year").status_code == 422
+    assert (
+        client.get("/api/activity?start=2024-02-01&end=2024-01-01").status_code == 400
+    )
+    assert client.get("/api/activity?start=1970-01-01").status_code == 400
@@ -0,0 +1,36 @@
+import asyncio
+
+from app.core.backpressure import LatestFrameSlot
+
+
+def test_newest_frame_wins():
+    async def run():
+        slot = LatestFrameSlot()
+        for frame in ("a", "b", "c"):
+            slot.put(frame)
+        return slot, await slot.get()
+
+    slot, frame = asyncio.run(run())
+    assert frame == "c"
+    assert slot.stats() == {"received": 3, "processed": 1, "dropped": 2}
+
+
+def test_get_waits_for_put():
+    async def run():
+        slot = LatestFrameSlot()
+        asyncio.get_running_loop().call_later(0.01, slot.put, "frame")
+        return await asyncio.wait_for(slot.get(), timeout=1)
+
+    assert asyncio.run(run()) == "frame"
+
+
+def test_close_drops_pending_and_ends_stream():
+    async def run():
+        slot = LatestFrameSlot()
+        slot.put("frame")
+        slot.close()
+        return slot, await slot.get()
+
+    slot, frame = asyncio.run(run())
+    assert frame is None
+    assert slot.stats() == {"received": 1, "processed": 0, "dropped": 1}
@@ -0,0 +1,124 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.schemas import LandmarkArray, PoseResult
+from benchmarks import pipeline, replay
+from benchmarks.__main__ import main as run_benchmarks
+
+
+class FakeDetector:
+    def __init__(self):
+        self.last_timings = {}
+
+    def process_frame(self, frame):
+        self.last_timings = {"jpeg_decode": 0.001, "inference": 0.002}
+        return PoseResult(landmarks=LandmarkArray(replay.synthetic_landmarks(1)[0]))
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_replay_inputs_are_deterministic():
+    assert replay.synthetic_jpeg_frames(3) == replay.synthetic_jpeg_frames(3)
+    assert np.array_equal(
+        replay.synthetic_landmarks(50), replay.synthetic_landmarks(50)
+    )
+    assert replay.synthetic_landmarks(50).shape == (50, 33, 4)
+
+
+def test_synthetic_landmarks_exercise_every_strategy():
+    results = pipeline.bench_strategies(replay.synthetic_landmarks(300), warmup=0)
+
+    assert set(results) == {"strategy.Pushups", "strategy.Squats", "strategy.Plank"}
+    for result in results.values():
+        assert result["reps"] > 0
+        assert result["frames"] == 300
+        assert set(result["stages"]["process"]) >= {"p50", "p95", "p99"}
+
+
+def test_serialization_compares_wire_formats():
+    results = pipeline.bench_serialization(replay.synthetic_landmarks(60), warmup=0)
+
+    sizes = {name: result["mean_bytes"] for name, result in results.items()}
+    assert sizes["serialization.delta"] < sizes["serialization.compact"]
+    assert sizes["serialization.compact"] < sizes["serialization.json"] / 10
+    assert set(results["serialization.json"]["stages"]) == {"serialize"}
+
+
+def test_pose_detector_stages_come_from_detector():
+    frames = replay.synthetic_jpeg_frames(5)
+    result = pipeline.bench_pose_detector(frames, FakeDetector, warmup=2)
+
+    assert result["detected"] == 5
+    assert set(result["stages"]) == {"total", "jpeg_decode", "inference"}
+    assert result["stages"]["inference"]["p50"] == 2.0
+    assert result["peak_rss_mb"] > 0
+
+
+class SizedDetector(FakeDetector):
+    """Smaller inference sizes shift landmarks and miss every 4th frame."""
+
+    def __init__(self, size):
+        super().__init__()
+        self.size = size
+        self.frames = 0
+
+    def process_frame(self, frame):
+        result = super().process_frame(frame)
+        self.frames += 1
+        if self.size and self.frames % 4 == 0:
+            return None
+        result.landmarks.data[:, 0] += 0.01 if self.size else 0.0
+        return result
+
+
+def test_resolution_reports_error_against_native_size():
+    frames = replay.synthetic_jpeg_frames(8)
+    results = pipeline.bench_resolution(frames, [320], SizedDetector, warmup=0)
+
+    assert set(results) == {"resolution.0", "resolution.320"}
+    native, reduced = results["resolution.0"], results["resolution.320"]
+    assert native["mean_error"] == 0 and native["agreement"] == 1
+    assert reduced["detected"] == 6
+    assert reduced["agreement"] == 0.75
+    assert reduced["mean_error"] == pytest.approx(0.01, abs=1e-5)
+
+
+class BlindDetector(FakeDetector):
+    def process_frame(self, frame):
+        return None
+
+
+def test_resolution_refuses_a_reference_without_poses():
+    frames = replay.synthetic_jpeg_frames(4)
+    with pytest.raises(ValueError, match="--video"):
+        pipeline.bench_resolution(frames, [320], lambda size: BlindDetector(), warmup=0)
+
+
+def test_websocket_round_trips():
+    frames = replay.synthetic_jpeg_frames(5)
+    result = pipeline.bench_websocket(frames, FakeDetector, warmup=1)
+
+    assert result["frames"] == 5
+    assert result["detected"] == 5
+    assert result["fps"] > 0
+
+
+def test_cli_writes_comparable_results(tmp_path, capsys):
+    out = tmp_path / "bench.json"
+    args = ["--only", "geometry", "strategies", "--landmark-frames", "60"]
+    assert run_benchmarks(args + ["--out", str(out)]) == 0
+
+    document = json.loads(out.read_text())
+    assert document["version"] == pipeline.RESULT_VERSION
+    assert document["environment"]["cpu_count"]
+    assert "geometry" in document["benchmarks"]
+
+    rows = pipeline.compare_results(document, document)
+    assert {row["benchmark"] for row in rows} == set(document["benchmarks"])
+    assert all(row["fps_ratio"] == 1.0 for row in rows)
@@ -0,0 +1,56 @@
+import json
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import codec
+from app.codec import STDLIB, CodecJSONResponse, get_codec
+
+orjson = pytest.importorskip("orjson")
+
+DOCUMENT = {
+    "type": "RESULT",
+    "timestamp": 1700000000123.5,
+    "feedback": {"message": "Good depth ✓", "color": "green", "angle": 85.25},
+    "landmarks": [{"x": 0.1, "y": 0.2, "z": -0.03, "visibility": 0.99}] * 3,
+    "reps": 4,
+    "flag": None,
+}
+
+
+def test_backends_agree():
+    fast = get_codec("orjson")
+    for backend in (STDLIB, fast):
+        assert json.loads(backend.dumps(DOCUMENT)) == DOCUMENT
+        assert backend.loads(json.dumps(DOCUMENT)) == DOCUMENT
+        assert backend.loads(json.dumps(DOCUMENT).encode()) == DOCUMENT
+
+    # Shapes the stdlib encoder accepts keep working with orjson
+    extras = {1: np.float32(0.5), "angles": np.array([90.0, 45.0])}
+    assert json.loads(fast.dumps(extras)) == {"1": 0.5, "angles": [90.0, 45.0]}
+
+
+def test_decode_errors_share_one_type():
+    for backend in (STDLIB, get_codec("orjson")):
+        with pytest.raises(codec.DecodeError):
+            backend.loads("{not json")
+
+
+def test_unknown_codec_is_rejected():
+    assert get_codec("auto").name == "orjson"
+    with pytest.raises(ValueError):
+        get_codec("msgpack")
+
+
+def test_response_class_renders_with_codec():
+    app = FastAPI(default_response_class=CodecJSONResponse)
+
+    @app.get("/rows")
+    def rows():
+        return [{"id": i, "exercise": "Squats"} for i in range(3)]
+
+    response = TestClient(app).get("/rows")
+    assert response.headers["content-type"] == "application/json"
+    assert response.content == codec.dumps(rows())
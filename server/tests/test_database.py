@@ -74,3 +74,260 @@ def test_goal(temp_db):
     assert temp_db.get_goal() == 500  # Default
     temp_db.set_goal(100)
     assert temp_db.get_goal() == 100
+
+
+DAY = 24 * 60 * 60
+
+
+def test_data_version_is_shared_by_processes(temp_db):
+    # A second Database on the same file stands in for another worker
+    other = Database()
+    before = temp_db.data_version
+    assert other.data_version == before
+
+    other.save_session("Pushups", 5)
+    assert temp_db.data_version != before
+    assert temp_db.data_version == other.data_version
+    other.set_goal(300)
+    assert temp_db.data_version == other.data_version
+    other.close()
+
+
+def test_data_version_reads_no_pooled_connection(temp_db, monkeypatch):
+    other = Database()
+    before = temp_db.data_version
+
+    def no_checkout():
+        raise AssertionError("data_version checked out a pooled connection")
+
+    monkeypatch.setattr(temp_db._pool, "acquire", no_checkout)
+    assert temp_db.data_version == before
+    other.save_session("Pushups", 5)  # Another worker's commit
+    assert temp_db.data_version != before
+    other.close()
+
+
+def test_stats_track_deletes(temp_db):
+    temp_db.save_session("Pushups", 10, 30)
+    temp_db.save_session("Pushups", 25, 60)
+    temp_db.save_session("Squats", 5, 20)
+    pushup_ids = [
+        s["id"] for s in temp_db.get_recent_sessions() if s["exercise"] == "Pushups"
+    ]
+
+    temp_db.delete_session(max(pushup_ids))  # The 25-rep PR
+    temp_db.delete_session(999)  # Unknown ids are ignored
+
+    stats = temp_db.get_stats()
+    assert stats["total_reps"] == 15
+    assert stats["total_sessions"] == 2
+    assert temp_db.get_analytics() == {
+        "distribution": [
+            {"name": "Pushups", "value": 1},
+            {"name": "Squats", "value": 1},
+        ],
+        "prs": [{"exercise": "Pushups", "reps": 10}, {"exercise": "Squats", "reps": 5}],
+    }
+
+    temp_db.delete_all_sessions()
+    assert temp_db.get_stats() == {
+        "total_reps": 0,
+        "total_sessions": 0,
+        "day_streak": 0,
+    }
+    assert temp_db.get_analytics() == {"distribution": [], "prs": []}
+
+
+def test_day_streak(temp_db):
+    import time
+
+    now = time.time()
+    for days_ago in (1, 2, 2, 3, 5):
+        temp_db.save_session("Pushups", 10, 0, timestamp=now - days_ago * DAY)
+
+    # Last workout yesterday keeps the streak alive; the gap at day 4 ends it
+    assert temp_db.get_stats()["day_streak"] == 3
+
+    temp_db.save_session("Pushups", 10, 0, timestamp=now)
+    assert temp_db.get_stats()["day_streak"] == 4
+
+    # Deleting the only session on a day breaks the streak there
+    day_two = [
+        s["id"]
+        for s in temp_db.get_recent_sessions(limit=-1)
+        if abs(s["timestamp"] - (now - 3 * DAY)) < 1
+    ]
+    temp_db.delete_session(day_two[0])
+    assert temp_db.get_stats()["day_streak"] == 3
+
+
+def test_stale_streak(temp_db):
+    import time
+
+    temp_db.save_session("Pushups", 10, 0, timestamp=time.time() - 3 * DAY)
+    assert temp_db.get_stats()["day_streak"] == 0
+
+
+def test_rollups_backfilled_on_upgrade(tmp_path, monkeypatch):
+    import time
+
+    import app.database
+
+    db_file = tmp_path / "legacy.db"
+    conn = sqlite3.connect(db_file)
+    conn.execute(
+        "CREATE TABLE sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, exercise TEXT NOT NULL, "
+        "reps INTEGER NOT NULL, duration INTEGER DEFAULT 0, timestamp REAL NOT NULL)"
+    )
+    conn.executemany(
+        "INSERT INTO sessions (exercise, reps, duration, timestamp) VALUES (?, ?, ?, ?)",
+        [("Pushups", 10, 0, time.time()), ("Squats", 30, 0, time.time() - DAY)],
+    )
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(app.database, "DB_PATH", db_file)
+    db = Database()
+    try:
+        assert db.get_stats() == {
+            "total_reps": 40,
+            "total_sessions": 2,
+            "day_streak": 2,
+        }
+        assert db.get_analytics()["prs"] == [
+            {"exercise": "Pushups", "reps": 10},
+            {"exercise": "Squats", "reps": 30},
+        ]
+    finally:
+        db.close()
+
+
+def test_history_indexes_used(temp_db):
+    with temp_db.get_connection() as conn:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM sessions WHERE exercise = ? "
+            "AND (timestamp, id) < (?, ?) ORDER BY timestamp DESC, id DESC LIMIT 10",
+            ("Squats", 1e10, 1),
+        ).fetchall()
+    detail = " ".join(row[-1] for row in plan)
+    assert "idx_sessions_exercise_timestamp" in detail
+    assert "TEMP B-TREE" not in detail  # No sort step
+
+
+def test_keyset_pagination(temp_db):
+    # Duplicate timestamps must neither repeat nor skip rows across pages
+    for i in range(7):
+        temp_db.save_session(
+            "Squats" if i % 2 else "Pushups", i + 1, 0, timestamp=100 + i // 2
+        )
+
+    seen, cursor = [], None
+    while True:
+        page = temp_db.get_sessions_page(3, cursor)
+        seen.extend(s["reps"] for s in page["sessions"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [7, 6, 5, 4, 3, 2, 1]
+
+    squats = temp_db.get_sessions_page(10, exercise="Squats", start=101, end=103)
+    assert [s["reps"] for s in squats["sessions"]] == [6, 4]
+    assert squats["next_cursor"] is None
+
+    with pytest.raises(ValueError):
+        temp_db.get_sessions_page(3, "not-a-cursor")
+
+
+def test_iter_sessions_batches(temp_db):
+    for i in range(5):
+        temp_db.save_session("Pushups", i + 1, 0, timestamp=100 + i)
+
+    batches = list(temp_db.iter_sessions(batch_size=2))
+    assert [[s["reps"] for s in batch] for batch in batches] == [[5, 4], [3, 2], [1]]
+
+    filtered = list(temp_db.iter_sessions(start=101, end=104, batch_size=10))
+    assert [s["reps"] for s in filtered[0]] == [4, 3, 2]
+
+
+def test_connections_use_wal_and_pragmas(temp_db):
+    with temp_db.get_connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] > 0
+
+
+def test_reads_not_blocked_by_open_write(temp_db):
+    temp_db.save_session("Pushups", 10, 0)
+    with temp_db.get_connection() as writer:
+        writer.execute(
+            "INSERT INTO sessions (exercise, reps, duration, timestamp) VALUES ('Squats', 5, 0, 1)"
+        )
+        # Uncommitted write holds the lock; WAL readers see the last commit
+        assert len(temp_db.get_recent_sessions()) == 1
+    # Uncommitted work is rolled back when the connection is returned
+    assert len(temp_db.get_recent_sessions()) == 1
+
+
+def test_pool_is_bounded_and_shared_across_threads(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.database import ConnectionPool
+
+    pool = ConnectionPool(tmp_path / "pool.db", size=2, timeout=0.05)
+
+    def use(_):
+        conn = pool.acquire()
+        conn.execute("SELECT 1")
+        pool.release(conn)
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(use, range(50)))
+    assert pool.opened <= 2
+
+    held = [pool.acquire(), pool.acquire()]
+    with pytest.raises(sqlite3.OperationalError):
+        pool.acquire()
+    for conn in held:
+        pool.release(conn)
+
+    pool.close()
+    assert pool.opened == 0
+    assert pool.acquire().execute("SELECT 1").fetchone()[0] == 1
+
+
+def test_activity_buckets(temp_db):
+    from datetime import date, datetime
+
+    def at(day, hour=12):
+        return datetime.combine(day, datetime.min.time()).timestamp() + hour * 3600
+
+    # Sunday 2024-03-10, Monday 2024-03-11 (new ISO week), 2024-04-02 (new month)
+    temp_db.save_session("Pushups", 10, 60, timestamp=at(date(2024, 3, 10)))
+    temp_db.save_session("Squats", 5, 30, timestamp=at(date(2024, 3, 11), 0))
+    temp_db.save_session("Pushups", 7, 20, timestamp=at(date(2024, 3, 11), 23))
+    temp_db.save_session("Pushups", 3, 10, timestamp=at(date(2024, 4, 2)))
+
+    days = temp_db.get_activity("day", date(2024, 3, 9), date(2024, 3, 12))
+    assert [(d["period"], d["reps"], d["sessions"]) for d in days] == [
+        ("2024-03-09", 0, 0),
+        ("2024-03-10", 10, 1),
+        ("2024-03-11", 12, 2),
+        ("2024-03-12", 0, 0),
+    ]
+
+    weeks = temp_db.get_activity("week", date(2024, 3, 10), date(2024, 3, 11))
+    assert [(w["period"], w["reps"], w["duration"]) for w in weeks] == [
+        ("2024-03-04", 10, 60),
+        ("2024-03-11", 12, 50),
+    ]
+
+    months = temp_db.get_activity(
+        "month", date(2024, 3, 20), date(2024, 4, 1), exercise="Pushups"
+    )
+    assert [(m["period"], m["reps"], m["sessions"]) for m in months] == [
+        ("2024-03-01", 17, 2),
+        ("2024-04-01", 3, 1),
+    ]
+
+    with pytest.raises(ValueError):
+        temp_db.get_activity("year", date(2024, 1, 1), date(2024, 12, 31))
@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+from app.core.detector_pool import DetectorPool, PoolExhaustedError
+
+
+class FakeDetector:
+    created = 0
+
+    def __init__(self):
+        FakeDetector.created += 1
+        self.resets = 0
+        self.closed = False
+
+    def reset(self):
+        self.resets += 1
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def reset_counter():
+    FakeDetector.created = 0
+
+
+def test_preload_builds_idle_detectors():
+    pool = DetectorPool(FakeDetector, max_size=3, preload=2)
+    assert FakeDetector.created == 2
+    assert pool.idle == 2
+    assert pool.in_use == 0
+
+
+def test_preload_is_capped():
+    pool = DetectorPool(FakeDetector, max_size=2, preload=5)
+    assert pool.size == 2
+
+
+def test_release_resets_and_reuses():
+    pool = DetectorPool(FakeDetector, max_size=2)
+    detector = pool.acquire()
+    pool.release(detector)
+
+    assert detector.resets == 1
+    assert pool.acquire() is detector
+    assert FakeDetector.created == 1
+
+
+def test_acquire_fails_fast_at_cap():
+    pool = DetectorPool(FakeDetector, max_size=1)
+    pool.acquire()
+    with pytest.raises(PoolExhaustedError):
+        pool.acquire()
+
+
+def test_acquire_waits_for_release():
+    pool = DetectorPool(FakeDetector, max_size=1)
+    detector = pool.acquire()
+    threading.Timer(0.05, pool.release, args=(detector,)).start()
+    assert pool.acquire(timeout=2) is detector
+
+
+def test_close_discards_detectors():
+    pool = DetectorPool(FakeDetector, max_size=2, preload=1)
+    idle = pool.acquire()
+    pool.release(idle)
+    busy = pool.acquire()
+    pool.close()
+
+    pool.release(busy)
+    assert busy.closed
+    assert pool.size == 0
+    with pytest.raises(PoolExhaustedError):
+        pool.acquire()
@@ -1,6 +1,19 @@
+import json
+
+import numpy as np
 import pytest
-from app.engine.exercises import PushupStrategy, SquatStrategy, ExerciseState
-from app.schemas import Landmark
+from app.core.geometry import calculate_angle, calculate_angles
+from app.engine.exercises import (
+    JOINT_ANGLES,
+    BODY_LINE,
+    KNEE,
+    PlankStrategy,
+    PushupStrategy,
+    SquatStrategy,
+    ExerciseState,
+    compute_joint_angles,
+)
+from app.schemas import Landmark, LandmarkArray
 
 
 # Helper to create landmarks
@@ -122,3 +135,71 @@ def test_squat_strategy():
 
     result = strategy.process(landmarks)
     assert result["state"] == "CONCENTRIC"
+
+
+def test_strategies_accept_landmark_array():
+    landmarks = create_landmarks()
+    landmarks[23] = Landmark(x=0, y=0, z=0, visibility=1.0)
+    landmarks[25] = Landmark(x=0, y=1, z=0, visibility=1.0)
+    landmarks[27] = Landmark(x=0, y=2, z=0, visibility=1.0)
+
+    from_list = SquatStrategy().process(landmarks)
+    from_array = SquatStrategy().process(LandmarkArray.from_landmarks(landmarks))
+    assert from_array == from_list
+
+
+def test_calculate_angles_matches_scalar():
+    rng = np.random.default_rng(0)
+    landmarks = LandmarkArray(rng.random((33, 4)))
+    triples = [(11, 13, 15), (13, 11, 23), (23, 25, 27)]
+
+    batched = calculate_angles(landmarks, triples)
+    scalar = [calculate_angle(*(landmarks[i] for i in t)) for t in triples]
+    assert batched.shape == (3,)
+    assert np.allclose(batched, scalar)
+    assert ((batched >= 0) & (batched <= 180)).all()
+
+
+def test_calculate_angles_on_frame_stack():
+    rng = np.random.default_rng(1)
+    stack = rng.random((5, 33, 4)).astype(np.float32)
+
+    angles = compute_joint_angles(stack)
+    assert angles.shape == (5, len(JOINT_ANGLES))
+    assert np.allclose(angles[3], compute_joint_angles(LandmarkArray(stack[3])))
+
+
+def test_strategy_uses_shared_angle_vector():
+    angles = [0.0] * len(JOINT_ANGLES)
+    angles[KNEE] = 170.0
+    result = SquatStrategy().process(create_landmarks(), angles)
+    assert result["state"] == "ECCENTRIC"
+
+
+def test_snapshot_restores_counting_state():
+    squat = SquatStrategy()
+    angles = [0.0] * len(JOINT_ANGLES)
+    for knee in (170.0, 80.0, 170.0, 170.0, 80.0):
+        angles[KNEE] = knee
+        squat.process(create_landmarks(), angles)
+    snapshot = json.loads(json.dumps(squat.snapshot()))
+
+    resumed = SquatStrategy()
+    resumed.restore(snapshot)
+    assert resumed.reps == 1 and resumed.state == ExerciseState.CONCENTRIC
+    angles[KNEE] = 170.0
+    assert resumed.process(create_landmarks(), angles)["reps"] == 2
+
+    plank = PlankStrategy()
+    angles[BODY_LINE] = 180.0
+    for _ in range(20):
+        plank.process(create_landmarks(), angles)
+    resumed = PlankStrategy()
+    resumed.restore(plank.snapshot())
+    assert resumed.duration_frames == 20
+
+    pushup = PushupStrategy()
+    pushup.direction, pushup.form, pushup.reps = 1, 1, 2.5
+    resumed = PushupStrategy()
+    resumed.restore(pushup.snapshot())
+    assert (resumed.direction, resumed.form, resumed.reps) == (1, 1, 2.5)
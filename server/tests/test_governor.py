@@ -0,0 +1,101 @@
+from app.core.governor import DEFAULT_LEVEL, LOAD_LEVELS, LoadGovernor
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_governor(**kwargs):
+    clock = Clock()
+    options = {"workers": 2, "target_ms": 50, "interval": 1, "recover_intervals": 2}
+    options.update(kwargs)
+    return LoadGovernor(clock=clock, **options), clock
+
+
+def tick(governor, clock, seconds, frames=3):
+    """Observe `frames` round trips; the last one lands on the next decision."""
+    for _ in range(frames - 1):
+        governor.observe(seconds)
+    clock.now += governor.interval
+    governor.observe(seconds)
+
+
+def test_starts_at_default_level():
+    governor, _ = make_governor()
+    assert governor.level == DEFAULT_LEVEL
+    assert [level.name for level in governor.levels] == [
+        "normal",
+        "reduced",
+        "minimal",
+    ]
+
+
+def test_slow_inference_steps_down_one_level_per_interval():
+    governor, clock = make_governor()
+
+    # Decisions wait for the interval, however slow the samples are
+    governor.observe(0.2)
+    assert governor.level.name == "normal"
+
+    tick(governor, clock, 0.2)
+    assert governor.level.name == "reduced"
+    tick(governor, clock, 0.2)
+    tick(governor, clock, 0.2)
+    assert governor.level.name == "minimal"  # and no further
+
+
+def test_queue_depth_alone_steps_down():
+    governor, clock = make_governor()
+    trackers = [governor.track() for _ in range(4)]  # 2 frames per worker
+    for tracker in trackers:
+        tracker.__enter__()
+    for tracker in trackers:
+        tracker.__exit__(None, None, None)
+
+    tick(governor, clock, 0.001)
+    assert governor.level.name == "reduced"
+
+
+def test_recovers_after_consecutive_calm_intervals():
+    governor, clock = make_governor()
+    tick(governor, clock, 0.2)
+    assert governor.level.name == "reduced"
+
+    # Latency under target but above half of it: hold
+    tick(governor, clock, 0.04, frames=30)
+    tick(governor, clock, 0.04, frames=30)
+    assert governor.level.name == "reduced"
+
+    tick(governor, clock, 0.01, frames=30)
+    assert governor.level.name == "reduced"
+    tick(governor, clock, 0.01, frames=30)
+    assert governor.level.name == "normal"
+
+
+def test_heavy_model_is_opt_in():
+    governor, clock = make_governor(max_complexity=2)
+    assert governor.level == DEFAULT_LEVEL
+    for _ in range(2):
+        tick(governor, clock, 0.001)
+    assert governor.level.name == "high"
+
+
+def test_disabled_governor_never_moves():
+    governor, clock = make_governor(enabled=False)
+    tick(governor, clock, 1.0)
+    assert governor.level == DEFAULT_LEVEL
+
+
+def test_control_message_carries_capture_settings():
+    message = LOAD_LEVELS[2].control_message()
+    assert message == {
+        "type": "CONTROL",
+        "level": "reduced",
+        "model_complexity": 0,
+        "fps": 12,
+        "jpeg_quality": 0.5,
+    }
@@ -0,0 +1,153 @@
+import asyncio
+import functools
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.core.detector_pool import PoolExhaustedError
+from app.core.inference import InferenceExecutor
+from app.schemas import Landmark, PoseResult
+
+
+class FakeDetector:
+    """Stands in for PoseDetector: echoes the worker pid and frame count."""
+
+    def __init__(self):
+        self.frames = 0
+
+    def process_frame(self, payload):
+        self.frames += 1
+        lm = Landmark(x=float(os.getpid()), y=float(self.frames), z=0, visibility=1.0)
+        return PoseResult(landmarks=[lm])
+
+    def reset(self):
+        self.frames = 0
+
+    def close(self):
+        pass
+
+
+class CrashingDetector(FakeDetector):
+    """Kills its worker process on a "crash" frame, like a MediaPipe segfault."""
+
+    def process_frame(self, payload):
+        if payload == "crash":
+            os._exit(1)
+        return super().process_frame(payload)
+
+
+class LoggingDetector(FakeDetector):
+    """Appends its pid to `path` when closed."""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def close(self):
+        with open(self.path, "a") as f:
+            f.write(f"{os.getpid()}\n")
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_sessions_keep_their_detector(workers):
+    executor = InferenceExecutor(workers=workers, detector_factory=FakeDetector)
+
+    async def run():
+        a = await executor.open_session()
+        b = await executor.open_session()
+        for _ in range(3):
+            result_a, _ = await executor.process(a, "frame")
+        result_b, _ = await executor.process(b, "frame")
+        await executor.close_session(a)
+        await executor.close_session(b)
+        return result_a, result_b
+
+    try:
+        result_a, result_b = asyncio.run(run())
+    finally:
+        executor.shutdown()
+
+    # Tracking state is per-session: frame counters don't leak between them
+    assert result_a.landmarks[0].y == 3
+    assert result_b.landmarks[0].y == 1
+    if workers:
+        # Sessions are spread across worker processes, off the server process
+        assert result_a.landmarks[0].x != result_b.landmarks[0].x
+        assert result_a.landmarks[0].x != os.getpid()
+
+
+def test_close_session_frees_slot():
+    executor = InferenceExecutor(workers=0, detector_factory=FakeDetector)
+
+    async def run():
+        session_id = await executor.open_session()
+        await executor.process(session_id, "frame")
+        await executor.close_session(session_id)
+        await executor.close_session(session_id)  # idempotent
+
+    asyncio.run(run())
+    assert executor._slot_load == [0]
+    executor.shutdown()
+
+
+def test_open_session_respects_detector_cap():
+    executor = InferenceExecutor(
+        workers=0, detector_factory=FakeDetector, max_detectors=1
+    )
+
+    async def run():
+        first = await executor.open_session()
+        await executor.process(first, "frame")
+        with pytest.raises(PoolExhaustedError):
+            await executor.open_session()
+
+        # Returned detector is reset and reassigned to the next session
+        await executor.close_session(first)
+        second = await executor.open_session()
+        return await executor.process(second, "frame")
+
+    result, _ = asyncio.run(run())
+    executor.shutdown()
+    assert result.landmarks[0].y == 1
+
+
+def test_crashed_worker_is_replaced_with_fresh_detectors():
+    executor = InferenceExecutor(workers=1, detector_factory=CrashingDetector)
+
+    async def run():
+        a = await executor.open_session()
+        b = await executor.open_session()
+        before, _ = await executor.process(a, "frame")
+        await executor.process(a, "frame")
+        with pytest.raises(BrokenProcessPool):
+            await executor.process(a, "crash")
+        # Both sessions on the slot get a detector in the new worker
+        after_a, _ = await executor.process(a, "frame")
+        after_b, _ = await executor.process(b, "frame")
+        await executor.close_session(a)
+        await executor.close_session(b)
+        return before, after_a, after_b
+
+    try:
+        before, after_a, after_b = asyncio.run(run())
+    finally:
+        executor.shutdown()
+
+    assert after_a.landmarks[0].x != before.landmarks[0].x
+    assert after_a.landmarks[0].y == 1 and after_b.landmarks[0].y == 1
+    assert executor._slot_load == []
+
+
+def test_shutdown_closes_worker_detectors(tmp_path):
+    closed = tmp_path / "closed"
+    factory = functools.partial(LoggingDetector, str(closed))
+    executor = InferenceExecutor(workers=2, detector_factory=factory, preload=1)
+
+    async def run():
+        await executor.open_session()
+
+    asyncio.run(run())
+    executor.shutdown()
+    # The open session's detector and the other worker's preloaded one
+    assert len(closed.read_text().split()) == 2
@@ -0,0 +1,264 @@
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+from app.core import pose_detector
+from app.core.pose_detector import PoseDetector, expand_box
+
+HEIGHT, WIDTH = 480, 640
+# Where the fake person stands, in full-frame normalized coordinates
+BODY = (0.40, 0.30, 0.60, 0.70)
+
+
+def body_landmarks(box=BODY) -> np.ndarray:
+    x0, y0, x1, y1 = box
+    data = np.zeros((33, 4), dtype=np.float32)
+    data[:, 0] = np.linspace(x0, x1, 33)
+    data[:, 1] = np.linspace(y0, y1, 33)
+    data[:, 2] = 0.1
+    data[:, 3] = 0.9
+    return data
+
+
+class FakePose:
+    """Stands in for mp.solutions.pose.Pose: replays scripted landmarks."""
+
+    def __init__(self, **kwargs):
+        self.script = []
+        self.shapes = []
+
+    def process(self, image):
+        self.shapes.append(image.shape[:2])
+        data = self.script.pop(0)
+        if data is None:
+            return SimpleNamespace(pose_landmarks=None)
+        landmark = [SimpleNamespace(x=x, y=y, z=z, visibility=v) for x, y, z, v in data]
+        return SimpleNamespace(pose_landmarks=SimpleNamespace(landmark=landmark))
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def detector(monkeypatch):
+    monkeypatch.setattr(pose_detector.mp.solutions.pose, "Pose", FakePose)
+    return PoseDetector(
+        motion_gate=False, roi_crop=True, roi_margin=0.25, inference_size=0
+    )
+
+
+def frame():
+    return np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+
+
+def test_crops_to_previous_pose_and_maps_back(detector):
+    detector.pose.script = [body_landmarks(), body_landmarks((0.4, 0.4, 0.6, 0.6))]
+
+    detector.process_image(frame())
+    roi = expand_box(BODY, 0.25)
+    assert detector.roi == pytest.approx(roi)
+
+    # The crop sees the body at crop-normalized 0.4..0.6; the caller gets
+    # it back in full-frame coordinates
+    result = detector.process_image(frame())
+    crop_h, crop_w = detector.pose.shapes[1]
+    assert (crop_h, crop_w) < (HEIGHT, WIDTH)
+    assert crop_w == pytest.approx((roi[2] - roi[0]) * WIDTH, abs=2)
+    assert crop_h == pytest.approx((roi[3] - roi[1]) * HEIGHT, abs=2)
+
+    data = result.landmarks.data
+    mid_x = (roi[0] + roi[2]) / 2
+    mid_y = (roi[1] + roi[3]) / 2
+    assert data[16, 0] == pytest.approx(mid_x, abs=0.01)
+    assert data[16, 1] == pytest.approx(mid_y, abs=0.01)
+    assert data[0, 2] == pytest.approx(0.1 * crop_w / WIDTH)
+
+
+def test_small_movement_keeps_the_crop(detector):
+    roi = expand_box(BODY, 0.25)
+    w, h = roi[2] - roi[0], roi[3] - roi[1]
+    # The same body nudged right by 1% of the frame, as seen inside the crop
+    x0, y0, x1, y1 = BODY
+    nudged = ((x0 + 0.01 - roi[0]) / w, (y0 - roi[1]) / h)
+    nudged += ((x1 + 0.01 - roi[0]) / w, (y1 - roi[1]) / h)
+    detector.pose.script = [body_landmarks(), body_landmarks(nudged)]
+
+    detector.process_image(frame())
+    result = detector.process_image(frame())
+    assert result.landmarks.data[0, 0] == pytest.approx(x0 + 0.01, abs=0.005)
+    assert detector.roi == pytest.approx(roi)
+
+
+def test_lost_tracking_falls_back_to_full_frame(detector):
+    detector.pose.script = [body_landmarks(), None, body_landmarks()]
+    detector.process_image(frame())
+
+    result = detector.process_image(frame())
+    assert detector.pose.shapes[-1] == (HEIGHT, WIDTH)
+    assert result.landmarks.data[0, 0] == pytest.approx(BODY[0])
+    assert set(detector.last_timings) >= {"color_convert", "inference"}
+
+
+def test_no_pose_clears_the_crop(detector):
+    detector.pose.script = [body_landmarks(), None, None, None]
+    detector.process_image(frame())
+    assert detector.process_image(frame()) is None
+    assert detector.roi is None
+    detector.process_image(frame())
+    assert detector.pose.shapes[-1] == (HEIGHT, WIDTH)
+
+
+def test_large_pose_and_disabled_mode_use_full_frame(detector, monkeypatch):
+    detector.pose.script = [body_landmarks((0.05, 0.05, 0.95, 0.95))]
+    detector.process_image(frame())
+    assert detector.roi is None
+
+    plain = PoseDetector(motion_gate=False, roi_crop=False, inference_size=0)
+    plain.pose.script = [body_landmarks(), body_landmarks()]
+    plain.process_image(frame())
+    plain.process_image(frame())
+    assert plain.pose.shapes == [(HEIGHT, WIDTH)] * 2
+
+
+def test_reset_forgets_the_crop(detector):
+    detector.pose.script = [body_landmarks()]
+    detector.process_image(frame())
+    detector.reset()
+    assert detector.roi is None
+
+
+def jpeg(height=HEIGHT, width=WIDTH) -> bytes:
+    image = np.random.default_rng(0).integers(0, 256, (height, width, 3), np.uint8)
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+
+def test_large_frames_decode_reduced_and_fit_inference_size(monkeypatch):
+    monkeypatch.setattr(pose_detector.mp.solutions.pose, "Pose", FakePose)
+    detector = PoseDetector(motion_gate=False, roi_crop=False, inference_size=320)
+    detector.pose.script = [body_landmarks()] * 3
+
+    # First frame: source size unknown, full decode, then resized to fit
+    detector.process_frame(jpeg(720, 1280))
+    assert detector.source_shape == (720, 1280)
+    assert detector.pose.shapes[-1] == (180, 320)
+
+    # Later frames decode at 1/4 scale (1280 / 4 = 320) with no resize
+    assert detector._decode_scale() == (4, cv2.IMREAD_REDUCED_COLOR_4)
+    result = detector.process_frame(jpeg(720, 1280))
+    assert detector.pose.shapes[-1] == (180, 320)
+    assert detector.source_shape == (720, 1280)
+    assert result.landmarks.data[0, 0] == pytest.approx(BODY[0])
+
+    # The RGB buffer is reused across frames of the same shape
+    buffer = detector._buffer("rgb", (180, 320, 3))
+    detector.process_frame(jpeg(720, 1280))
+    assert detector._buffer("rgb", (180, 320, 3)) is buffer
+
+
+def test_reduced_decode_keeps_the_roi_at_inference_size(monkeypatch):
+    monkeypatch.setattr(pose_detector.mp.solutions.pose, "Pose", FakePose)
+    detector = PoseDetector(
+        motion_gate=False, roi_crop=True, roi_margin=0.25, inference_size=160
+    )
+    detector.pose.script = [body_landmarks(), body_landmarks()]
+
+    detector.process_frame(jpeg(720, 1280))
+    # ROI is 0.3 x 0.6 of the frame: 432px tall, so 1/2 scale still covers 160px
+    assert detector._decode_scale() == (2, cv2.IMREAD_REDUCED_COLOR_2)
+    detector.process_frame(jpeg(720, 1280))
+    assert max(detector.pose.shapes[-1]) == 160
+
+
+def test_native_size_and_small_frames_decode_in_full(monkeypatch):
+    monkeypatch.setattr(pose_detector.mp.solutions.pose, "Pose", FakePose)
+    native = PoseDetector(motion_gate=False, roi_crop=False, inference_size=0)
+    native.pose.script = [body_landmarks()] * 2
+    native.process_frame(jpeg())
+    native.process_frame(jpeg())
+    assert native._decode_scale() == (1, cv2.IMREAD_COLOR)
+    assert native.pose.shapes == [(HEIGHT, WIDTH)] * 2
+
+    small = PoseDetector(motion_gate=False, roi_crop=False, inference_size=320)
+    small.pose.script = [body_landmarks()]
+    small.process_frame(jpeg(240, 320))
+    assert small._decode_scale() == (1, cv2.IMREAD_COLOR)
+    assert small.pose.shapes == [(240, 320)]
+
+
+def test_model_complexity_switches_are_cached_and_reset(detector):
+    full = detector.pose
+    detector.pose.script = [body_landmarks()]
+    detector.process_image(frame())
+
+    detector.set_model_complexity(0)
+    lite = detector.pose
+    assert lite is not full and detector.model_complexity == 0
+    assert detector.roi is None  # the crop came from the other model's track
+
+    detector.set_model_complexity(1)
+    assert detector.pose is full
+    detector.set_model_complexity(0)
+    assert detector.pose is lite
+
+    # A released detector goes back to the default model
+    detector.reset()
+    assert detector.pose is full and detector.model_complexity == 1
+
+
+@pytest.fixture
+def gated(monkeypatch):
+    monkeypatch.setattr(pose_detector.mp.solutions.pose, "Pose", FakePose)
+    detector = PoseDetector(
+        roi_crop=False,
+        inference_size=0,
+        motion_gate=True,
+        motion_threshold=2.5,
+        motion_max_skip=3,
+    )
+    detector.pose.script = [body_landmarks()] * 20
+    return detector
+
+
+def test_static_frames_reuse_the_last_result(gated):
+    results = [gated.process_image(frame()) for _ in range(9)]
+
+    # Inference on frames 0, 4 and 8: never more than 3 reused in a row
+    assert len(gated.pose.shapes) == 3
+    assert results[1] is results[0] and results[3] is results[0]
+    assert results[4] is not results[0]
+    assert "inference" in gated.last_timings
+    gated.process_image(frame())
+    assert set(gated.last_timings) == {"motion_gate"}
+
+
+def test_motion_runs_inference(gated):
+    gated.process_image(frame())
+    moved = frame()
+    moved[100:300, 200:400] = 255
+    gated.process_image(moved)
+    assert len(gated.pose.shapes) == 2
+
+
+def test_slow_drift_accumulates_against_the_inferred_frame(gated):
+    for level in range(4):
+        gated.process_image(np.full((HEIGHT, WIDTH, 3), level, np.uint8))
+    # Frames differ by 1 gray level each; the 3rd step away crosses 2.5
+    assert len(gated.pose.shapes) == 2
+
+
+def test_reset_and_model_switch_force_inference(gated):
+    full = gated.pose
+    gated.process_image(frame())
+    gated.reset()
+    gated.process_image(frame())
+    assert len(full.shapes) == 2
+
+    gated.set_model_complexity(0)
+    gated.pose.script = [body_landmarks()]
+    gated.process_image(frame())
+    assert len(gated.pose.shapes) == 1
@@ -0,0 +1,107 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.core.protocol import (
+    COORD_SCALE,
+    FLAG_DELTA,
+    FRAME_HEADER,
+    MSG_FRAME,
+    OVERLAY_LANDMARKS,
+    RESULT_HEADER,
+    LandmarkEncoder,
+    ProtocolError,
+    decode_binary_frame,
+    decode_result,
+    encode_binary_frame,
+)
+from app.schemas import LandmarkArray
+from benchmarks.replay import synthetic_landmarks
+
+
+def test_round_trip():
+    jpeg = b"\xff\xd8fake-jpeg\xff\xd9"
+    message = encode_binary_frame(jpeg, timestamp=1700000000123.0, seq=42)
+
+    frame = decode_binary_frame(message)
+    assert len(message) == FRAME_HEADER.size + len(jpeg)
+    assert frame.msg_type == MSG_FRAME
+    assert frame.timestamp == 1700000000123.0
+    assert frame.seq == 42
+    assert bytes(frame.jpeg) == jpeg
+
+
+def test_body_is_not_copied():
+    message = encode_binary_frame(b"\x01\x02\x03", timestamp=0, seq=0)
+    frame = decode_binary_frame(message)
+    arr = np.frombuffer(frame.jpeg, np.uint8)
+    assert frame.jpeg.obj is message
+    assert arr.tolist() == [1, 2, 3]
+
+
+def test_rejects_short_message():
+    with pytest.raises(ProtocolError):
+        decode_binary_frame(b"\x01\x00")
+
+
+def test_rejects_unknown_type():
+    message = FRAME_HEADER.pack(0x7F, 0, 0) + b"body"
+    with pytest.raises(ProtocolError):
+        decode_binary_frame(message)
+
+
+FIELDS = {"type": "RESULT", "timestamp": 1.0, "reps": 2, "seq": 7}
+
+
+def test_compact_result_round_trip():
+    landmarks = synthetic_landmarks(1)[0]
+    message = LandmarkEncoder().encode(landmarks, FIELDS)
+
+    decoded, _, fields = decode_result(message)
+    assert fields == FIELDS
+    drawn = list(OVERLAY_LANDMARKS)
+    assert np.abs(decoded[drawn, :3] - landmarks[drawn, :3]).max() <= 0.5 / COORD_SCALE
+    assert np.abs(decoded[drawn, 3] - landmarks[drawn, 3]).max() <= 0.5 / 255
+    # Face landmarks aren't sent; the client sees them as invisible
+    assert not decoded[:11].any()
+
+
+def test_compact_result_is_an_order_of_magnitude_smaller():
+    landmarks = synthetic_landmarks(1)[0]
+    legacy = json.dumps({**FIELDS, "landmarks": LandmarkArray(landmarks).to_dicts()})
+    assert len(LandmarkEncoder().encode(landmarks, FIELDS)) * 10 < len(legacy)
+
+
+def test_deltas_track_the_client_copy_without_drift():
+    frames = synthetic_landmarks(40)
+    encoder = LandmarkEncoder(delta=True, keyframe_interval=100)
+    previous = None
+    flags = []
+    for landmarks in frames:
+        message = encoder.encode(landmarks, FIELDS)
+        flags.append(message[1])
+        decoded, previous, _ = decode_result(message, previous)
+
+    assert flags[0] == 0 and set(flags[1:]) == {FLAG_DELTA}
+    drawn = list(OVERLAY_LANDMARKS)
+    assert np.abs(decoded[drawn, :3] - frames[-1][drawn, :3]).max() <= 0.5 / COORD_SCALE
+
+
+def test_keyframes_on_reset_overflow_and_interval():
+    landmarks = synthetic_landmarks(1)[0]
+    encoder = LandmarkEncoder(delta=True, keyframe_interval=2)
+    flags = [encoder.encode(landmarks, FIELDS)[1] for _ in range(4)]
+    assert flags == [0, FLAG_DELTA, FLAG_DELTA, 0]
+
+    encoder.reset()
+    assert encoder.encode(landmarks, FIELDS)[1] == 0
+    moved = landmarks.copy()
+    moved[:, 0] += 0.1  # 410 quantization steps: doesn't fit int8
+    assert encoder.encode(moved, FIELDS)[1] == 0
+
+
+def test_delta_without_keyframe_is_rejected():
+    message = RESULT_HEADER.pack(0x02, FLAG_DELTA, 22) + bytes(88) + b"{}"
+    with pytest.raises(ProtocolError):
+        decode_result(message)
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from app.recording import (
+    ROW_WIDTH,
+    SessionRecorder,
+    flush_recordings,
+    list_recordings,
+    open_recording,
+)
+from app.schemas import LandmarkArray
+
+
+def landmarks(value):
+    return LandmarkArray(np.full((33, 4), value, dtype=np.float32))
+
+
+def test_round_trip(tmp_path):
+    recorder = SessionRecorder("Squats", directory=tmp_path, flush_rows=2)
+    recorder.record(0.0, landmarks(0.1), {"reps": 0, "feedback": {"message": "A"}})
+    recorder.record(
+        0.5, landmarks(0.2), {"reps": 1, "feedback": {"message": "B", "angle": 85.0}}
+    )
+    recorder.record(1.0, None, reps=1)
+    recorder.close(reps=1)
+    flush_recordings()
+
+    rec = open_recording(recorder.recording_id, directory=tmp_path)
+    assert len(rec) == 3
+    assert rec.timestamps.tolist() == [0.0, 0.5, 1.0]
+    assert rec.detected.tolist() == [True, True, False]
+    assert rec.reps.tolist() == [0, 1, 1]
+    assert rec.angles[1] == 85.0
+    assert rec.feedback_messages() == ["A", "B", None]
+    assert rec.landmarks.shape == (3, 33, 4)
+    assert np.allclose(rec.landmarks[1], 0.2)
+    assert np.isnan(rec.landmarks[2]).all()
+    assert rec.meta["exercise"] == "Squats"
+    assert rec.meta["frames"] == 3
+    assert rec.meta["reps"] == 1
+
+
+def test_recording_cut_short_still_decodes_feedback(tmp_path):
+    recorder = SessionRecorder("Squats", directory=tmp_path / "new", flush_rows=2)
+    for i, message in enumerate(["A", "B", "B", "C", "C"]):
+        recorder.record(
+            i / 15, landmarks(0.1), {"reps": 0, "feedback": {"message": message}}
+        )
+    flush_recordings()  # Never closed, as after a crash
+
+    rec = open_recording(recorder.recording_id, directory=tmp_path / "new")
+    assert len(rec) == 4
+    assert rec.feedback_messages() == ["A", "B", "B", "C"]
+    assert rec.meta["ended_at"] is None
+
+
+def test_reader_is_memory_mapped(tmp_path):
+    recorder = SessionRecorder("Plank", directory=tmp_path)
+    for i in range(10):
+        recorder.record(i / 15, landmarks(i))
+    recorder.close()
+    flush_recordings()
+
+    rec = open_recording(recorder.recording_id, directory=tmp_path)
+    assert isinstance(rec.rows, np.memmap)
+    assert rec.rows.shape == (10, ROW_WIDTH)
+
+
+def test_unflushed_frames_are_buffered(tmp_path):
+    recorder = SessionRecorder("Pushups", directory=tmp_path, flush_rows=100)
+    recorder.record(0.0, landmarks(0.5))
+    flush_recordings()
+
+    # Below the flush threshold nothing has touched the data file yet
+    assert recorder.data_path.stat().st_size == 0
+    recorder.close()
+    flush_recordings()
+    assert recorder.data_path.stat().st_size == ROW_WIDTH * 4
+
+
+def test_list_recordings(tmp_path):
+    SessionRecorder("Squats", directory=tmp_path).close()
+    flush_recordings()
+    assert [m["exercise"] for m in list_recordings(tmp_path)] == ["Squats"]
+    assert list_recordings(tmp_path / "missing") == []
+
+
+def test_open_unknown_recording(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        open_recording("nope", directory=tmp_path)
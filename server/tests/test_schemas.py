@@ -0,0 +1,49 @@
+import pickle
+
+import numpy as np
+
+from app.schemas import Landmark, LandmarkArray, PoseResult
+
+
+def make_array():
+    data = np.zeros((33, 4), dtype=np.float32)
+    data[11] = (0.25, 0.5, -0.1, 0.9)
+    return LandmarkArray(data)
+
+
+def test_index_access_matches_landmark_attributes():
+    landmarks = make_array()
+    assert len(landmarks) == 33
+    assert landmarks[11].x == 0.25
+    assert landmarks[11].y == 0.5
+    assert landmarks[11].visibility == np.float32(0.9)
+
+
+def test_out_of_range_raises_index_error():
+    landmarks = LandmarkArray(np.zeros((5, 4)))
+    try:
+        landmarks[23]
+    except IndexError:
+        pass
+    else:
+        raise AssertionError("expected IndexError")
+
+
+def test_to_dicts_matches_legacy_shape():
+    row = make_array().to_dicts()[11]
+    assert set(row) == {"x", "y", "z", "visibility"}
+    assert row["x"] == 0.25
+
+
+def test_pose_result_coerces_landmark_list():
+    models = [Landmark(x=i, y=0, z=0, visibility=1) for i in range(33)]
+    result = PoseResult(landmarks=models)
+    assert isinstance(result.landmarks, LandmarkArray)
+    assert result.landmarks.data.shape == (33, 4)
+    assert result.landmarks.data.dtype == np.float32
+    assert result.landmarks[32].x == 32
+
+
+def test_pickles_for_worker_processes():
+    result = PoseResult(landmarks=make_array())
+    assert pickle.loads(pickle.dumps(result)).landmarks == result.landmarks
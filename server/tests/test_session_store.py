@@ -0,0 +1,107 @@
+import pytest
+
+from app.session_store import (
+    MemorySessionStore,
+    SQLiteSessionStore,
+    create_session_store,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    """Stores on one backend; sqlite stores share a file like workers do."""
+    clock = Clock()
+    stores = []
+
+    def make():
+        if request.param == "memory":
+            store = MemorySessionStore(lease=30, clock=clock)
+        else:
+            store = SQLiteSessionStore(tmp_path / "sessions.db", lease=30, clock=clock)
+        stores.append(store)
+        return store
+
+    make.clock = clock
+    yield make
+    for store in stores:
+        store.close()
+
+
+def test_admission_caps_connections(make_store):
+    store = make_store()
+    assert store.acquire("a", 2) and store.acquire("b", 2)
+    assert not store.acquire("c", 2)
+    assert store.acquire("a", 2)  # re-acquiring a held slot doesn't count twice
+    assert store.admitted() == 2
+
+    store.release("a")
+    assert store.acquire("c", 2)
+    store.release_worker()
+    assert store.admitted() == 0
+
+
+def test_state_is_taken_once_until_it_expires(make_store):
+    store = make_store()
+    store.put("token", {"reps": 3, "state": "START"}, ttl=10)
+    assert store.take("token") == {"reps": 3, "state": "START"}
+    assert store.take("token") is None
+
+    store.put("late", {"reps": 1}, ttl=10)
+    store.put("kept", {"reps": 2}, ttl=60)
+    make_store.clock.now += 20
+    assert store.take("late") is None
+    assert store.expired() == [("late", {"reps": 1})]
+    assert store.expired() == []
+    assert store.take("kept") == {"reps": 2}
+
+
+def test_get_leaves_state_in_place(make_store):
+    store = make_store()
+    store.put("video:job", {"status": "running"}, ttl=10)
+    assert store.get("video:job") == {"status": "running"}
+    assert store.get("video:job") == {"status": "running"}
+
+    make_store.clock.now += 20
+    assert store.get("video:job") is None
+    assert store.expired() == [("video:job", {"status": "running"})]
+
+
+def test_sqlite_workers_share_one_cap(tmp_path):
+    clock = Clock()
+    path = tmp_path / "sessions.db"
+    first = SQLiteSessionStore(path, lease=30, clock=clock)
+    second = SQLiteSessionStore(path, lease=30, clock=clock)
+
+    assert first.acquire("a", 2) and second.acquire("b", 2)
+    assert not second.acquire("c", 2)
+    assert first.admitted() == second.admitted() == 2
+
+    # Sessions parked by one worker resume on another
+    first.put("token", {"reps": 7}, ttl=60)
+    assert second.take("token") == {"reps": 7}
+    # ...and state one publishes, the other can read
+    first.put("video:job", {"status": "done"}, ttl=60)
+    assert second.get("video:job") == {"status": "done"}
+
+    # The first worker dies without releasing; its slot lapses after the
+    # lease while the second worker keeps refreshing its own
+    clock.now += 20
+    second.refresh()
+    clock.now += 20
+    assert second.acquire("c", 2)
+    assert second.admitted() == 2
+    first.close()
+    second.close()
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_session_store("redis")
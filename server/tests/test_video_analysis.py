@@ -0,0 +1,250 @@
+import asyncio
+import itertools
+import time
+
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app.engine.video_analysis import VideoAnalyzer, plan_chunks
+from app.schemas import LandmarkArray, PoseResult
+from app.session_store import SQLiteSessionStore
+
+STANDING, SQUATTING = 255, 0
+
+
+class BrightnessDetector:
+    """Bright frame = standing (knee 180°), dark frame = deep squat (45°)."""
+
+    def process_image(self, image):
+        data = np.zeros((33, 4), dtype=np.float32)
+        data[:, 3] = 1.0
+        data[23] = (0, 0, 0, 1)  # hip
+        data[25] = (0, 1, 0, 1)  # knee
+        if image.mean() > 128:
+            data[27] = (0, 2, 0, 1)  # ankle straight below
+        else:
+            data[23] = (1, 2, 0, 1)
+            data[27] = (1, 1, 0, 1)
+        return PoseResult(landmarks=LandmarkArray(data))
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def write_video(path, phases, frames_per_phase=20, fps=30):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (64, 48))
+    for value in phases:
+        for _ in range(frames_per_phase):
+            writer.write(np.full((48, 64, 3), value, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+SQUAT_PHASES = [STANDING, SQUATTING, STANDING, SQUATTING, STANDING]
+
+
+def test_plan_chunks_cover_video_contiguously():
+    chunks = plan_chunks(frame_count=1000, stride=2, workers=4, min_chunk=60)
+    assert len(chunks) == 4
+    assert chunks[0][0] == 0 and chunks[-1][1] == 1000
+    for (_, stop), (start, _) in itertools.pairwise(chunks):
+        assert stop == start and start % 2 == 0
+
+
+def test_plan_chunks_short_video_single_chunk():
+    assert plan_chunks(frame_count=50, stride=2, workers=8, min_chunk=60) == [(0, 50)]
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_counts_reps_across_chunks(tmp_path, workers):
+    saved = []
+    analyzer = VideoAnalyzer(
+        workers=workers,
+        detector_factory=BrightnessDetector,
+        save_session=lambda *args: saved.append(args),
+        min_chunk_frames=10,
+    )
+    path = write_video(tmp_path / "squats.avi", SQUAT_PHASES)
+
+    async def run():
+        job = analyzer.submit(path, "Squats")
+        await analyzer.wait(job["id"])
+        return analyzer.get(job["id"])
+
+    try:
+        job = asyncio.run(run())
+    finally:
+        asyncio.run(analyzer.shutdown())
+
+    assert job["status"] == "done", job["error"]
+    assert job["chunks"] == (1 if workers == 0 else 2)
+    result = job["result"]
+    assert result["reps"] == 2
+    assert result["frames_analyzed"] == 50  # 100 frames @ 30 FPS sampled to 15
+    assert result["frames_detected"] == 50
+    assert saved == [("Squats", 2, 3)]
+
+
+def test_unreadable_video_fails_job(tmp_path):
+    path = tmp_path / "broken.mp4"
+    path.write_bytes(b"not a video")
+    analyzer = VideoAnalyzer(workers=0, detector_factory=BrightnessDetector)
+
+    async def run():
+        job = analyzer.submit(str(path), "Squats")
+        await analyzer.wait(job["id"])
+        return job
+
+    job = asyncio.run(run())
+    assert job["status"] == "failed"
+    assert not path.exists()
+
+
+def test_upload_and_poll(tmp_path, monkeypatch):
+    analyzer = VideoAnalyzer(workers=0, detector_factory=BrightnessDetector)
+    monkeypatch.setattr(main, "video_analyzer", analyzer)
+    path = write_video(tmp_path / "squats.avi", SQUAT_PHASES)
+
+    with TestClient(main.app) as client:
+        with open(path, "rb") as f:
+            response = client.post(
+                "/api/analyze-video",
+                files={"file": ("squats.avi", f, "video/x-msvideo")},
+                data={"exercise": "Squats", "save": "false"},
+            )
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+
+        for _ in range(100):
+            job = client.get(f"/api/analyze-video/{job_id}").json()
+            if job["status"] in ("done", "failed"):
+                break
+            time.sleep(0.05)
+
+        assert job["status"] == "done"
+        assert job["result"]["reps"] == 2
+        assert job["result"]["saved"] is False
+        assert client.get("/api/analyze-video/missing").status_code == 404
+
+
+def test_oversized_upload_is_refused_while_streaming(monkeypatch):
+    monkeypatch.setattr(main, "MAX_VIDEO_BYTES", 1024)
+    monkeypatch.setattr(main, "UPLOAD_FORM_OVERHEAD", 1024)
+    boundary = "b0undary"
+    head = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; '
+        'filename="big.mp4"\r\n\r\n'
+    ).encode()
+    chunks = [head] + [b"x" * 1024] * 1000
+    sent, replies = [], []
+
+    async def receive():
+        # No Content-Length: the cap has to hold as chunks arrive
+        sent.append(chunks[len(sent)])
+        return {"type": "http.request", "body": sent[-1], "more_body": True}
+
+    async def send(message):
+        replies.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/analyze-video",
+        "raw_path": b"/api/analyze-video",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"content-type", f"multipart/form-data; boundary={boundary}".encode()),
+        ],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+        "state": {},
+    }
+    asyncio.run(main.app(scope, receive, send))
+
+    assert replies[0]["status"] == 413
+    assert len(sent) < 10  # Refused early, not after reading the whole body
+
+    with TestClient(main.app) as client:
+        declared = client.post(
+            "/api/analyze-video", files={"file": ("big.mp4", b"x" * 4096)}
+        )
+        assert declared.status_code == 413
+
+
+def test_inline_jobs_share_one_detector_thread(tmp_path):
+    class ExclusiveDetector(BrightnessDetector):
+        busy = False
+
+        def process_image(self, image):
+            assert not ExclusiveDetector.busy, "detector used by two threads"
+            ExclusiveDetector.busy = True
+            time.sleep(0.001)
+            ExclusiveDetector.busy = False
+            return super().process_image(image)
+
+    analyzer = VideoAnalyzer(workers=0, detector_factory=ExclusiveDetector)
+    paths = [write_video(tmp_path / f"{i}.avi", SQUAT_PHASES) for i in range(3)]
+
+    async def run():
+        jobs = [analyzer.submit(path, "Squats", save=False) for path in paths]
+        await asyncio.gather(*(analyzer.wait(job["id"]) for job in jobs))
+        await analyzer.shutdown()
+        return jobs
+
+    for job in asyncio.run(run()):
+        assert job["status"] == "done", job["error"]
+        assert job["result"]["reps"] == 2
+
+
+def test_jobs_can_be_polled_from_another_worker(tmp_path):
+    stores = [SQLiteSessionStore(tmp_path / "sessions.db") for _ in range(2)]
+    runner, poller = (
+        VideoAnalyzer(workers=0, detector_factory=BrightnessDetector, store=store)
+        for store in stores
+    )
+    path = write_video(tmp_path / "squats.avi", SQUAT_PHASES)
+
+    async def run():
+        job = runner.submit(path, "Squats", save=False)
+        await runner.publish(job)
+        queued = poller.get(job["id"])
+        await runner.wait(job["id"])
+        await runner.shutdown()
+        return queued, poller.get(job["id"])
+
+    try:
+        queued, done = asyncio.run(run())
+        assert poller.get("missing") is None
+    finally:
+        for store in stores:
+            store.close()
+    assert queued["status"] == "queued"
+    assert done["status"] == "done"
+    assert done["result"]["reps"] == 2
+
+
+def test_shutdown_cancels_jobs_and_deletes_uploads(tmp_path):
+    path = write_video(tmp_path / "squats.avi", SQUAT_PHASES * 4)
+    analyzer = VideoAnalyzer(workers=1, detector_factory=BrightnessDetector)
+
+    async def run():
+        job = analyzer.submit(path, "Squats")
+        await asyncio.sleep(0)
+        await analyzer.shutdown()
+        # Deleted by the time shutdown returns, not when the loop closes
+        return job, (tmp_path / "squats.avi").exists()
+
+    job, upload_exists = asyncio.run(run())
+    assert job["status"] == "failed"
+    assert not upload_exists
@@ -0,0 +1,486 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from typing import ClassVar, List
+
+import pytest
+from fastapi import WebSocketDisconnect
+from fastapi.testclient import TestClient
+
+import main
+from app.core.governor import LOAD_LEVELS, LoadGovernor
+from app.core.inference import InferenceExecutor
+from app.core.protocol import FLAG_DELTA, decode_result, encode_binary_frame
+from app.engine.exercises import ExerciseStrategy
+from app.schemas import Landmark, PoseResult
+from app.session_store import MemorySessionStore, SQLiteSessionStore
+
+
+class FakeDetector:
+    """Reports a fixed pose; remembers the payload type it was handed."""
+
+    payload_types: ClassVar[List[str]] = []
+
+    def process_frame(self, frame):
+        FakeDetector.payload_types.append(type(frame).__name__)
+        return PoseResult(landmarks=[Landmark(x=0.5, y=0.5, z=0, visibility=1.0)] * 33)
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    FakeDetector.payload_types = []
+    executor = InferenceExecutor(workers=0, detector_factory=FakeDetector)
+    monkeypatch.setattr(main, "inference", executor)
+    with TestClient(main.app) as c:
+        yield c
+
+
+def test_json_frame(client):
+    with client.websocket_connect("/ws") as ws:
+        ws.send_text(json.dumps({"type": "INIT", "exercise": "Squats"}))
+        ws.send_text(json.dumps({"type": "FRAME", "payload": "", "timestamp": 7}))
+        response = json.loads(ws.receive_text())
+
+    assert response["type"] == "RESULT"
+    assert response["timestamp"] == 7
+    assert len(response["landmarks"]) == 33
+    assert "seq" not in response
+    assert FakeDetector.payload_types == ["str"]
+
+
+def test_binary_frame(client):
+    with client.websocket_connect("/ws") as ws:
+        ws.send_text(json.dumps({"type": "INIT", "exercise": "Squats"}))
+        ws.send_bytes(encode_binary_frame(b"\xff\xd8jpeg", timestamp=1234.0, seq=5))
+        response = json.loads(ws.receive_text())
+
+    assert response["type"] == "RESULT"
+    assert response["timestamp"] == 1234.0
+    assert response["seq"] == 5
+    assert FakeDetector.payload_types == ["memoryview"]
+
+
+def test_compact_results_are_negotiated_in_init(client):
+    with client.websocket_connect("/ws") as ws:
+        init = {"type": "INIT", "exercise": "Squats", "format": "compact"}
+        ws.send_text(json.dumps({**init, "delta": True}))
+        previous = None
+        messages = []
+        for seq in range(2):
+            ws.send_bytes(encode_binary_frame(b"jpeg", timestamp=9, seq=seq))
+            message = ws.receive_bytes()
+            landmarks, previous, fields = decode_result(message, previous)
+            messages.append(message)
+
+    assert messages[0][1] == 0 and messages[1][1] == FLAG_DELTA
+    assert len(messages[1]) < len(messages[0])
+    assert fields["type"] == "RESULT" and fields["seq"] == 1
+    assert landmarks[11].tolist() == [0.5, 0.5, 0, 1.0]
+    assert landmarks[0, 3] == 0  # face landmarks aren't sent
+
+
+def test_malformed_binary_frame_is_ignored(client):
+    with client.websocket_connect("/ws") as ws:
+        ws.send_bytes(b"\x01")
+        ws.send_bytes(encode_binary_frame(b"jpeg", timestamp=0, seq=1))
+        assert json.loads(ws.receive_text())["seq"] == 1
+
+
+def test_stale_frames_are_dropped(client, monkeypatch):
+    # Slow detector: frames arrive faster than they can be processed
+    class SlowDetector(FakeDetector):
+        def process_frame(self, frame):
+            time.sleep(0.05)
+            return super().process_frame(frame)
+
+    executor = InferenceExecutor(workers=0, detector_factory=SlowDetector)
+    monkeypatch.setattr(main, "inference", executor)
+    seen = []
+
+    with client.websocket_connect("/ws") as ws:
+        for seq in range(10):
+            ws.send_bytes(encode_binary_frame(b"jpeg", timestamp=0, seq=seq))
+        while not seen or seen[-1] != 9:
+            seen.append(json.loads(ws.receive_text())["seq"])
+
+    # Newest frame always wins; the backlog in between is skipped
+    assert seen[-1] == 9
+    assert len(seen) < 10
+    assert seen == sorted(seen)
+
+
+def test_metrics_record_frame_stages(client):
+    with client.websocket_connect("/ws") as ws:
+        ws.send_text(json.dumps({"type": "FRAME", "payload": "", "timestamp": 1}))
+        ws.receive_text()
+        body = client.get("/metrics").text
+
+    assert "formcheck_active_sessions 1.0" in body
+    for stage in ("json_parse", "strategy", "serialize", "total"):
+        assert f'formcheck_frame_stage_seconds_count{{stage="{stage}"}}' in body
+    assert 'formcheck_frames_total{outcome="processed"}' in body
+
+
+def test_load_governor_downgrades_detector_and_client(client, monkeypatch):
+    class TieredDetector(FakeDetector):
+        complexities: ClassVar[List[int]] = []
+
+        def set_model_complexity(self, model_complexity):
+            TieredDetector.complexities.append(model_complexity)
+
+    executor = InferenceExecutor(workers=0, detector_factory=TieredDetector)
+    monkeypatch.setattr(main, "inference", executor)
+    # Every round trip is over budget and every frame is a decision point
+    monkeypatch.setattr(main, "governor", LoadGovernor(target_ms=0, interval=0))
+
+    with client.websocket_connect("/ws") as ws:
+        ws.send_bytes(encode_binary_frame(b"jpeg", timestamp=0, seq=1))
+        assert json.loads(ws.receive_text())["type"] == "RESULT"
+        control = json.loads(ws.receive_text())
+        # A new exercise keeps the connection's level; the next step goes on from it
+        ws.send_text(json.dumps({"type": "INIT", "exercise": "Squats"}))
+        ws.send_bytes(encode_binary_frame(b"jpeg", timestamp=0, seq=2))
+        assert json.loads(ws.receive_text())["seq"] == 2
+        assert json.loads(ws.receive_text())["level"] == "minimal"
+
+    assert control == LOAD_LEVELS[2].control_message()
+    assert TieredDetector.complexities == [0]
+
+
+def test_metrics_count_motion_gate_skips(client, monkeypatch):
+    class GatedDetector(FakeDetector):
+        frames = 0
+
+        def process_frame(self, frame):
+            # Every other frame is served by the motion gate
+            GatedDetector.frames += 1
+            self.last_timings = {"motion_gate": 0.0001}
+            if GatedDetector.frames % 2:
+                self.last_timings["inference"] = 0.02
+            return super().process_frame(frame)
+
+    executor = InferenceExecutor(workers=0, detector_factory=GatedDetector)
+    monkeypatch.setattr(main, "inference", executor)
+    with client.websocket_connect("/ws") as ws:
+        for seq in range(2):
+            ws.send_bytes(encode_binary_frame(b"jpeg", timestamp=0, seq=seq))
+            ws.receive_text()
+        body = client.get("/metrics").text
+
+    assert 'formcheck_motion_gate_frames_total{outcome="inferred"}' in body
+    assert 'formcheck_motion_gate_frames_total{outcome="skipped"}' in body
+
+
+def test_connection_cap_is_shared_across_workers(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "MAX_WS_CONNECTIONS", 1)
+    path = tmp_path / "sessions.db"
+    monkeypatch.setattr(main, "session_store", SQLiteSessionStore(path))
+    # Another worker on the same store already holds the only slot
+    other_worker = SQLiteSessionStore(path)
+    other_worker.acquire("elsewhere", 1)
+
+    with (
+        pytest.raises(WebSocketDisconnect) as rejected,
+        client.websocket_connect("/ws") as ws,
+    ):
+        ws.receive_text()
+    assert rejected.value.code == 1008
+
+    other_worker.release("elsewhere")
+    with client.websocket_connect("/ws") as ws:
+        ws.send_bytes(encode_binary_frame(b"jpeg", timestamp=0, seq=1))
+        assert json.loads(ws.receive_text())["seq"] == 1
+        assert other_worker.admitted() == 1
+    # The server releases the slot once it has processed the disconnect
+    deadline = time.monotonic() + 2
+    while other_worker.admitted() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert other_worker.admitted() == 0
+    other_worker.close()
+
+
+class CountingStrategy(ExerciseStrategy):
+    """One rep per detected frame."""
+
+    def process(self, landmarks, angles=None):
+        self.reps += 1
+        return {"reps": self.reps, "feedback": self.feedback, "state": "ACTIVE"}
+
+
+class Clock:
+    now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def wait_for(condition):
+    # The server finishes a disconnect after the client has moved on
+    deadline = time.monotonic() + 2
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+@pytest.fixture
+def resumable(client, monkeypatch):
+    saved = []
+    store = MemorySessionStore(clock=Clock())
+    monkeypatch.setattr(main, "session_store", store)
+    monkeypatch.setattr(main, "get_strategy", lambda name: CountingStrategy())
+    monkeypatch.setattr(
+        main.session_writer,
+        "save_session",
+        lambda exercise, reps, duration=0, timestamp=None: saved.append(
+            (exercise, reps)
+        ),
+    )
+    return store, saved
+
+
+def send_frames(ws, count):
+    for seq in range(count):
+        ws.send_bytes(encode_binary_frame(b"jpeg", timestamp=0, seq=seq))
+        reps = json.loads(ws.receive_text())["reps"]
+    return reps
+
+
+def test_dropped_session_resumes_and_saves_once(client, resumable):
+    store, saved = resumable
+    init = json.dumps({"type": "INIT", "exercise": "Squats", "session": "tok-1"})
+
+    with client.websocket_connect("/ws") as ws:
+        ws.send_text(init)
+        assert send_frames(ws, 2) == 2
+    wait_for(lambda: "session:tok-1" in store._states)
+    assert saved == []
+
+    with client.websocket_connect("/ws") as ws:
+        # The client re-sends INIT on open and on session start
+        ws.send_text(init)
+        ws.send_text(init)
+        assert send_frames(ws, 1) == 3
+        ws.send_text(json.dumps({"type": "END"}))
+        wait_for(lambda: saved)
+        # After END the connection counts a new, unsaved session
+        assert send_frames(ws, 1) == 1
+
+    assert saved[0] == ("Squats", 3)
+    assert "session:tok-1" not in store._states
+
+
+def test_unclaimed_session_is_saved_when_it_expires(client, resumable):
+    store, saved = resumable
+    init = {"type": "INIT", "exercise": "Squats", "session": "tok-2"}
+
+    with client.websocket_connect("/ws") as ws:
+        ws.send_text(json.dumps(init))
+        send_frames(ws, 2)
+    wait_for(lambda: "session:tok-2" in store._states)
+
+    store.clock.now += main.SESSION_RESUME_TTL + 1
+    main.save_expired_sessions(store.expired())
+    assert saved == [("Squats", 2)]
+
+    # Too late to resume: the same token starts from zero
+    with client.websocket_connect("/ws") as ws:
+        ws.send_text(json.dumps(init))
+        assert send_frames(ws, 1) == 1
+
+
+def test_parked_session_for_another_exercise_is_saved(client, resumable):
+    store, saved = resumable
+    with client.websocket_connect("/ws") as ws:
+        ws.send_text(json.dumps({"type": "INIT", "exercise": "Squats", "session": "t"}))
+        send_frames(ws, 2)
+    wait_for(lambda: "session:t" in store._states)
+
+    with client.websocket_connect("/ws") as ws:
+        ws.send_text(json.dumps({"type": "INIT", "exercise": "Plank", "session": "t"}))
+        assert send_frames(ws, 1) == 1
+        wait_for(lambda: saved)
+    assert saved[0] == ("Squats", 2)
+
+
+def test_reconnect_takes_over_the_live_session(client, resumable):
+    store, saved = resumable
+    init = json.dumps({"type": "INIT", "exercise": "Squats", "session": "tok-3"})
+
+    with client.websocket_connect("/ws") as old:
+        old.send_text(init)
+        assert send_frames(old, 2) == 2
+        # The network dropped; the client re-INITs before the server notices
+        with client.websocket_connect("/ws") as ws:
+            ws.send_text(init)
+            assert send_frames(ws, 1) == 3
+            with pytest.raises(WebSocketDisconnect) as replaced:
+                old.receive_text()
+            assert replaced.value.code == 4000
+            ws.send_text(json.dumps({"type": "END"}))
+            wait_for(lambda: saved)
+
+    wait_for(lambda: store.admitted() == 0)
+    # Saved once, as one session; nothing orphaned is parked for later
+    assert saved == [("Squats", 3)]
+    assert store._states == {}
+
+
+def test_rest_save_while_the_socket_is_live_is_not_saved_again(client, resumable):
+    store, saved = resumable
+    init = {"type": "INIT", "exercise": "Squats", "session": "tok-6"}
+    payload = {"exercise": "Squats", "reps": 2, "duration": 5, "session": "tok-6"}
+
+    with client.websocket_connect("/ws") as ws:
+        ws.send_text(json.dumps(init))
+        send_frames(ws, 2)
+        # The socket looks down to the client, which saves over REST instead
+        assert client.post("/api/save-session", json=payload).status_code == 200
+    wait_for(lambda: store.admitted() == 0)
+
+    # The saved token can't be resumed into a session that's never saved
+    with client.websocket_connect("/ws") as ws:
+        ws.send_text(json.dumps(init))
+        assert send_frames(ws, 1) == 1
+    wait_for(lambda: store.admitted() == 0)
+
+    store.clock.now += 2 * main.SESSION_RESUME_TTL + 1
+    main.save_expired_sessions(store.expired())
+    assert saved == [("Squats", 2), ("Squats", 1)]
+
+
+def parked_squats(reps):
+    strategy = CountingStrategy()
+    strategy.reps = reps
+    return {
+        "exercise": "Squats",
+        "strategy": strategy.snapshot(),
+        "duration": 5,
+        "ended_at": time.time(),
+    }
+
+
+def test_reconnect_takes_over_a_session_live_on_another_worker(
+    client, resumable, monkeypatch, tmp_path
+):
+    path = tmp_path / "sessions.db"
+    monkeypatch.setattr(main, "session_store", SQLiteSessionStore(path))
+    # The worker the old connection is still open on
+    other = SQLiteSessionStore(path)
+    other.put(main.live_key("tok-4"), {"worker": other.worker}, ttl=60)
+
+    def hand_over():
+        wait_for(lambda: other.get(main.takeover_key("tok-4")) is not None)
+        other.put(main.parked_key("tok-4"), parked_squats(2), ttl=60)
+
+    worker = threading.Thread(target=hand_over)
+    worker.start()
+    with client.websocket_connect("/ws") as ws:
+        ws.send_text(
+            json.dumps({"type": "INIT", "exercise": "Squats", "session": "tok-4"})
+        )
+        assert send_frames(ws, 1) == 3
+        live = other.get(main.live_key("tok-4"))
+        assert live == {"worker": main.session_store.worker}
+    worker.join()
+
+    # Parked again on disconnect, and no longer claimed as live anywhere
+    wait_for(lambda: other.get(main.parked_key("tok-4")) is not None)
+    assert other.get(main.live_key("tok-4")) is None
+    other.close()
+
+
+def test_live_session_is_handed_over_on_request(
+    client, resumable, monkeypatch, tmp_path
+):
+    _, saved = resumable
+    path = tmp_path / "sessions.db"
+    monkeypatch.setattr(main, "session_store", SQLiteSessionStore(path))
+    other = SQLiteSessionStore(path)
+
+    with client.websocket_connect("/ws") as ws:
+        ws.send_text(
+            json.dumps({"type": "INIT", "exercise": "Squats", "session": "tok-5"})
+        )
+        send_frames(ws, 2)
+        # The client's new connection landed on the other worker
+        other.put(main.takeover_key("tok-5"), {}, ttl=5)
+        ws.portal.call(main.hand_over_sessions)
+        assert other.take(main.parked_key("tok-5"))["strategy"]["reps"] == 2
+        with pytest.raises(WebSocketDisconnect) as replaced:
+            ws.receive_text()
+        assert replaced.value.code == 4000
+
+    wait_for(lambda: other.admitted() == 0)
+    # The old connection's teardown has nothing left to park or save
+    assert other.get(main.parked_key("tok-5")) is None
+    assert saved == []
+    other.close()
+
+
+def test_cancelled_expiry_pass_saves_what_it_popped(resumable, monkeypatch):
+    store, saved = resumable
+    monkeypatch.setattr(main, "SESSION_RESUME_TTL", 0.01)
+    store.put(main.parked_key("gone"), parked_squats(2), ttl=0)
+    popped, release = threading.Event(), threading.Event()
+    expired = store.expired
+
+    def slow_expired(before=None):
+        entries = expired(before)
+        popped.set()
+        release.wait(2)
+        return entries
+
+    monkeypatch.setattr(store, "expired", slow_expired)
+
+    async def run():
+        sweeper = asyncio.create_task(main.expire_parked_sessions())
+        await asyncio.to_thread(popped.wait, 2)
+        sweeper.cancel()  # e.g. shutdown, while the pass holds popped entries
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await sweeper
+
+    asyncio.run(run())
+    assert saved == [("Squats", 2)]
+
+
+def test_malformed_messages_keep_the_connection_and_session(
+    client, resumable, monkeypatch
+):
+    _, saved = resumable
+    strategies = {"Pushups": CountingStrategy, "Squats": CountingStrategy}
+    # Like the real lookup, an unhashable exercise name raises TypeError
+    monkeypatch.setattr(main, "get_strategy", lambda name: strategies[name]())
+
+    with client.websocket_connect("/ws") as ws:
+        ws.send_text(json.dumps({"type": "INIT", "exercise": "Squats"}))
+        assert send_frames(ws, 2) == 2
+        for text in ("123", "[1, 2]", '{"type": "INIT", "exercise": ["x"]}'):
+            ws.send_text(text)
+        assert send_frames(ws, 1) == 3
+    wait_for(lambda: saved)
+    assert saved == [("Squats", 3)]
+
+
+def test_store_errors_keep_the_session(client, resumable, monkeypatch):
+    store, saved = resumable
+
+    def broken(*args):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(store, "take", broken)
+    monkeypatch.setattr(store, "put", broken)
+    with client.websocket_connect("/ws") as ws:
+        ws.send_text(json.dumps({"type": "INIT", "exercise": "Squats", "session": "t"}))
+        assert send_frames(ws, 2) == 2
+    # Parking failed, so the session is saved rather than lost
+    wait_for(lambda: saved)
+    assert saved == [("Squats", 2)]
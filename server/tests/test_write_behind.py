@@ -0,0 +1,110 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+import app.database
+from app.database import Database
+from app.write_behind import SessionWriter
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(app.database, "DB_PATH", tmp_path / "writes.db")
+    db = Database()
+    yield db
+    db.close()
+
+
+def test_queued_writes_share_transactions(temp_db):
+    writer = SessionWriter(temp_db, batch_size=50)
+
+    async def run():
+        await writer.start()
+        for i in range(120):
+            writer.save_session("Pushups", i + 1, 10)
+        writer.save_session("Squats", 0, 0)  # Empty sessions are skipped
+        await writer.close()
+
+    asyncio.run(run())
+
+    assert temp_db.get_stats()["total_sessions"] == 120
+    assert writer.written == 120
+    assert writer.batches == 3  # 50 + 50 + 20
+
+
+def test_ops_apply_in_order_and_reads_see_them(temp_db):
+    writer = SessionWriter(temp_db)
+
+    async def run():
+        await writer.start()
+        writer.save_session("Pushups", 10, 0, timestamp=100)
+        writer.save_session("Squats", 20, 0, timestamp=200)
+        # Submitted from a worker thread, like sync endpoints
+        await asyncio.to_thread(writer.delete_all_sessions)
+        writer.save_session("Plank", 30, 0, timestamp=300)
+
+        assert await asyncio.to_thread(writer.wait_idle)
+        sessions = await asyncio.to_thread(temp_db.get_recent_sessions)
+        await writer.close()
+        return sessions
+
+    sessions = asyncio.run(run())
+    assert [(s["exercise"], s["reps"]) for s in sessions] == [("Plank", 30)]
+
+
+def test_bad_op_does_not_drop_batch(temp_db):
+    writer = SessionWriter(temp_db)
+
+    async def run():
+        await writer.start()
+        writes = [
+            writer.save_session("Pushups", 10, 0),
+            writer._submit(("save", None, 5, 0, 1.0)),  # NOT NULL violation
+            writer.save_session("Squats", 20, 0),
+        ]
+        await writer.close()
+        return writes
+
+    good, bad, other = asyncio.run(run())
+    assert temp_db.get_stats()["total_reps"] == 30
+    assert good.result(timeout=0) is None and other.result(timeout=0) is None
+    with pytest.raises(sqlite3.IntegrityError):
+        bad.result(timeout=0)
+
+
+def test_writes_without_running_writer_are_synchronous(temp_db):
+    writer = SessionWriter(temp_db)
+    writer.save_session("Pushups", 10, 0)
+    assert writer.wait_idle(timeout=0)
+    assert temp_db.get_stats()["total_reps"] == 10
+
+
+def test_future_settles_once_that_write_is_committed(temp_db):
+    writer = SessionWriter(temp_db)
+
+    async def run():
+        await writer.start()
+        write = await asyncio.to_thread(writer.save_session, "Pushups", 10, 0)
+        await asyncio.wrap_future(write)
+        stats = await asyncio.to_thread(temp_db.get_stats)
+        await writer.close()
+        return stats
+
+    assert asyncio.run(run())["total_reps"] == 10
+
+
+def test_writes_racing_close_are_not_dropped(temp_db):
+    writer = SessionWriter(temp_db)
+
+    async def run():
+        await writer.start()
+        writer.save_session("Pushups", 10, 0)
+        closing = asyncio.create_task(writer.close())
+        await asyncio.sleep(0)  # close() has begun flushing
+        write = await asyncio.to_thread(writer.save_session, "Squats", 5, 0)
+        assert write.done()  # Written synchronously
+        await closing
+
+    asyncio.run(run())
+    assert temp_db.get_stats()["total_reps"] == 15